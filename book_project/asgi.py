@@ -5,6 +5,20 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+The dashboard statistics stream (server-sent events) needs this entry point,
+with STATS_STREAM_ENABLED=True:
+
+    uvicorn book_project.asgi:application --workers 2
+
+With ASYNC_VIEWS=True the public read pages (home, catalogue, book and author
+pages) are served by the async views in books/async_views.py. Run it under
+gunicorn with uvicorn workers (process management and graceful restarts):
+
+    gunicorn book_project.asgi:application -k uvicorn_worker.UvicornWorker \
+             --workers 4 --bind 0.0.0.0:8000
+
+Compare with the sync WSGI deployment using `python manage.py benchmark_http`.
 """
 
 import os
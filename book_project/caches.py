@@ -0,0 +1,72 @@
+"""
+إعداد الذاكرة المؤقتة المشتركة من متغير البيئة CACHE_URL.
+
+أرقام الإصدار في books/caching.py (التصنيفات، الإحصائيات، فهرس الإكمال التلقائي) وأعداد
+النتائج تُقرأ وتُرفع من كل عمال gunicorn، فيجب أن تكون الذاكرة مشتركة بينهم إذا تعدد العمال:
+
+    locmem://                           ذاكرة العملية فقط (الافتراضي؛ عامل واحد)
+    redis://host:6379/0                 Redis (الزيادة فيه ذرية؛ المطلوب لعدة عمال أو خوادم)
+    memcached://host:11211              Memcached (يتطلب pymemcache)
+    file:///var/tmp/bookmark-cache      ملفات على القرص (عمال خادم واحد فقط)
+    db://books_cache                    جدول في قاعدة البيانات (python manage.py createcachetable)؛
+                                        كل قراءة استعلام وكل كتابة معاملة، وزيادته ليست ذرية
+                                        فقد يضيع رفع إصدار متزامن من عاملين
+
+معاملات الرابط (?key=value) تُمرر إلى OPTIONS كما هي، ما عدا الأرقام فتُحوَّل،
+و timeout منها يصبح TIMEOUT (بالثواني).
+"""
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+}
+
+
+def _option(value):
+    return int(value) if value.isdigit() else value
+
+
+def cache_config(url, base_dir=None):
+    """قاموس إعدادات Django لذاكرة مؤقتة واحدة من رابطها"""
+    parts = urlsplit(url)
+    backend = BACKENDS.get(parts.scheme)
+    if backend is None:
+        raise ImproperlyConfigured(f'نوع ذاكرة مؤقتة غير مدعوم في CACHE_URL: {parts.scheme!r}')
+
+    options = {key: _option(value) for key, value in parse_qsl(parts.query)}
+    config = {'BACKEND': backend}
+    if 'timeout' in options:
+        config['TIMEOUT'] = options.pop('timeout')
+
+    if parts.scheme == 'db':
+        location = parts.netloc or parts.path.lstrip('/')
+        if not location:
+            raise ImproperlyConfigured('CACHE_URL لا يحدد جدول الذاكرة المؤقتة، مثلاً db://books_cache')
+    elif parts.scheme in ('redis', 'rediss'):
+        # يمرر Redis الرابط كاملاً (كلمة المرور ورقم قاعدة البيانات) دون معاملات الاستعلام
+        location = parts._replace(query='').geturl()
+    elif parts.scheme == 'memcached':
+        location = [host for host in parts.netloc.split(',') if host]
+        if not location:
+            raise ImproperlyConfigured('CACHE_URL لا يحدد خادم Memcached')
+    elif parts.scheme == 'file':
+        # file:///path مطلق، file://name نسبي لمجلد المشروع
+        location = unquote(parts.netloc + parts.path)
+        if not location:
+            raise ImproperlyConfigured('CACHE_URL لا يحدد مجلد الذاكرة المؤقتة')
+        if base_dir is not None and not location.startswith('/'):
+            location = str(base_dir / location)
+    else:
+        location = parts.netloc or 'bookmark'
+
+    config['LOCATION'] = location
+    if options:
+        config['OPTIONS'] = options
+    return config
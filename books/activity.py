@@ -0,0 +1,93 @@
+"""
+سجل نشاط المستخدمين بأسلوب الكتابة المؤجلة.
+
+تتراكم الأنشطة في الذاكرة ثم تُكتب دفعة واحدة بـ bulk_create، ويُحدَّث في نفس
+المعاملة الملخص اليومي (عدد الزوار المميزين وعدد كل نوع نشاط) بتحديثات F()،
+فتقرأ لوحة التحكم صفاً واحداً بدل مسح جدول الأنشطة.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .buffers import WriteBehindBuffer
+
+
+class ActivityBuffer(WriteBehindBuffer):
+    """مخزن مؤقت لأحداث النشاط مع تحديث الملخص اليومي"""
+
+    interval_setting = 'USER_ACTIVITY_FLUSH_INTERVAL'
+    threshold_setting = 'USER_ACTIVITY_FLUSH_THRESHOLD'
+    name = 'user-activity'
+
+    def __init__(self, flush_interval=None, flush_threshold=None, batch_size=500):
+        self.batch_size = batch_size
+        super().__init__(flush_interval, flush_threshold)
+
+    def empty(self):
+        return []
+
+    def merge(self, pending):
+        self._pending[:0] = pending
+
+    def log(self, user_id, activity_type, details=None):
+        from .models import ActivityRollup
+
+        if activity_type not in ActivityRollup.TYPE_FIELDS:
+            raise ValueError(f'نوع نشاط غير معروف: {activity_type}')
+        event = (user_id, activity_type, details, timezone.now())
+        self.record(lambda pending: pending.append(event))
+
+    def write(self, pending):
+        from django.contrib.auth.models import User
+        from .models import ActivityRollup, ActivityVisitor, UserActivity
+
+        # نتجاهل أنشطة المستخدمين الذين حُذفوا قبل الكتابة
+        user_ids = set(
+            User.objects.filter(pk__in={event[0] for event in pending}).values_list('pk', flat=True)
+        )
+        events = [event for event in pending if event[0] in user_ids]
+        if not events:
+            return
+
+        counts = defaultdict(Counter)
+        visitors = defaultdict(set)
+        for user_id, activity_type, _, visited_at in events:
+            date = timezone.localdate(visited_at)
+            counts[date][ActivityRollup.TYPE_FIELDS[activity_type]] += 1
+            visitors[date].add(user_id)
+
+        with transaction.atomic():
+            UserActivity.objects.bulk_create(
+                [
+                    UserActivity(
+                        user_id=user_id, activity_type=activity_type, details=details, visited_at=visited_at,
+                    )
+                    for user_id, activity_type, details, visited_at in events
+                ],
+                batch_size=self.batch_size,
+            )
+            ActivityRollup.objects.bulk_create(
+                [ActivityRollup(date=date) for date in counts], ignore_conflicts=True
+            )
+            for date, fields in counts.items():
+                ActivityVisitor.objects.bulk_create(
+                    [ActivityVisitor(date=date, user_id=user_id) for user_id in visitors[date]],
+                    batch_size=self.batch_size,
+                    ignore_conflicts=True,
+                )
+                # عدد الزوار من جدول الزوار المميزين (بحجم زوار اليوم فقط)
+                ActivityRollup.objects.filter(pk=date).update(
+                    visitors=ActivityVisitor.objects.filter(date=date).count(),
+                    **{field: F(field) + n for field, n in fields.items()},
+                )
+
+
+user_activity = ActivityBuffer()
+
+
+def log_activity(user, activity_type, details=None):
+    """تسجيل نشاط للمستخدم الحالي (يُتجاهل للزوار غير المسجلين)"""
+    if user is not None and user.is_authenticated:
+        user_activity.log(user.pk, activity_type, details)
@@ -19,9 +19,10 @@ class AuthorAdmin(admin.ModelAdmin):
     list_filter = ('is_featured', 'specialization', 'created_at')
     search_fields = ('name', 'specialization', 'bio')
     list_editable = ('is_featured',)
+    list_select_related = ('stats',)
 
     def books_count(self, obj):
-        return obj.books.count()
+        return obj.get_books_count()
     books_count.short_description = 'عدد الكتب'
 
 
@@ -56,7 +57,7 @@ class BookAdmin(admin.ModelAdmin):
 
     autocomplete_fields = ('author', 'category')
 
-    readonly_fields = ('views', 'downloads', 'created_at', 'updated_at')
+    readonly_fields = ('views', 'downloads', 'avg_rating', 'review_count', 'created_at', 'updated_at')
 
     fieldsets = (
         ('📘 معلومات الكتاب', {
@@ -75,7 +76,7 @@ class BookAdmin(admin.ModelAdmin):
             'fields': ('is_featured',)
         }),
         ('📊 الإحصائيات', {
-            'fields': ('views', 'downloads', 'created_at', 'updated_at')
+            'fields': ('views', 'downloads', 'avg_rating', 'review_count', 'created_at', 'updated_at')
         }),
     )
 
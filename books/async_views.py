@@ -0,0 +1,207 @@
+"""
+نسخ غير متزامنة (ASGI) من صفحات القراءة العامة.
+
+تحل محل نظيراتها في views.py عند ASYNC_VIEWS=True (التشغيل عبر uvicorn، انظر asgi.py)،
+ولها نفس القوالب والسياق.
+
+- الاستعلامات المستقلة في الصفحة تُطلب معاً بـ asyncio.gather عبر ORM غير المتزامن.
+- ORM جانغو ينفذ استعلامات الطلب الواحد في خيط الطلب بالتتابع؛ المكسب أن حلقة
+  الأحداث لا تنتظرها: العميل البطيء أو الاستعلام البطيء لا يحجز العامل عن بقية الطلبات.
+- القالب يُعرض في خيط الطلب (sync_to_async) لأن ما يصل إليه (request.user، التصنيفات
+  المخزنة، علاقات الكائنات) يستعلم بشكل متزامن؛ لذلك تُجلب القوائم قبل العرض.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Q
+from django.shortcuts import aget_object_or_404, render
+
+from .context_processors import categories_snapshot
+from .forms import ReviewForm
+from .models import Author, AuthorStats, Book, Bookmark, Category, ReadingHistory
+from .pagination import paginate
+from .recommendations import similar_books as recommended_books
+from .routing import read_replica
+from .views import author_with_stats, catalog_filters, record_book_view
+
+arender = sync_to_async(render)
+categories = sync_to_async(categories_snapshot.get)
+
+
+async def fetch(queryset):
+    """تنفيذ الاستعلام الآن مع إبقائه QuerySet (القوالب تستخدم .count و if عليه)"""
+    async for _ in queryset:
+        pass
+    return queryset
+
+
+@sync_to_async
+def apaginate(request, queryset, per_page, ordering=None):
+    """paginate مع جلب عناصر الصفحة قبل العرض"""
+    page = paginate(request, queryset, per_page, ordering)
+    page.object_list = list(page.object_list)
+    return page
+
+
+@read_replica
+async def home(request):
+    authors = Author.objects.select_related('stats')
+    books = Book.objects.select_related('author')
+    count_book, category_list, featured_authors, featured_books, latest_books, top_rated_books = await asyncio.gather(
+        Book.objects.acount(),
+        # التصنيفات مع عدد الكتب من النسخة المخزنة (يعرضها القالب عبر categories_context)
+        categories(),
+        fetch(authors.filter(is_featured=True)[:4]),
+        fetch(books.filter(is_featured=True)[:8]),
+        fetch(books.order_by('-created_at')[:8]),
+        fetch(books.filter(review_count__gt=0, avg_rating__gte=4).order_by('-avg_rating', '-review_count')[:8]),
+    )
+    if not featured_authors:
+        featured_authors = await fetch(authors.order_by('-stats__books_count')[:4])
+
+    context = {
+        'featured_books': featured_books,
+        'latest_books': latest_books,
+        'top_rated_books': top_rated_books,
+        'count_book': count_book,
+        'count_book_cat': len(category_list),
+        'featured_authors': [author_with_stats(author) for author in featured_authors],
+    }
+    return await arender(request, 'home.html', context)
+
+
+@read_replica
+async def all_authors(request):
+    """عرض جميع المؤلفين"""
+    authors = Author.objects.select_related('stats')
+    search_query = request.GET.get('q', '')
+    if search_query:
+        authors = authors.filter(
+            Q(name__icontains=search_query) |
+            Q(specialization__icontains=search_query) |
+            Q(bio__icontains=search_query)
+        )
+
+    page_obj = await apaginate(request, authors, 12, (F('stats__books_count').desc(nulls_last=True), '-id'))
+    total_authors = await sync_to_async(lambda: page_obj.paginator.count)()
+    context = {
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'total_authors': total_authors,
+    }
+    return await arender(request, 'authors/list.html', context)
+
+
+@read_replica
+async def author_books(request, author_id):
+    author, page_obj = await asyncio.gather(
+        aget_object_or_404(Author.objects.select_related('stats'), id=author_id),
+        apaginate(request, Book.objects.filter(author_id=author_id).select_related('category'), 12, ('-created_at', '-id')),
+    )
+    stats = author.get_stats()
+    context = {
+        'author': author,
+        'page_obj': page_obj,
+        'books_count': stats.books_count if stats else await author.books.acount(),
+    }
+    return await arender(request, 'authors/books.html', context)
+
+
+@read_replica
+async def author_detail(request, author_id):
+    """تفاصيل المؤلف"""
+    author = await aget_object_or_404(Author.objects.select_related('stats'), id=author_id)
+    stats = author.get_stats() or AuthorStats(author=author)
+    books, featured_books = await asyncio.gather(
+        fetch(author.books.all()),
+        fetch(author.books.filter(is_featured=True)[:4]),
+    )
+    context = {
+        'author': author,
+        'books': books,
+        'featured_books': featured_books,
+        'total_pages': stats.total_pages,
+        'total_downloads': stats.total_downloads,
+        'total_views': stats.total_views,
+        'books_count': stats.books_count,
+    }
+    return await arender(request, 'authors/detail.html', context)
+
+
+@read_replica
+async def book_list(request):
+    books = Book.objects.select_related('category', 'author').order_by('-created_at', '-id')
+
+    category_slug = request.GET.get('category')
+    current_category = None
+    if category_slug:
+        current_category = await aget_object_or_404(Category, slug=category_slug)
+        books = books.filter(category=current_category)
+
+    # البحث يسأل فهرس البحث مباشرة (اتصال متزامن)
+    books = await sync_to_async(catalog_filters)(books, request.GET)
+    query = request.GET.get('q')
+    books_page, free_books_count, featured_books_count, category_list, languages = await asyncio.gather(
+        apaginate(request, books, 12, None if query else ('-created_at', '-id')),
+        Book.objects.filter(is_free=True).acount(),
+        Book.objects.filter(is_featured=True).acount(),
+        categories(),
+        fetch(Book.objects.values_list('language', flat=True).order_by('language').distinct()),
+    )
+
+    context = {
+        'books': books_page,
+        'languages': languages,
+        'current_category': current_category,
+        'current_query': query,
+        'current_price': request.GET.get('price'),
+        'current_language': request.GET.get('language'),
+        'free_books_count': free_books_count,
+        'featured_books_count': featured_books_count,
+        'categories_count': len(category_list),
+    }
+    return await arender(request, 'books/list.html', context)
+
+
+@read_replica
+async def book_detail(request, slug):
+    book, user = await asyncio.gather(aget_object_or_404(Book, slug=slug), request.auser())
+    # المخازن المؤجلة تكتب فوراً إذا كانت فترتها 0
+    await sync_to_async(record_book_view)(user, book)
+
+    queries = [
+        fetch(book.reviews.select_related('user').order_by('-created_at')),
+        # المقترحات المحسوبة دورياً من تفاعلات القراء، مع إكمالها من نفس التصنيف
+        sync_to_async(recommended_books)(book, limit=4),
+    ]
+    if user.is_authenticated:
+        queries += [
+            Bookmark.objects.filter(user=user, book=book).aexists(),
+            ReadingHistory.objects.filter(user=user, book=book).afirst(),
+        ]
+    reviews, similar_books, *personal = await asyncio.gather(*queries)
+    is_bookmarked, reading_progress = personal or (False, None)
+
+    context = {
+        'book': book,
+        'reviews': reviews,
+        'similar_books': similar_books,
+        'is_bookmarked': is_bookmarked,
+        'reading_progress': reading_progress,
+        'review_form': ReviewForm(),
+        'ratings_data': book.ratings_histogram(),
+        'total_reviews': book.review_count,
+    }
+    return await arender(request, 'books/detail.html', context)
+
+
+@read_replica
+async def books_by_category(request, slug):
+    category = await aget_object_or_404(Category, slug=slug)
+    page_obj = await apaginate(request, Book.objects.filter(category=category).select_related('author'), 12, ('-created_at', '-id'))
+    context = {
+        'category': category,
+        'page_obj': page_obj,
+        'features': category.features.split(",") if category.features else [],
+    }
+    return await arender(request, 'books/category.html', context)
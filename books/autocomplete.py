@@ -0,0 +1,359 @@
+"""
+فهرس الإكمال التلقائي في الذاكرة (لكل عامل) لعناوين الكتب وأسماء المؤلفين والتصنيفات.
+
+- البحث بالبادئة عبر قائمة كلمات مرتبة (bisect).
+- التسامح مع الأخطاء الإملائية عبر فهرس الثلاثيات (trigrams).
+- لا يلمس قاعدة البيانات أثناء الاستعلام؛ يُحمَّل مرة واحدة ثم يُحدَّث تزايدياً
+  عبر الإشارات، وتعيد العمليات الأخرى تحميله في الخلفية عند تغير رقم الإصدار المشترك.
+- رقم الإصدار المشترك يُقرأ مرة كل CACHE_VERSION_CHECK_INTERVAL ثانية على الأكثر، لا في كل طلب.
+"""
+import bisect
+import heapq
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connections
+from django.urls import NoReverseMatch, reverse
+from django.utils.http import urlencode
+
+from .caching import bump_version, get_version, version_check_interval
+from .search import ARTICLE_RE, TOKEN_RE, normalize_arabic, tokenize
+
+VERSION_KEY = 'autocomplete'
+KIND_ORDER = {'book': 0, 'author': 1, 'category': 2}
+MAX_PREFIX_EXPANSION = 200
+MIN_SIMILARITY = 0.4
+# إذا تجاوز عدد المرشحين هذا الحد نكتفي بأعلى العناصر وزناً لكل كلمة
+MAX_CANDIDATES = 5000
+TRUNCATED_POSTINGS = 200
+# الثلاثيات الأكثر شيوعاً من هذا الحد لا تُستخدم لتوليد المرشحين
+MAX_GRAM_POSTINGS = 500
+MAX_FUZZY_CANDIDATES = 100
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def article_tokens(label):
+    """كلمات العنوان التي تبدأ بأداة التعريف كما هي، فتطابق البادئة «ال» و«الق» أثناء
+    الكتابة قبل أن يبقى بعد الأداة حرفان فتُحذف من الكلمة الأخيرة"""
+    return {word for word in TOKEN_RE.findall(normalize_arabic(label)) if ARTICLE_RE.match(word)}
+
+
+def safe_url(name, fallback_query, **kwargs):
+    try:
+        return reverse(name, kwargs=kwargs)
+    except NoReverseMatch:
+        return f"{reverse('book_list')}?{urlencode({'q': fallback_query})}"
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self.entries = {}
+        self._entry_tokens = {}
+        self._postings = defaultdict(set)
+        self._trigrams = defaultdict(set)
+        self._sorted_tokens = []
+        self._ranked = {}
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.version = None
+        self._reloading = False
+        # موعد إعادة قراءة رقم الإصدار المشترك (time.monotonic)
+        self._recheck_at = 0
+        # أثناء التحميل الكامل تُرتَّب الكلمات مرة واحدة في النهاية
+        self._building = False
+
+    # ---------- البناء والتحديث ----------
+
+    def add(self, kind, pk, label, subtitle='', url='', weight=0):
+        key = (kind, pk)
+        with self._lock:
+            self._remove_tokens(key)
+            stripped = set(tokenize(label))
+            tokens = stripped | article_tokens(label)
+            self.entries[key] = {
+                'type': kind,
+                'id': pk,
+                'label': label,
+                'subtitle': subtitle or '',
+                'url': url,
+                'weight': weight or 0,
+            }
+            self._entry_tokens[key] = tokens
+            for token in tokens:
+                if token not in self._postings and not self._building:
+                    bisect.insort(self._sorted_tokens, token)
+                if token in stripped:
+                    # الأخطاء الإملائية تُطابق على الكلمات بدون أداة التعريف فقط، فلا تتشابه
+                    # كل الكلمات المعرّفة بثلاثيات «ال» المشتركة
+                    for gram in trigrams(token):
+                        self._trigrams[gram].add(token)
+                self._postings[token].add(key)
+                self._ranked.pop(token, None)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            key = (kind, pk)
+            self._remove_tokens(key)
+            self.entries.pop(key, None)
+
+    def _remove_tokens(self, key):
+        for token in self._entry_tokens.pop(key, ()):
+            keys = self._postings.get(token)
+            if keys is None:
+                continue
+            keys.discard(key)
+            self._ranked.pop(token, None)
+            if not keys:
+                del self._postings[token]
+                i = bisect.bisect_left(self._sorted_tokens, token)
+                if i < len(self._sorted_tokens) and self._sorted_tokens[i] == token:
+                    del self._sorted_tokens[i]
+                for gram in trigrams(token):
+                    self._trigrams[gram].discard(token)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._entry_tokens.clear()
+            self._postings.clear()
+            self._trigrams.clear()
+            self._sorted_tokens = []
+            self._ranked.clear()
+
+    def bulk_load(self, entries):
+        """بناء الفهرس من مجموعة عناصر دفعة واحدة (ترتيب الكلمات مرة واحدة في النهاية)"""
+        with self._lock:
+            self._building = True
+            try:
+                for entry in entries:
+                    self.add(*entry)
+            finally:
+                self._building = False
+            self._sorted_tokens = sorted(self._postings)
+            for token, keys in self._postings.items():
+                if len(keys) > MAX_CANDIDATES:
+                    self._ranked_postings(token)
+
+    # ---------- الاستعلام ----------
+
+    def _prefix_tokens(self, prefix):
+        i = bisect.bisect_left(self._sorted_tokens, prefix)
+        matches = {}
+        while i < len(self._sorted_tokens) and len(matches) < MAX_PREFIX_EXPANSION:
+            token = self._sorted_tokens[i]
+            if not token.startswith(prefix):
+                break
+            matches[token] = 1.0 if token == prefix else 0.9
+            i += 1
+        return matches
+
+    def _fuzzy_tokens(self, token):
+        grams = trigrams(token)
+        postings = sorted(
+            (self._trigrams[gram] for gram in grams if self._trigrams.get(gram)), key=len
+        )
+        if not postings:
+            return {}
+        # نولّد المرشحين من الثلاثيات النادرة فقط ثم نحسب التشابه بدقة
+        rare = [tokens for tokens in postings if len(tokens) <= MAX_GRAM_POSTINGS] or postings[:1]
+        counts = defaultdict(int)
+        for tokens in rare:
+            for candidate in tokens:
+                if abs(len(candidate) - len(token)) <= 2:
+                    counts[candidate] += 1
+        matches = {}
+        for candidate in heapq.nlargest(MAX_FUZZY_CANDIDATES, counts, key=counts.get):
+            candidate_grams = trigrams(candidate)
+            # معامل Dice بين مجموعتي الثلاثيات
+            similarity = 2 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            if similarity >= MIN_SIMILARITY:
+                matches[candidate] = similarity * 0.8
+        return matches
+
+    def _ranked_postings(self, token):
+        """عناصر الكلمة مرتبة حسب النوع ثم الوزن (مخزنة حتى تتغير الكلمة)"""
+        ranked = self._ranked.get(token)
+        if ranked is None:
+            ranked = sorted(
+                self._postings.get(token, ()),
+                key=lambda key: (KIND_ORDER[key[0]], -self.entries[key]['weight']),
+            )
+            self._ranked[token] = ranked
+        return ranked
+
+    def _token_matches(self, token, is_last, limit):
+        # البادئة للكلمة الأخيرة فقط (ما زال المستخدم يكتبها)
+        matches = self._prefix_tokens(token) if is_last else (
+            {token: 1.0} if token in self._postings else {}
+        )
+        # التسامح مع الأخطاء فقط إذا لم تكفِ نتائج البادئة
+        if len(token) >= 3 and sum(len(self._postings[c]) for c in matches) < limit:
+            for candidate, similarity in self._fuzzy_tokens(token).items():
+                matches.setdefault(candidate, similarity)
+        return matches
+
+    def search(self, query, limit=8):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            per_token = [
+                self._token_matches(token, position == len(tokens) - 1, limit)
+                for position, token in enumerate(tokens)
+            ]
+            if not all(per_token):
+                return []
+            # نبدأ بالكلمة الأكثر انتقائية ثم نصفّي نتائجها بباقي الكلمات
+            per_token.sort(key=lambda matches: sum(len(self._postings[c]) for c in matches))
+            first, rest = per_token[0], per_token[1:]
+
+            scores = {}
+            large = sum(len(self._postings[c]) for c in first) > MAX_CANDIDATES
+            for candidate, similarity in first.items():
+                keys = self._ranked_postings(candidate)[:TRUNCATED_POSTINGS] if large \
+                    else self._postings[candidate]
+                for key in keys:
+                    if similarity > scores.get(key, 0):
+                        scores[key] = similarity
+
+            for matches in rest:
+                ordered = sorted(matches.items(), key=lambda item: -item[1])
+                filtered = {}
+                for key, score in scores.items():
+                    for candidate, similarity in ordered:
+                        if key in self._postings[candidate]:
+                            filtered[key] = score + similarity
+                            break
+                scores = filtered
+                if not scores:
+                    return []
+
+            ranked = heapq.nsmallest(
+                limit,
+                scores.items(),
+                key=lambda item: (
+                    -item[1],
+                    KIND_ORDER[item[0][0]],
+                    -self.entries[item[0]]['weight'],
+                ),
+            )
+            return [
+                {k: v for k, v in self.entries[key].items() if k != 'weight'}
+                for key, _ in ranked
+            ]
+
+    # ---------- المزامنة مع قاعدة البيانات ----------
+
+    def load(self):
+        """تحميل الفهرس كاملاً من قاعدة البيانات"""
+        version = current_version()
+        fresh = AutocompleteIndex()
+        fresh.bulk_load(catalog_entries())
+
+        with self._lock:
+            self.entries = fresh.entries
+            self._entry_tokens = fresh._entry_tokens
+            self._postings = fresh._postings
+            self._trigrams = fresh._trigrams
+            self._sorted_tokens = fresh._sorted_tokens
+            self._ranked = fresh._ranked
+            self.loaded = True
+            self.version = version
+
+    def ensure_fresh(self):
+        """التحميل عند أول استخدام، وإعادة التحميل في الخلفية إذا غيّرت عملية أخرى الكتالوج"""
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load()
+            return
+        now = time.monotonic()
+        if now < self._recheck_at:
+            return
+        self._recheck_at = now + version_check_interval()
+        if current_version() != self.version and not self._reloading:
+            self._reloading = True
+            threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def _background_reload(self):
+        try:
+            self.load()
+        finally:
+            self._reloading = False
+            connections.close_all()
+
+
+def catalog_entries():
+    from .models import Author, Book, Category
+
+    books = Book.objects.select_related('author').only(
+        'pk', 'title', 'slug', 'views', 'author__name', 'author_name'
+    )
+    for book in books.iterator(chunk_size=2000):
+        yield book_entry(book)
+    for author in Author.objects.select_related('stats').iterator(chunk_size=2000):
+        yield author_entry(author)
+    for category in Category.objects.iterator(chunk_size=2000):
+        yield category_entry(category)
+
+
+def book_entry(book):
+    author = book.author.name if book.author_id else (book.author_name or '')
+    return ('book', book.pk, book.title, author,
+            safe_url('book_detail', book.title, slug=book.slug), book.views)
+
+
+def author_entry(author):
+    stats = author.get_stats()
+    return ('author', author.pk, author.name, author.specialization or '',
+            safe_url('author_detail', author.name, author_id=author.pk),
+            stats.books_count if stats else 0)
+
+
+def category_entry(category):
+    return ('category', category.pk, category.name, '',
+            safe_url('books_by_category', category.name, slug=category.slug), 0)
+
+
+def current_version():
+    return get_version(VERSION_KEY)
+
+
+def bump_catalog_version():
+    """إبلاغ العمليات الأخرى بتغير الكتالوج"""
+    in_sync = autocomplete_index.version == current_version()
+    version = bump_version(VERSION_KEY)
+    # الفهرس المحلي مُحدَّث تزايدياً، فلا داعي لإعادة تحميله إلا إذا فاتته تغييرات أخرى
+    if autocomplete_index.loaded and in_sync:
+        autocomplete_index.version = version
+
+
+def refresh_entries(kind, pks):
+    """تحديث عناصر محددة في فهرس هذه العملية ثم رفع رقم الإصدار المشترك"""
+    from .models import Author, Book, Category
+
+    if autocomplete_index.loaded:
+        if kind == 'book':
+            objects = Book.objects.filter(pk__in=pks).select_related('author')
+            build = book_entry
+        elif kind == 'author':
+            objects = Author.objects.filter(pk__in=pks).select_related('stats')
+            build = author_entry
+        else:
+            objects = Category.objects.filter(pk__in=pks)
+            build = category_entry
+        found = set()
+        for obj in objects:
+            autocomplete_index.add(*build(obj))
+            found.add(obj.pk)
+        for pk in set(pks) - found:
+            autocomplete_index.remove(kind, pk)
+    bump_catalog_version()
+
+
+autocomplete_index = AutocompleteIndex()
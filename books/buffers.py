@@ -0,0 +1,226 @@
+"""
+أساس المخازن المؤقتة بأسلوب الكتابة المؤجلة (write-behind).
+
+يجمع كل مخزن العمليات الصغيرة في ذاكرة العملية، ويكتبها خيط خلفي دفعة واحدة
+كل فترة (أو عند امتلاء المخزن)، وتُكتب جميع المخازن عند إغلاق العملية.
+
+الدفعة التي فشلت كتابتها تعود إلى المخزن لتُعاد مع الدفعة التالية، ما لم يتجاوز المخزن
+max_pending_factor ضعف حد الامتلاء فتُسقط ويُسجل عددها، فلا تنمو الذاكرة أثناء انقطاع طويل.
+
+مع DB_SERIALIZE_WRITES (وضع SQLite للإنتاج) يكتب كل المخازن خيط واحد بالتتابع،
+وأي كتابة فورية تنتظر دورها، فلا تتنافس كتابات العملية الواحدة على قفل الملف.
+"""
+import atexit
+import logging
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakSet()
+# قفل الكتابة المشترك بين المخازن في وضع الكاتب الواحد
+_write_lock = threading.Lock()
+
+
+def serialize_writes():
+    return getattr(settings, 'DB_SERIALIZE_WRITES', False)
+
+
+class WriteBehindBuffer:
+    # أسماء الإعدادات التي تحدد فترة الكتابة وحد الامتلاء (0 يعني الكتابة الفورية)
+    interval_setting = None
+    threshold_setting = None
+    default_interval = 5
+    default_threshold = 1000
+    max_pending_factor = 10
+    name = 'buffer'
+
+    def __init__(self, flush_interval=None, flush_threshold=None):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = self.empty()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        # عدد العمليات التي أُسقطت بعد فشل كتابتها
+        self.dropped = 0
+        _buffers.add(self)
+
+    @property
+    def interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, self.interval_setting or '', self.default_interval)
+
+    @property
+    def threshold(self):
+        if self.flush_threshold is not None:
+            return self.flush_threshold
+        return getattr(settings, self.threshold_setting or '', self.default_threshold)
+
+    @property
+    def max_pending(self):
+        return max(self.threshold, 1) * self.max_pending_factor
+
+    # ---------- ما يحدده كل مخزن ----------
+
+    def empty(self):
+        """بنية فارغة لتجميع العمليات"""
+        raise NotImplementedError
+
+    def merge(self, pending):
+        """إعادة دفعة فشلت كتابتها إلى المخزن الحالي"""
+        raise NotImplementedError
+
+    def write(self, pending):
+        """كتابة دفعة إلى قاعدة البيانات"""
+        raise NotImplementedError
+
+    # ---------- الآلية المشتركة ----------
+
+    def record(self, update):
+        """تطبيق update(pending) تحت القفل ثم جدولة الكتابة"""
+        with self._lock:
+            update(self._pending)
+            self._size += 1
+            full = self._size >= self.threshold
+        if self.interval <= 0:
+            self.flush()
+            return
+        if serialize_writes():
+            serial_writer.ensure_running()
+            if full:
+                serial_writer.wake()
+            return
+        self._ensure_flusher()
+        if full:
+            self._wakeup.set()
+
+    def is_full(self):
+        return self._size >= self.threshold
+
+    def peek(self, read):
+        """قراءة المخزن تحت القفل دون تعديله"""
+        with self._lock:
+            return read(self._pending)
+
+    def flush(self):
+        """كتابة كل ما تراكم؛ يعيد عدد العمليات المكتوبة"""
+        with self._flush_lock:
+            with self._lock:
+                pending, size = self._pending, self._size
+                self._pending = self.empty()
+                self._size = 0
+            if not size:
+                return 0
+            try:
+                with _write_lock if serialize_writes() else nullcontext():
+                    self.write(pending)
+            except Exception:
+                with self._lock:
+                    retained = self._size + size <= self.max_pending
+                    if retained:
+                        # نعيد العمليات إلى المخزن حتى لا تضيع عند فشل الكتابة
+                        self.merge(pending)
+                        self._size += size
+                    else:
+                        self.dropped += size
+                if retained:
+                    logger.exception('تعذرت كتابة المخزن المؤجل %s', self.name)
+                else:
+                    logger.exception(
+                        'تعذرت كتابة المخزن المؤجل %s، وأُسقطت %d عملية (الحد %d)', self.name, size, self.max_pending
+                    )
+                raise
+            return size
+
+    def _ensure_flusher(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+            finally:
+                # اتصالات قاعدة البيانات خاصة بهذا الخيط
+                connections.close_all()
+
+
+class SerialWriter:
+    """خيط كتابة واحد للعملية يكتب كل مخزن عند حلول موعده أو امتلائه"""
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._due = weakref.WeakKeyDictionary()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def ensure_running(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='serial-writer', daemon=True)
+            self._thread.start()
+
+    def flush_due(self):
+        """كتابة المخازن التي حل موعدها أو امتلأت؛ يعيد موعد أقرب كتابة تالية"""
+        now = time.monotonic()
+        for buffer in list(_buffers):
+            if buffer.interval <= 0:
+                continue
+            due = self._due.setdefault(buffer, now + buffer.interval)
+            if now < due and not buffer.is_full():
+                continue
+            try:
+                buffer.flush()
+            except Exception:
+                pass
+            self._due[buffer] = time.monotonic() + buffer.interval
+        return min(self._due.values(), default=now + 1)
+
+    def _run(self):
+        while True:
+            try:
+                next_due = self.flush_due()
+            finally:
+                # اتصالات قاعدة البيانات خاصة بهذا الخيط
+                connections.close_all()
+            self._wakeup.wait(max(0, next_due - time.monotonic()))
+            self._wakeup.clear()
+
+
+serial_writer = SerialWriter()
+
+
+def flush_all():
+    """كتابة جميع المخازن المؤجلة (عند إغلاق العملية أو العامل)"""
+    for buffer in list(_buffers):
+        try:
+            buffer.flush()
+        except Exception:
+            logger.exception('تعذرت كتابة المخزن المؤجل %s عند الإغلاق', buffer.name)
+
+
+atexit.register(flush_all)
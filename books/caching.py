@@ -0,0 +1,74 @@
+"""
+أدوات تخزين مؤقت بأرقام إصدار مشتركة.
+
+كل مجموعة بيانات لها مفتاح إصدار في الذاكرة المشتركة (CACHES)؛ رفع الإصدار
+يُبطل جميع النسخ المخزنة في كل العمليات دون الحاجة لحذفها واحدة واحدة.
+
+لا يُقرأ مفتاح الإصدار في كل طلب: تعيد كل عملية قراءته كل CACHE_VERSION_CHECK_INTERVAL
+ثانية على الأكثر، فيصل الإبطال إلى العمال الآخرين خلال هذه المدة، وإلى العملية التي
+أبطلت النسخة فوراً.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routing import primary_reads
+
+
+def version_check_interval():
+    return getattr(settings, 'CACHE_VERSION_CHECK_INTERVAL', 5)
+
+
+def get_version(key):
+    return cache.get(f'books:version:{key}', 0)
+
+
+def bump_version(key):
+    version_key = f'books:version:{key}'
+    # add لا يكتب فوق إصدار رفعه عامل آخر، و incr ذرية في Redis و Memcached
+    cache.add(version_key, 0, None)
+    try:
+        return cache.incr(version_key)
+    except ValueError:
+        # انتهت صلاحية المفتاح أو حُذف بين add و incr
+        cache.set(version_key, 1, None)
+        return 1
+
+
+class VersionedSnapshot:
+    """نسخة محلية في ذاكرة العملية + نسخة في الذاكرة المشتركة، تُبنى من جديد عند تغير الإصدار أو انتهاء المدة"""
+
+    def __init__(self, key, build, timeout=3600):
+        self.key = key
+        self.build = build
+        self.timeout = timeout
+        self._local = (None, None, 0)
+        # موعد إعادة قراءة رقم الإصدار المشترك (time.monotonic)
+        self._recheck_at = 0
+
+    def get(self):
+        now = time.monotonic()
+        local_version, data, expires = self._local
+        if now < self._recheck_at and now < expires:
+            return data
+
+        version = get_version(self.key)
+        self._recheck_at = now + version_check_interval()
+        if local_version == version and now < expires:
+            return data
+
+        cache_key = f'books:snapshot:{self.key}:{version}'
+        data = cache.get(cache_key)
+        if data is None:
+            # من الرئيسية: نسخة بُنيت من نسخة متماثلة متأخرة ستُخزن بالإصدار الجديد
+            with primary_reads():
+                data = self.build()
+            cache.set(cache_key, data, self.timeout)
+        self._local = (version, data, now + self.timeout)
+        return data
+
+    def invalidate(self):
+        bump_version(self.key)
+        # العملية التي غيرت البيانات لا تنتظر موعد إعادة القراءة
+        self._local = (None, None, 0)
@@ -1,6 +1,20 @@
+from django.db.models import Count
+from django.utils.functional import SimpleLazyObject
+
+from .caching import VersionedSnapshot
 from .models import Category
 
+
+def build_categories():
+    return list(Category.objects.annotate(books_count=Count('books')))
+
+
+# التصنيفات مع عدد كتب كل تصنيف، تُبطل عند حفظ أو حذف تصنيف أو كتاب
+categories_snapshot = VersionedSnapshot('categories', build_categories)
+
+
 def categories_context(request):
+    # لا تُحسب إلا إذا استخدمها القالب فعلاً
     return {
-        'categories': Category.objects.all(),
-    }
\ No newline at end of file
+        'categories': SimpleLazyObject(categories_snapshot.get),
+    }
@@ -0,0 +1,174 @@
+"""
+تحميل ملفات PDF للكتب عبر روابط موقعة مؤقتة.
+
+- الرابط يحمل توقيعاً (TimestampSigner) على الكتاب واسم الملف، وينتهي بعد
+  DOWNLOAD_URL_MAX_AGE ثانية، ويتغير تلقائياً إذا استُبدل الملف.
+- يدعم طلبات Range (استكمال التحميل والتنقل داخل الملف) وETag قوياً مع If-Range.
+- مع DOWNLOAD_SENDFILE_BACKEND = 'nginx' أو 'apache' يُسلَّم الملف لخادم الويب
+  (X-Accel-Redirect / X-Sendfile) فلا ينشغل عامل gunicorn بنقل البايتات.
+- التحميل يُعد عبر عدادات الكتابة المؤجلة (increment_downloads) دون كتابة فورية.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import content_disposition_header, http_date, parse_etags, quote_etag
+
+SIGNER_SALT = 'books.downloads'
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def max_age():
+    return getattr(settings, 'DOWNLOAD_URL_MAX_AGE', 3600)
+
+
+def _signer():
+    return signing.TimestampSigner(salt=SIGNER_SALT)
+
+
+def _payload(book):
+    return f'{book.pk}:{book.pdf_file.name}'
+
+
+def signed_url(book, inline=False):
+    """رابط تحميل موقع ينتهي بعد DOWNLOAD_URL_MAX_AGE ثانية"""
+    # نكتفي بالطابع الزمني والتوقيع في الرابط، فالكتاب والملف معروفان من المسار
+    token = ':'.join(_signer().sign(_payload(book)).rsplit(':', 2)[1:])
+    url = reverse('book_pdf', kwargs={'slug': book.slug}) + f'?token={quote(token)}'
+    return url + '&inline=1' if inline else url
+
+
+def verify(book, token):
+    """هل الرمز صالح لهذا الكتاب وهذا الملف ولم تنتهِ صلاحيته؟"""
+    if not token:
+        return False
+    try:
+        _signer().unsign(f'{_payload(book)}:{token}', max_age=max_age())
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def file_info(field):
+    """الحجم ووقت التعديل وETag قوي (من اسم الملف وحجمه ووقت تعديله)"""
+    storage = field.storage
+    size = storage.size(field.name)
+    try:
+        modified = storage.get_modified_time(field.name).timestamp()
+    except NotImplementedError:
+        modified = 0
+    etag = hashlib.md5(f'{field.name}:{size}:{modified}'.encode()).hexdigest()
+    return size, modified, quote_etag(etag)
+
+
+def parse_range(header, size):
+    """(البداية، النهاية) لنطاق واحد، أو None لإرسال الملف كاملاً
+
+    ترفع ValueError للنطاق غير القابل للتحقيق (416). النطاقات المتعددة تُتجاهل
+    ويُرسل الملف كاملاً كما يسمح المعيار.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: آخر N بايت
+        length = int(last)
+        if length == 0:
+            raise ValueError('نطاق فارغ')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('نطاق خارج حجم الملف')
+    return start, end
+
+
+def _read_range(field, start, end):
+    with field.storage.open(field.name, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _sendfile(field):
+    """استجابة فارغة يكمل خادم الويب إرسالها (يتولى Range بنفسه)"""
+    backend = getattr(settings, 'DOWNLOAD_SENDFILE_BACKEND', '')
+    response = HttpResponse()
+    if backend == 'nginx':
+        prefix = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field.name)
+    elif backend == 'apache':
+        response['X-Sendfile'] = field.storage.path(field.name)
+    else:
+        return None
+    # يترك نوع المحتوى لخادم الويب بدل text/html الافتراضي
+    del response['Content-Type']
+    return response
+
+
+def pdf_response(request, book, inline=False):
+    """استجابة ملف الكتاب مع Range وETag؛ تعيد (الاستجابة، هل يُحسب تحميلاً)"""
+    field = book.pdf_file
+    size, modified, etag = file_info(field)
+    filename = os.path.basename(field.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    def finish(response):
+        response['ETag'] = etag
+        if modified:
+            response['Last-Modified'] = http_date(modified)
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Disposition'] = content_disposition_header(not inline, filename)
+        # الرابط موقع ومؤقت: لا يُخزن في ذاكرات التخزين المشتركة
+        response['Cache-Control'] = f'private, max-age={max_age()}'
+        return response
+
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        return finish(HttpResponse(status=304)), False
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return finish(response), False
+
+    # الطلبات التي تكمل تحميلاً سابقاً أو تتنقل داخل الملف لا تُحسب تحميلاً جديداً
+    counted = request.method == 'GET' and (byte_range is None or byte_range[0] == 0)
+
+    response = _sendfile(field)
+    if response is not None:
+        return finish(response), counted
+
+    if byte_range is None:
+        response = FileResponse(field.storage.open(field.name, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+        return finish(response), counted
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(field, start, end), status=206, content_type=content_type
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    return finish(response), counted
@@ -0,0 +1,249 @@
+"""
+تصدير بيانات لوحة التحكم (الكتب، المستخدمون، المراجعات، سجل القراءة، النشاط) بصيغة CSV أو JSONL.
+
+- تُقرأ الصفوف بـ values_list().iterator(chunk_size) فلا يُحمَّل الجدول في الذاكرة
+  ولا تُنشأ كائنات النماذج، وتُرسل للعميل دفعة بعد دفعة بـ StreamingHttpResponse.
+- تصفية الكتب والمستخدمين هي نفسها المستخدمة في صفحتي لوحة التحكم.
+- الترتيب بالمفتاح الأساسي ما لم يُطلب غيره، ليُقرأ الجدول بترتيب فهرسه دون فرز.
+"""
+import csv
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .search import FALLBACK_FIELDS, search_books
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+BOOK_SORTS = ('title', '-title', '-created_at', '-views', '-downloads')
+# بداية خلية قد يفسرها Excel كمعادلة
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def filter_books(books, params):
+    """تصفية الكتب وترتيبها كما في صفحة إدارة الكتب"""
+    search_query = params.get('search', '')
+    category_filter = params.get('category', '')
+    status_filter = params.get('status', '')
+    sort_by = params.get('sort', '-created_at')
+
+    if search_query:
+        books = search_books(books, search_query, fallback_fields=FALLBACK_FIELDS + ('category__name',))
+
+    if category_filter:
+        if not category_filter.isdigit():
+            raise ValueError('التصنيف غير صالح')
+        books = books.filter(category_id=category_filter)
+
+    if status_filter == 'free':
+        books = books.filter(is_free=True)
+    elif status_filter == 'paid':
+        books = books.filter(is_free=False)
+    elif status_filter == 'featured':
+        books = books.filter(is_featured=True)
+
+    # الترتيب (نتائج البحث تبقى مرتبة حسب الصلة ما لم يُطلب ترتيب صريح)
+    if sort_by in BOOK_SORTS and (not search_query or 'sort' in params):
+        books = books.order_by(sort_by)
+    return books
+
+
+def filter_users(users, params):
+    """تصفية المستخدمين كما في صفحة إدارة المستخدمين"""
+    search_query = params.get('search', '')
+    role_filter = params.get('role', '')
+
+    if search_query:
+        users = users.filter(
+            Q(username__icontains=search_query) |
+            Q(email__icontains=search_query) |
+            Q(first_name__icontains=search_query) |
+            Q(last_name__icontains=search_query)
+        )
+
+    if role_filter == 'staff':
+        users = users.filter(is_staff=True)
+    elif role_filter == 'active':
+        users = users.filter(is_active=True)
+    elif role_filter == 'inactive':
+        users = users.filter(is_active=False)
+    return users
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'تاريخ غير صالح في {name}: استخدم YYYY-MM-DD')
+
+
+def filter_records(queryset, params, date_field):
+    """تصفية المراجعات وسجل القراءة والنشاط حسب المستخدم والكتاب والمدى الزمني"""
+    if params.get('user'):
+        queryset = queryset.filter(user__username=params['user'])
+    if params.get('book'):
+        if not params['book'].isdigit():
+            raise ValueError('الكتاب غير صالح')
+        queryset = queryset.filter(book_id=params['book'])
+    # المدى بالأيام المحلية شاملاً يومي البداية والنهاية
+    tz = timezone.get_current_timezone()
+    if params.get('start'):
+        start = datetime.combine(_parse_date(params['start'], 'start'), time.min, tz)
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if params.get('end'):
+        end = datetime.combine(_parse_date(params['end'], 'end'), time.max, tz)
+        queryset = queryset.filter(**{f'{date_field}__lte': end})
+    return queryset
+
+
+def export_books(params):
+    from .models import Book
+
+    books = filter_books(Book.objects.order_by('pk'), params).annotate(
+        author_label=Coalesce('author__name', 'author_name')
+    )
+    return books, (
+        ('id', 'pk'), ('title', 'title'), ('slug', 'slug'), ('author', 'author_label'),
+        ('category', 'category__name'), ('published_year', 'published_year'), ('pages', 'pages'),
+        ('language', 'language'), ('price', 'price'), ('is_free', 'is_free'), ('is_featured', 'is_featured'),
+        ('views', 'views'), ('downloads', 'downloads'), ('avg_rating', 'avg_rating'),
+        ('review_count', 'review_count'), ('created_at', 'created_at'),
+    )
+
+
+def export_users(params):
+    from django.contrib.auth.models import User
+
+    return filter_users(User.objects.order_by('pk'), params), (
+        ('id', 'pk'), ('username', 'username'), ('email', 'email'), ('first_name', 'first_name'),
+        ('last_name', 'last_name'), ('is_active', 'is_active'), ('is_staff', 'is_staff'),
+        ('date_joined', 'date_joined'), ('last_login', 'last_login'),
+    )
+
+
+def export_reviews(params):
+    from .models import Review
+
+    reviews = filter_records(Review.objects.order_by('pk'), params, 'created_at')
+    if params.get('rating'):
+        if params['rating'] not in ('1', '2', '3', '4', '5'):
+            raise ValueError('التقييم غير صالح')
+        reviews = reviews.filter(rating=params['rating'])
+    return reviews, (
+        ('id', 'pk'), ('book_id', 'book_id'), ('book', 'book__title'), ('user', 'user__username'),
+        ('rating', 'rating'), ('comment', 'comment'), ('created_at', 'created_at'),
+    )
+
+
+def export_reading_history(params):
+    from .models import ReadingHistory
+
+    return filter_records(ReadingHistory.objects.order_by('pk'), params, 'last_read'), (
+        ('id', 'pk'), ('user', 'user__username'), ('book_id', 'book_id'), ('book', 'book__title'),
+        ('progress', 'progress'), ('reading_duration_minutes', 'reading_duration_minutes'),
+        ('last_read', 'last_read'),
+    )
+
+
+def export_activity(params):
+    from .models import UserActivity
+
+    activities = UserActivity.objects.order_by('pk')
+    if params.get('book'):
+        raise ValueError('لا يمكن تصفية النشاط حسب الكتاب')
+    activities = filter_records(activities, params, 'visited_at')
+    if params.get('type'):
+        activities = activities.filter(activity_type=params['type'])
+    return activities, (
+        ('id', 'pk'), ('user', 'user__username'), ('activity_type', 'activity_type'),
+        ('details', 'details'), ('visited_at', 'visited_at'),
+    )
+
+
+DATASETS = {
+    'books': export_books,
+    'users': export_users,
+    'reviews': export_reviews,
+    'reading-history': export_reading_history,
+    'activity': export_activity,
+}
+
+
+def json_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    value = json_value(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # منع حقن المعادلات عند فتح الملف في برامج الجداول
+        return "'" + value
+    return value
+
+
+class Echo:
+    """ملف وهمي يعيد ما يُكتب فيه بدل تخزينه (لاستخدام csv.writer مع البث)"""
+
+    def write(self, value):
+        return value
+
+
+def stream_rows(queryset, columns, fmt, size=None):
+    """نص الملف على دفعات: ترويسة ثم دفعة لكل size صف"""
+    size = size or chunk_size()
+    headers = [header for header, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=size)
+
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        # BOM ليتعرف Excel على الترميز (النصوص عربية)
+        yield '\ufeff' + writer.writerow(headers)
+
+        def encode(row):
+            return writer.writerow([csv_value(value) for value in row])
+    else:
+        def encode(row):
+            return json.dumps(
+                {header: json_value(value) for header, value in zip(headers, row)}, ensure_ascii=False
+            ) + '\n'
+
+    batch = []
+    for row in rows:
+        batch.append(encode(row))
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def export_response(dataset, params, fmt='csv'):
+    """StreamingHttpResponse للتصدير؛ ترفع ValueError للتصفية غير الصالحة قبل بدء البث"""
+    queryset, columns = DATASETS[dataset](params)
+    response = StreamingHttpResponse(stream_rows(queryset, columns, fmt), content_type=FORMATS[fmt])
+    filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # بيانات خاصة لا تُخزن، ولا يخزنها nginx قبل إرسالها
+    response['Cache-Control'] = 'no-store'
+    response['X-Accel-Buffering'] = 'no'
+    return response
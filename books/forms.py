@@ -50,12 +50,22 @@ class BookForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'rows': 4}),
             'title': forms.TextInput(attrs={'placeholder': 'أدخل عنوان الكتاب'}),
             'published_year': forms.NumberInput(attrs={'min': '1900', 'max': '2024'}),
-            'pages': forms.NumberInput(attrs={'min': '1'}),
+            'pages': forms.NumberInput(attrs={'min': '1', 'placeholder': 'يُحسب تلقائياً من ملف PDF'}),
             'price': forms.NumberInput(attrs={'step': '0.01'}),
         }
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # عدد الصفحات يُستخرج من ملف PDF إذا تُرك فارغاً
+        self.fields['pages'].required = False
+
     def clean(self):
         cleaned_data = super().clean()
+        if not cleaned_data.get('pages'):
+            if cleaned_data.get('pdf_file') or (self.instance.pk and self.instance.pdf_file):
+                cleaned_data['pages'] = 0
+            else:
+                self.add_error('pages', 'أدخل عدد الصفحات أو ارفع ملف PDF لحسابه تلقائياً')
         is_free = cleaned_data.get('is_free')
         price = cleaned_data.get('price')
         
@@ -64,9 +74,17 @@ class BookForm(forms.ModelForm):
         
         if not is_free and price and float(price) <= 0:
             raise forms.ValidationError('الكتب المدفوعة يجب أن يكون سعرها أكبر من 0 ريال')
-        
+
         return cleaned_data
 
+    def save(self, commit=True):
+        book = super().save(commit=False)
+        if commit:
+            # النموذج لا يعدّل العدادات والتقييمات: لا نكتب فوقها القيم التي حُمّلت معه
+            book.save(keep_derived=True)
+            self._save_m2m()
+        return book
+
 
 
 
@@ -0,0 +1,146 @@
+"""
+نسخ مصغرة ومعاد ترميزها من أغلفة الكتب وصور المؤلفين.
+
+- تُولَّد بعدة عروض وبصيغ AVIF/WebP/JPEG (حسب دعم Pillow) في مجموعة عمليات منفصلة
+  حتى لا يحجز ضغط الصور خيوط الطلبات.
+- تُحفظ أسماء النسخ في حقل JSON بجانب الصورة (cover_variants / avatar_variants)،
+  فلا يحتاج القالب إلى فحص الملفات عند العرض.
+- إذا لم تكن النسخ جاهزة بعد يعرض القالب الصورة الأصلية كما كان.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .workers import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+# النوع: (حقل الصورة، حقل النسخ، العروض بالبكسل)
+KINDS = {
+    'cover': ('cover_image', 'cover_variants', (240, 480, 960)),
+    'avatar': ('avatar', 'avatar_variants', (96, 192, 384)),
+}
+
+# الصيغ بالترتيب المفضل للمتصفح (آخرها الاحتياطية في وسم img)
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 55, 'speed': 8}),
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+pool = ProcessPool('IMAGE_DERIVATIVE_WORKERS')
+
+
+def available_formats():
+    from PIL import features
+
+    wanted = getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', tuple(FORMATS))
+    return [
+        fmt for fmt in FORMATS
+        if fmt in wanted and (fmt == 'jpeg' or features.check(fmt))
+    ]
+
+
+def render_variants(data, widths, formats):
+    """تُنفَّذ في عملية منفصلة: لا تلمس جانغو، تعيد النسخ المرمزة كبايتات"""
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            # الصور الشفافة تُدمج على خلفية بيضاء (تناسب JPEG وتكفي للأغلفة)
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+        width, height = image.size
+
+        files = []
+        # لا نكبّر الصور الصغيرة: أكبر نسخة بعرض الأصل
+        targets = sorted({min(w, width) for w in widths})
+        for target in targets:
+            size = (target, max(1, round(height * target / width)))
+            resized = image if size == image.size else image.resize(size, Image.LANCZOS)
+            for fmt in formats:
+                pil_format, _, options = FORMATS[fmt]
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, **options)
+                files.append((fmt, size[0], size[1], buffer.getvalue()))
+    return {'width': width, 'height': height, 'files': files}
+
+
+def variant_name(source_name, width, fmt):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return f'{directory}/derived/{stem}-{width}.{extension}'
+
+
+def store_variants(source_name, result, storage=None):
+    """حفظ النسخ في التخزين وإعادة البيانات التي تُخزن في حقل JSON"""
+    storage = storage or default_storage
+    variants = {}
+    for fmt, width, height, content in result['files']:
+        name = variant_name(source_name, width, fmt)
+        if storage.exists(name):
+            storage.delete(name)
+        name = storage.save(name, ContentFile(content))
+        variants.setdefault(fmt, []).append([width, height, name])
+    return {
+        'source': source_name,
+        'width': result['width'],
+        'height': result['height'],
+        'variants': variants,
+    }
+
+
+def needs_variants(obj, kind):
+    image_field, variants_field, _ = KINDS[kind]
+    image = getattr(obj, image_field)
+    return bool(image) and (getattr(obj, variants_field) or {}).get('source') != image.name
+
+
+def _save_result(model, pk, kind, source_name, result=None, error=None):
+    _, variants_field, _ = KINDS[kind]
+    try:
+        if error is None:
+            data = store_variants(source_name, result)
+        else:
+            # نحفظ الخطأ حتى لا نعيد المحاولة مع كل حفظ للكائن
+            data = {'source': source_name, 'error': str(error)[:200]}
+        # لا نكتب إذا تغيرت الصورة أثناء المعالجة
+        image_field = KINDS[kind][0]
+        model.objects.filter(pk=pk, **{image_field: source_name}).update(**{variants_field: data})
+        return data
+    except Exception:
+        logger.exception('تعذر حفظ نسخ الصورة %s', source_name)
+
+
+def _read_source(obj, kind):
+    image = getattr(obj, KINDS[kind][0])
+    with image.storage.open(image.name, 'rb') as f:
+        return image.name, f.read()
+
+
+def generate(obj, kind, sync=None):
+    """توليد نسخ صورة الكائن؛ في مجموعة العمليات افتراضياً، أو فوراً إذا sync"""
+    model, pk = type(obj), obj.pk
+    try:
+        source_name, data = _read_source(obj, kind)
+    except (OSError, ValueError) as e:
+        logger.warning('تعذرت قراءة الصورة لتوليد النسخ: %s', e)
+        return None
+
+    def on_done(result, error):
+        return _save_result(model, pk, kind, source_name, result, error)
+
+    return pool.run(render_variants, (data, KINDS[kind][2], available_formats()), on_done, sync)
+
+
+def shutdown():
+    pool.shutdown()
@@ -0,0 +1,389 @@
+"""
+استيراد كتالوج الكتب من ملفات CSV أو JSONL دفعة بعد دفعة.
+
+- تُقرأ السجلات تدفقياً فلا يُحمَّل الملف كله في الذاكرة.
+- المؤلفون والتصنيفات تُحل بالاسم من قواميس في الذاكرة، والناقص منها يُنشأ
+  بـ bulk_create مرة واحدة لكل دفعة.
+- الروابط المختصرة (slug) تُولَّد فريدة في الذاكرة من مجموعة الروابط الموجودة.
+- الكتب الجديدة تُكتب بـ bulk_create، والموجودة (بنفس الـ slug) تُحدَّث بـ bulk_update
+  إذا طُلب التحديث، كل دفعة في معاملة.
+- بعد كل دفعة يُحفظ عدد السجلات المنجزة في ملف تقدم لاستئناف الاستيراد إذا انقطع.
+- bulk_create لا يرسل post_save: فهرس البحث والإكمال التلقائي وإحصائيات المؤلفين
+  تُحدَّث يدوياً لكل دفعة، وتوليد نسخ الأغلفة واستخراج ملفات PDF يتم بأوامرهما.
+"""
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+FORMATS = ('csv', 'jsonl')
+
+# الحقول التي يمكن أن يحددها السجل مباشرة وقيمها الافتراضية للكتب الجديدة
+BOOK_FIELDS = {
+    'description': '',
+    'published_year': None,
+    'pages': 0,
+    'language': 'العربية',
+    'file_format': 'PDF',
+    'price': Decimal('0.00'),
+    'is_free': False,
+    'is_featured': False,
+    'cover_image': None,
+    'pdf_file': None,
+}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'نعم'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'لا', ''}
+
+
+class RecordError(ValueError):
+    """سجل غير صالح؛ يُتخطى ويُبلغ عنه برقمه"""
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if ext in ('csv', 'tsv'):
+        return 'csv'
+    raise ValueError(f'لا يمكن تحديد صيغة الملف {path}؛ حدد csv أو jsonl')
+
+
+def read_records(path, fmt):
+    """(رقم السجل، القاموس) لكل سجل في الملف بالترتيب"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            delimiter = '\t' if path.lower().endswith('.tsv') else ','
+            for number, row in enumerate(csv.DictReader(f, delimiter=delimiter), 1):
+                yield number, row
+            return
+        number = 0
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                row = RecordError(f'JSON غير صالح: {e.msg}')
+            if not isinstance(row, (dict, RecordError)):
+                row = RecordError('يجب أن يكون كل سطر كائن JSON')
+            yield number, row
+
+
+def clean_name(value):
+    return ' '.join(str(value or '').split())
+
+
+def _int(row, field, minimum=0):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        value = int(str(value).strip())
+    except ValueError:
+        raise RecordError(f'{field}: عدد صحيح غير صالح')
+    if value < minimum:
+        raise RecordError(f'{field}: يجب ألا يقل عن {minimum}')
+    return value
+
+
+def _bool(row, field):
+    value = row.get(field)
+    if value is None or isinstance(value, bool):
+        return value
+    value = str(value).strip().casefold()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RecordError(f'{field}: قيمة منطقية غير صالحة')
+
+
+def parse_record(row):
+    """{الحقل: القيمة} من سجل الملف؛ الحقول الغائبة لا تظهر في الناتج (مهم للتحديث)"""
+    if isinstance(row, RecordError):
+        raise row
+    title = clean_name(row.get('title'))
+    if not title:
+        raise RecordError('title: العنوان مطلوب')
+    if len(title) > 200:
+        raise RecordError('title: العنوان أطول من 200 حرف')
+    category = clean_name(row.get('category'))
+    if not category:
+        raise RecordError('category: التصنيف مطلوب')
+
+    record = {
+        'title': title,
+        'slug': slugify(clean_name(row.get('slug')), allow_unicode=True)[:200],
+        'category': category[:100],
+    }
+    # عمود المؤلف الفارغ يفصل الكتاب عن مؤلفه، والغائب يتركه كما هو عند التحديث
+    if 'author' in row and row['author'] is not None:
+        record['author'] = clean_name(row['author'])[:200]
+    for field in ('description', 'language', 'file_format', 'cover_image', 'pdf_file'):
+        if field in row and row[field] is not None:
+            record[field] = str(row[field]).strip()
+    for field in ('cover_image', 'pdf_file'):
+        # مسار الملف داخل MEDIA_ROOT كما يخزنه الحقل
+        if field in record:
+            record[field] = record[field].lstrip('/') or None
+    for field in ('language', 'file_format'):
+        if field in record:
+            record[field] = record[field][:50] or BOOK_FIELDS[field]
+    for field in ('published_year', 'pages'):
+        value = _int(row, field)
+        if value is not None:
+            record[field] = value
+    if 'price' in row and str(row['price'] or '').strip():
+        try:
+            record['price'] = Decimal(str(row['price']).strip()).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise RecordError('price: سعر غير صالح')
+        if record['price'] < 0 or record['price'] >= Decimal('1e8'):
+            raise RecordError('price: سعر خارج النطاق')
+    for field in ('is_free', 'is_featured'):
+        value = _bool(row, field)
+        if value is not None:
+            record[field] = value
+    return record
+
+
+class SlugAllocator:
+    """روابط مختصرة فريدة في الذاكرة: العنوان، ثم العنوان-2، العنوان-3..."""
+
+    def __init__(self, taken, max_length, fallback):
+        self.taken = set(taken)
+        self.max_length = max_length
+        self.fallback = fallback
+        # آخر لاحقة مستخدمة لكل أصل حتى لا يُعاد الفحص من 2 للعناوين المتكررة كثيراً
+        self._next = {}
+
+    def allocate(self, text):
+        base = slugify(text, allow_unicode=True)[:self.max_length].strip('-') or self.fallback
+        slug, number = base, self._next.get(base, 2)
+        while slug in self.taken:
+            suffix = f'-{number}'
+            slug = base[:self.max_length - len(suffix)] + suffix
+            number += 1
+        self._next[base] = number
+        self.taken.add(slug)
+        return slug
+
+
+class NameResolver:
+    """{الاسم: المعرف} لنموذج يُحل بالاسم، وإنشاء الناقص دفعة واحدة"""
+
+    def __init__(self, model, slugs=None):
+        self.model = model
+        self.slugs = slugs
+        self.ids = {}
+        # عند تكرار الاسم في الجدول نعتمد أقدم سجل
+        for pk, name in model.objects.order_by('-pk').values_list('pk', 'name').iterator(chunk_size=5000):
+            self.ids[clean_name(name)] = pk
+        self.created = set()
+
+    def resolve(self, names):
+        """إنشاء ما ليس موجوداً من الأسماء؛ يعيد معرفات المنشأ منها"""
+        missing = sorted({name for name in names if name and name not in self.ids})
+        if not missing:
+            return set()
+        objects = [self.model(name=name) for name in missing]
+        if self.slugs is not None:
+            for obj in objects:
+                obj.slug = self.slugs.allocate(obj.name)
+        self.model.objects.bulk_create(objects)
+        created = set()
+        for obj in objects:
+            self.ids[obj.name] = obj.pk
+            created.add(obj.pk)
+        self.created |= created
+        return created
+
+
+class CategoryResolver(NameResolver):
+    """التصنيفات تُحل بالاسم أو بالرابط المختصر"""
+
+    def __init__(self, model):
+        super().__init__(model, SlugAllocator(
+            model.objects.values_list('slug', flat=True), model._meta.get_field('slug').max_length, 'category'
+        ))
+        for pk, slug in model.objects.order_by('-pk').values_list('pk', 'slug'):
+            self.ids.setdefault(slug, pk)
+
+
+class ProgressFile:
+    """عدد السجلات المنجزة من ملف الاستيراد، يُكتب بشكل ذري بعد كل دفعة"""
+
+    def __init__(self, source, path=None):
+        self.source = os.path.abspath(source)
+        self.path = path or f'{source}.progress'
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        if not self.exists():
+            return 0
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('source') != self.source:
+            raise ValueError(f'ملف التقدم {self.path} يخص ملفاً آخر: {data.get("source")}')
+        return int(data.get('records', 0))
+
+    def save(self, records, stats):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'source': self.source, 'records': records, 'stats': stats,
+                       'updated_at': timezone.now().isoformat()}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.exists():
+            os.remove(self.path)
+
+
+class CatalogImporter:
+    """استيراد سجلات الكتب على دفعات؛ stats يجمع الأعداد والأخطاء"""
+
+    def __init__(self, batch_size=1000, update=False, max_errors=None):
+        from .models import Author, Book, Category
+
+        self.batch_size = batch_size
+        self.update = update
+        self.max_errors = max_errors
+        self.authors = NameResolver(Author)
+        self.categories = CategoryResolver(Category)
+        self.existing = dict(Book.objects.values_list('slug', 'pk').iterator(chunk_size=5000))
+        self.slugs = SlugAllocator(self.existing, Book._meta.get_field('slug').max_length, 'book')
+        self.stats = {'created': 0, 'updated': 0, 'skipped': 0, 'invalid': 0}
+        self.errors = []
+
+    def run(self, records, start=0, on_batch=None):
+        """records: (رقم، سجل)؛ تُتخطى السجلات حتى start، ويُستدعى on_batch(المنجز) بعد كل دفعة"""
+        from .stats import statistics_snapshot
+        from .context_processors import categories_snapshot
+
+        done, batch = start, []
+        try:
+            for number, row in records:
+                if number <= start:
+                    continue
+                try:
+                    batch.append((number, parse_record(row)))
+                except RecordError as e:
+                    self._error(number, e)
+                done = number
+                if len(batch) >= self.batch_size:
+                    self.write(batch)
+                    batch = []
+                    if on_batch:
+                        on_batch(done)
+            if batch:
+                self.write(batch)
+            if on_batch and done > start:
+                on_batch(done)
+        finally:
+            # عدد الكتب في التصنيفات والإحصائيات العامة تغيرت
+            categories_snapshot.invalidate()
+            statistics_snapshot.invalidate()
+        return done
+
+    def _error(self, number, error):
+        self.stats['invalid'] += 1
+        self.errors.append((number, str(error)))
+        if self.max_errors is not None and self.stats['invalid'] > self.max_errors:
+            raise RecordError(f'تجاوز عدد السجلات غير الصالحة {self.max_errors}')
+
+    def write(self, batch):
+        """كتابة دفعة واحدة في معاملة مع تحديث الفهارس وإحصائيات المؤلفين"""
+        from .autocomplete import refresh_entries
+        from .models import AuthorStats, Book
+        from .search import index_books
+
+        with transaction.atomic():
+            new_authors = self.authors.resolve(record.get('author') for _, record in batch)
+            new_categories = self.categories.resolve(record['category'] for _, record in batch)
+
+            created, updates, seen = [], {}, set()
+            for number, record in batch:
+                slug = record['slug']
+                if slug and slug in seen:
+                    # الـ slug مكرر داخل الدفعة: يُعتمد أول سجل
+                    self.stats['skipped'] += 1
+                    continue
+                if slug and slug in self.existing:
+                    if self.update:
+                        updates[self.existing[slug]] = record
+                        seen.add(slug)
+                    else:
+                        self.stats['skipped'] += 1
+                    continue
+                try:
+                    book = self._build(Book(), record, new=True)
+                except RecordError as e:
+                    self._error(number, e)
+                    continue
+                book.slug = self.slugs.allocate(slug or record['title'])
+                seen.add(book.slug)
+                created.append(book)
+
+            old_authors = set()
+            if updates:
+                old_authors = set(
+                    Book.objects.filter(pk__in=updates).values_list('author_id', flat=True)
+                )
+                self._update(Book, updates)
+            Book.objects.bulk_create(created)
+            for book in created:
+                self.existing[book.slug] = book.pk
+
+            book_ids = [book.pk for book in created] + list(updates)
+            index_books(book_ids)
+            author_ids = {book.author_id for book in created} | {
+                self.authors.ids.get(record.get('author')) for record in updates.values()
+            } | old_authors | new_authors
+            AuthorStats.refresh(author_ids - {None})
+
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(updates)
+        refresh_entries('book', book_ids)
+        if new_authors:
+            refresh_entries('author', new_authors)
+        if new_categories:
+            refresh_entries('category', new_categories)
+
+    def _build(self, book, record, new=False):
+        book.title = record['title']
+        if new or 'author' in record:
+            book.author_id = self.authors.ids.get(record.get('author'))
+            book.author_name = None
+        book.category_id = self.categories.ids[record['category']]
+        for field, default in BOOK_FIELDS.items():
+            if field in record:
+                setattr(book, field, record[field])
+            elif new:
+                setattr(book, field, default)
+        if new and book.published_year is None:
+            raise RecordError('published_year: سنة النشر مطلوبة')
+        return book
+
+    def _update(self, model, updates):
+        # bulk_update يكتب نفس الحقول لكل الكتب، فتُجمع الكتب حسب الحقول الموجودة في سجلاتها
+        groups = {}
+        now = timezone.now()
+        for pk, record in updates.items():
+            book = self._build(model(pk=pk), record)
+            book.updated_at = now
+            fields = ('title', 'category', 'updated_at') + tuple(
+                field for field in BOOK_FIELDS if field in record
+            )
+            if 'author' in record:
+                fields += ('author', 'author_name')
+            groups.setdefault(fields, []).append(book)
+        for fields, books in groups.items():
+            model.objects.bulk_update(books, fields, batch_size=self.batch_size)
@@ -0,0 +1,148 @@
+"""
+استخراج محتوى ملفات PDF للكتب خارج مسار الطلب.
+
+- يُقرأ الملف في مجموعة عمليات (pypdf) لاستخراج عدد الصفحات وبيانات الملف
+  (العنوان، المؤلف...) ونص كل صفحة، ويُعاد النص مضغوطاً.
+- تُحفظ النتيجة في BookContent، ويُملأ عدد صفحات الكتاب إذا تُرك فارغاً
+  واسم المؤلف إذا لم يُحدد، ثم يُحدَّث فهرس البحث ليشمل نص الملف.
+- pypdf اعتمادية اختيارية: بدونها يُتخطى الاستخراج دون تعطيل رفع الكتب.
+"""
+import importlib.util
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .workers import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+pool = ProcessPool('PDF_INGESTION_WORKERS')
+
+# فاصل الصفحات (مطابق لـ BookContent.PAGE_SEPARATOR؛ العملية الفرعية لا تستورد النماذج)
+PAGE_SEPARATOR = '\f'
+
+# بيانات الملف المحفوظة: مفتاح pypdf -> المفتاح المخزن
+METADATA_KEYS = {
+    '/Title': 'title',
+    '/Author': 'author',
+    '/Subject': 'subject',
+    '/Keywords': 'keywords',
+    '/Creator': 'creator',
+    '/Producer': 'producer',
+    '/CreationDate': 'created',
+}
+
+
+def is_available():
+    return importlib.util.find_spec('pypdf') is not None
+
+
+def max_pages():
+    """أقصى عدد صفحات يُستخرج نصها (عدد الصفحات الكلي يُحسب دائماً)"""
+    return getattr(settings, 'PDF_INGESTION_MAX_PAGES', 2000)
+
+
+def extract_pdf(source, page_limit):
+    """تُنفَّذ في عملية منفصلة: source مسار الملف أو محتواه كبايتات"""
+    import zlib
+    from pypdf import PdfReader
+
+    reader = PdfReader(BytesIO(source) if isinstance(source, bytes) else source)
+    if reader.is_encrypted:
+        # كثير من الملفات مشفرة بكلمة مرور فارغة لمنع النسخ فقط
+        reader.decrypt('')
+
+    metadata = {}
+    for key, name in METADATA_KEYS.items():
+        value = (reader.metadata or {}).get(key)
+        if value:
+            metadata[name] = ' '.join(str(value).split())[:500]
+
+    pages = []
+    for page in reader.pages[:page_limit]:
+        try:
+            text = page.extract_text() or ''
+        except Exception:
+            # صفحة تالفة لا تُفشل الملف كله
+            text = ''
+        pages.append(' '.join(text.replace(PAGE_SEPARATOR, ' ').split()))
+
+    return {
+        'page_count': len(reader.pages),
+        'metadata': metadata,
+        'text': zlib.compress(PAGE_SEPARATOR.join(pages).encode(), 6),
+    }
+
+
+def needs_ingestion(book):
+    from .models import BookContent
+
+    return bool(book.pdf_file) and not BookContent.objects.filter(
+        book_id=book.pk, source=book.pdf_file.name
+    ).exists()
+
+
+def _read_source(field):
+    """مسار الملف إن كان على القرص (أخف من نقل المحتوى للعملية)، وإلا محتواه"""
+    try:
+        return field.storage.path(field.name)
+    except NotImplementedError:
+        with field.storage.open(field.name, 'rb') as f:
+            return f.read()
+
+
+def _save_result(book_id, source_name, result, error):
+    from .models import AuthorStats, Book, BookContent
+    from .search import index_books
+
+    pages_filled = False
+    with transaction.atomic():
+        # لا نكتب إذا حُذف الكتاب أو استُبدل ملفه أثناء المعالجة
+        if not Book.objects.filter(pk=book_id, pdf_file=source_name).exists():
+            return None
+        if error is not None:
+            logger.warning('تعذر استخراج محتوى الملف %s: %s', source_name, error)
+            defaults = {'page_count': 0, 'metadata': {}, 'text': b'', 'error': str(error)[:255]}
+        else:
+            defaults = {**result, 'error': ''}
+        content, _ = BookContent.objects.update_or_create(
+            book_id=book_id, defaults={'source': source_name, **defaults}
+        )
+        if error is None:
+            if content.page_count:
+                pages_filled = Book.objects.filter(pk=book_id, pages__lte=0).update(pages=content.page_count)
+            author = content.metadata.get('author')
+            if author:
+                Book.objects.filter(
+                    Q(author_name__isnull=True) | Q(author_name=''), pk=book_id, author__isnull=True
+                ).update(author_name=author[:100])
+    index_books([book_id])
+    if pages_filled:
+        # إجمالي صفحات المؤلف يشمل الكتاب الآن
+        AuthorStats.refresh(Book.objects.filter(pk=book_id).values_list('author_id', flat=True))
+    return content
+
+
+def ingest(book, sync=None):
+    """استخراج محتوى ملف الكتاب؛ في مجموعة العمليات افتراضياً، أو فوراً إذا sync"""
+    if not is_available():
+        logger.warning('pypdf غير مثبت: تخطي استخراج محتوى ملفات PDF')
+        return None
+    book_id, field = book.pk, book.pdf_file
+    try:
+        source = _read_source(field)
+    except OSError as e:
+        logger.warning('تعذرت قراءة ملف الكتاب %s: %s', field.name, e)
+        return None
+
+    def on_done(result, error):
+        return _save_result(book_id, field.name, result, error)
+
+    return pool.run(extract_pdf, (source, max_pages()), on_done, sync)
+
+
+def shutdown():
+    pool.shutdown()
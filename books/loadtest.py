@@ -0,0 +1,88 @@
+"""
+أدوات اختبار الحمل على خادم يعمل (gunicorn أو uvicorn)، يستخدمها benchmark_http و load_test.
+
+- كل عميل خيط باتصال keep-alive يطلب الصفحات بالتناوب حتى انتهاء المدة، ولا يتبع
+  إعادة التوجيه (302 لصفحة تتطلب الدخول استجابة صحيحة تُقاس كما هي).
+- الأزمنة تُجمع لكل صفحة، والخطأ أي استجابة 4xx/5xx أو انقطاع اتصال.
+"""
+import http.client
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1] if len(values) > 1 else values[0]
+
+
+def summarize(latencies, errors, seconds):
+    """عدد الطلبات ومعدلها والمئينات بالمللي ثانية"""
+    summary = {'requests': len(latencies), 'rps': len(latencies) / seconds, 'errors': errors}
+    for p in (50, 95, 99):
+        summary[f'p{p}'] = percentile(latencies, p) * 1000 if latencies else None
+    return summary
+
+
+def run_client(base_url, targets, deadline, results, lock, offset, headers):
+    """عميل واحد: targets قائمة (اسم، [مسارات]) يمر عليها بالتناوب مع مسار عشوائي من كل منها"""
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.netloc, timeout=30)
+    latencies, errors = defaultdict(list), Counter()
+    i = offset
+    while time.monotonic() < deadline:
+        label, paths = targets[i % len(targets)]
+        i += 1
+        path = parts.path.rstrip('/') + random.choice(paths)
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors[label] += 1
+            connection.close()
+            continue
+        if response.status >= 400:
+            errors[label] += 1
+            continue
+        latencies[label].append(time.perf_counter() - started)
+    connection.close()
+    with lock:
+        for label, values in latencies.items():
+            results['latencies'][label].extend(values)
+        results['errors'].update(errors)
+
+
+def run(base_url, targets, concurrency, seconds, headers=None):
+    """تشغيل concurrency عميلاً لمدة seconds؛ يعيد {'latencies': {اسم: [ثوانٍ]}, 'errors': Counter}"""
+    results = {'latencies': defaultdict(list), 'errors': Counter()}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    clients = [
+        threading.Thread(target=run_client, args=(base_url, targets, deadline, results, lock, i, headers or {}))
+        for i in range(concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return results
+
+
+def login_session(user):
+    """جلسة مسجلة الدخول للمستخدم في قاعدة البيانات المشتركة مع الخادم؛ يعيد (الجلسة، ترويسة Cookie)"""
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session, f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
@@ -0,0 +1,102 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books import views
+from books.autocomplete import autocomplete_index, current_version
+
+ARABIC_WORDS = [
+    'الثلاثية', 'القاهرة', 'رواية', 'تاريخ', 'الأدب', 'العربي', 'فلسفة', 'علوم', 'البرمجة', 'مقدمة',
+    'أساسيات', 'الحضارة', 'الإسلامية', 'الشعر', 'الحديث', 'قصص', 'الأطفال', 'الاقتصاد', 'السياسة', 'مدخل',
+]
+ENGLISH_WORDS = [
+    'introduction', 'python', 'django', 'history', 'science', 'novel', 'poetry', 'economics', 'design',
+    'patterns', 'algorithms', 'networks', 'security', 'modern', 'classic', 'guide', 'complete', 'advanced',
+]
+
+
+def typo(word):
+    if len(word) < 4:
+        return word
+    i = random.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:] if random.random() < 0.5 else word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+class Command(BaseCommand):
+    help = 'قياس زمن استجابة API الإكمال التلقائي (p50/p95/p99) واستعلاماتها لقاعدة البيانات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=100_000, help='عدد العناصر الاصطناعية')
+        parser.add_argument('--queries', type=int, default=5000)
+        parser.add_argument('--from-db', action='store_true', help='استخدام الكتالوج الفعلي بدل بيانات اصطناعية')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        # الفهرس الذي تقرؤه الصفحة نفسها، فيُقاس كل ما يحدث في الطلب لا البحث وحده
+        index = autocomplete_index
+        start = time.perf_counter()
+        if options['from_db']:
+            index.load()
+        else:
+            words = ARABIC_WORDS + ENGLISH_WORDS
+            index.clear()
+            index.bulk_load(
+                ('book', pk, ' '.join(random.sample(words, random.randint(2, 4))) + f' {pk}', '', '',
+                 random.randint(0, 1000))
+                for pk in range(options['entries'])
+            )
+            index.loaded = True
+            index.version = current_version()
+        self.stdout.write(f'تحميل {len(index.entries):,} عنصر في {time.perf_counter() - start:.2f} ث')
+
+        labels = [entry['label'] for entry in index.entries.values()]
+        if not labels:
+            self.stdout.write(self.style.WARNING('الفهرس فارغ'))
+            return
+
+        queries = []
+        for _ in range(options['queries']):
+            words = random.choice(labels).split()
+            word = random.choice(words)
+            kind = random.random()
+            if kind < 0.5:
+                queries.append(word[:random.randint(2, max(2, len(word)))])
+            elif kind < 0.8:
+                queries.append(typo(word))
+            else:
+                queries.append(' '.join(words[:2])[:-1])
+
+        factory = RequestFactory()
+        url = reverse('search_books')
+        timings = []
+        hits = 0
+        with CaptureQueriesContext(connections['default']) as db_queries:
+            for query in queries:
+                request = factory.get(url, {'q': query})
+                t = time.perf_counter()
+                response = views.search_books(request)
+                timings.append((time.perf_counter() - t) * 1000)
+                if json.loads(response.content)['results']:
+                    hits += 1
+
+        timings.sort()
+
+        def p(q):
+            return timings[min(len(timings) - 1, int(len(timings) * q))]
+
+        p99 = p(0.99)
+        style = self.style.SUCCESS if p99 < 10 and not db_queries else self.style.WARNING
+        self.stdout.write(style(
+            f'{len(queries)} طلب: p50={p(0.50):.2f}ms p95={p(0.95):.2f}ms p99={p99:.2f}ms '
+            f'المتوسط={statistics.mean(timings):.2f}ms، طلبات بنتائج {hits / len(queries):.0%}، '
+            f'استعلامات قاعدة البيانات {len(db_queries)}'
+        ))
@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from books.counters import CounterBuffer
+from books.models import Book, Category
+
+
+class Command(BaseCommand):
+    help = 'قياس أداء عدادات المشاهدات تحت التزامن والتحقق من عدم ضياع أي زيادة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--hits', type=int, default=200, help='عدد الزيارات لكل خيط')
+        parser.add_argument('--skip-legacy', action='store_true',
+                            help='تخطي قياس الطريقة القديمة (قراءة ثم حفظ)')
+
+    def handle(self, *args, **options):
+        threads, hits = options['threads'], options['hits']
+        expected = threads * hits
+
+        with transaction.atomic():
+            category, _ = Category.objects.get_or_create(slug='benchmark-counters', defaults={'name': 'benchmark'})
+            book = Book.objects.create(
+                title='benchmark counters', slug=f'benchmark-counters-{time.time_ns()}',
+                description='-', category=category, published_year=2000, pages=1,
+            )
+
+        try:
+            if not options['skip_legacy']:
+                self.report('legacy save()', *self.run(threads, hits, lambda: self.legacy_hit(book.pk)),
+                            expected, book)
+                Book.objects.filter(pk=book.pk).update(views=0)
+
+            buffer = CounterBuffer(flush_interval=0.5)
+            elapsed, errors = self.run(threads, hits, lambda: buffer.incr(book.pk, 'views'))
+            buffer.flush()
+            self.report('buffered', elapsed, errors, expected, book)
+        finally:
+            book.delete()
+            if not category.books.exists():
+                category.delete()
+
+    def legacy_hit(self, book_id):
+        # ما كان يحدث سابقاً مع كل طلب: تحميل الكتاب ثم حفظ العداد
+        book = Book.objects.get(pk=book_id)
+        book.views += 1
+        book.save(update_fields=['views'])
+
+    def run(self, threads, hits, hit):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(hits):
+                    try:
+                        hit()
+                    except Exception as e:
+                        errors.append(e)
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for future in [pool.submit(worker) for _ in range(threads)]:
+                future.result()
+        return time.perf_counter() - start, errors
+
+    def report(self, label, elapsed, errors, expected, book):
+        book.refresh_from_db(fields=['views'])
+        lost = expected - book.views
+        style = self.style.SUCCESS if lost == 0 and not errors else self.style.ERROR
+        self.stdout.write(style(
+            f'{label}: {expected / elapsed:,.0f} زيارة/ث، المتوقع {expected}، المسجل {book.views}، '
+            f'المفقود {lost}، الأخطاء {len(errors)}'
+        ))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from books.loadtest import run, summarize
+from books.models import Author, Book, Category
+
+
+def default_paths():
+    """صفحات القراءة العامة التي لها نسخ غير متزامنة، بأمثلة من الكتالوج الحالي"""
+    paths = [reverse('home'), reverse('book_list'), reverse('all_authors')]
+    book = Book.objects.order_by('-views').first()
+    if book:
+        paths.append(reverse('book_detail', args=[book.slug]))
+        paths.append(reverse('books_by_category', args=[book.category.slug]))
+    else:
+        category = Category.objects.first()
+        if category:
+            paths.append(reverse('books_by_category', args=[category.slug]))
+    author = Author.objects.first()
+    if author:
+        paths.append(reverse('author_detail', args=[author.id]))
+        paths.append(reverse('author_books', args=[author.id]))
+    return paths
+
+
+class Command(BaseCommand):
+    help = 'قياس معدل الطلبات وزمن الاستجابة لخادم يعمل (مقارنة WSGI المتزامن و ASGI غير المتزامن)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+',
+                            help='عناوين الخوادم للمقارنة، مثل sync=http://127.0.0.1:8001 async=http://127.0.0.1:8002')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='مسار للقياس (يتكرر)؛ افتراضياً صفحات القراءة العامة')
+        parser.add_argument('--concurrency', type=int, default=16, help='عدد العملاء المتزامنين')
+        parser.add_argument('--seconds', type=float, default=10, help='مدة القياس لكل خادم')
+        parser.add_argument('--warmup', type=float, default=2, help='ثوانٍ قبل القياس لتسخين المخازن والاتصالات')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or default_paths()
+        targets = []
+        for target in options['targets']:
+            name, _, url = target.rpartition('=')
+            if not url.startswith(('http://', 'https://')):
+                raise CommandError(f'عنوان غير صالح: {target}')
+            targets.append((name or url, url))
+
+        self.stdout.write(
+            f"{options['concurrency']} عملاء، {options['seconds']} ثوانٍ، الصفحات: {' '.join(paths)}"
+        )
+        # كل صفحة هدف مستقل بمسار واحد، ويُجمع زمنها مع البقية
+        pages = [(path, [path]) for path in paths]
+        for name, url in targets:
+            if options['warmup']:
+                run(url, pages, options['concurrency'], options['warmup'])
+            results = run(url, pages, options['concurrency'], options['seconds'])
+            latencies = [value for values in results['latencies'].values() for value in values]
+            errors = sum(results['errors'].values())
+            if not latencies:
+                self.stdout.write(self.style.ERROR(f"{name:<10} لا استجابات ناجحة (أخطاء: {errors})"))
+                continue
+            summary = summarize(latencies, errors, options['seconds'])
+            line = (
+                f"{name:<10} طلبات: {summary['requests']:>7} ({summary['rps']:.0f}/ث)  "
+                f"p50: {summary['p50']:.0f}ms  p95: {summary['p95']:.0f}ms  "
+                f"p99: {summary['p99']:.0f}ms  أخطاء: {errors}"
+            )
+            self.stdout.write(self.style.SUCCESS(line) if not errors else self.style.WARNING(line))
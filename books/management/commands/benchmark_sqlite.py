@@ -0,0 +1,185 @@
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PROFILES = ('default', 'production')
+MODES = ('direct', 'queued')
+
+
+def _visit_direct(user_id, book_id):
+    """كتابات زيارة صفحة كتاب كما كانت قبل المخازن المؤجلة: قراءة ثم كتابة في معاملة"""
+    from django.db import transaction
+    from django.db.models import F
+    from books.models import Book, ReadingHistory
+
+    with transaction.atomic():
+        history = ReadingHistory.objects.filter(user_id=user_id, book_id=book_id).first()
+        if history is None:
+            ReadingHistory.objects.create(user_id=user_id, book_id=book_id)
+        else:
+            ReadingHistory.objects.filter(pk=history.pk).update(
+                reading_duration_minutes=F('reading_duration_minutes') + 1
+            )
+        Book.objects.filter(pk=book_id).update(views=F('views') + 1)
+
+
+def _visit_queued(user_id, book_id):
+    """كتابات زيارة صفحة كتاب عبر المخازن المؤجلة"""
+    from books.counters import book_counters
+    from books.visits import reading_visits
+
+    book_counters.incr(book_id, 'views')
+    reading_visits.read(user_id, book_id, seconds=60)
+
+
+class FlushFailures(logging.Handler):
+    """عدّ الدفعات التي فشلت كتابتها في الخيط الخلفي (تعود للمخزن وتُعاد لاحقاً)"""
+
+    def __init__(self):
+        super().__init__()
+        self.locked = self.errors = 0
+
+    def emit(self, record):
+        error = record.exc_info[1] if record.exc_info else None
+        if error is not None and 'locked' in str(error):
+            self.locked += 1
+        else:
+            self.errors += 1
+
+
+def run_worker(path, options, mode, threads, seconds, user_ids, book_ids):
+    """عملية عامل gunicorn وهمية: خيوط تزور صفحات الكتب حتى انتهاء المدة"""
+    import django
+    django.setup()
+
+    from django.db import OperationalError
+    from books.buffers import flush_all
+    from books.models import Book
+
+    settings.DATABASES[DEFAULT_DB_ALIAS].update(NAME=path, OPTIONS=options)
+    settings.DB_SERIALIZE_WRITES = mode == 'queued'
+    settings.BOOK_COUNTERS_FLUSH_INTERVAL = settings.READING_HISTORY_FLUSH_INTERVAL = 0.5
+    visit = _visit_queued if mode == 'queued' else _visit_direct
+    failures = FlushFailures()
+    buffers_logger = logging.getLogger('books.buffers')
+    buffers_logger.addHandler(failures)
+    buffers_logger.propagate = False
+    deadline = time.monotonic() + seconds
+    totals = {'visits': 0, 'locked': 0, 'errors': 0, 'max_latency': 0.0}
+    lock = threading.Lock()
+
+    def loop():
+        local = dict.fromkeys(totals, 0)
+        try:
+            while time.monotonic() < deadline:
+                book_id = random.choice(book_ids)
+                started = time.monotonic()
+                try:
+                    Book.objects.filter(pk=book_id).values_list('title', flat=True).first()
+                    visit(random.choice(user_ids), book_id)
+                    local['visits'] += 1
+                except OperationalError as e:
+                    local['locked' if 'locked' in str(e) else 'errors'] += 1
+                local['max_latency'] = max(local['max_latency'], time.monotonic() - started)
+        finally:
+            connections.close_all()
+        with lock:
+            for key in ('visits', 'locked', 'errors'):
+                totals[key] += local[key]
+            totals['max_latency'] = max(totals['max_latency'], local['max_latency'])
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # ما بقي في المخازن يُكتب كما عند إغلاق العامل
+    flush_all()
+    connections.close_all()
+    totals['locked'] += failures.locked
+    totals['errors'] += failures.errors
+    return totals
+
+
+class Command(BaseCommand):
+    help = 'قياس كتابات متزامنة من عدة عمليات على نسخة من قاعدة SQLite (بدون وضع الإنتاج ومعه)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='عدد العمليات (عمال gunicorn)')
+        parser.add_argument('--threads', type=int, default=4, help='عدد الخيوط في كل عملية')
+        parser.add_argument('--seconds', type=float, default=5, help='مدة كل تجربة')
+        parser.add_argument('--profile', choices=PROFILES + ('both',), default='both',
+                            help='خيارات الاتصال: افتراضية، أو وضع الإنتاج (WAL و busy_timeout و IMMEDIATE)')
+        parser.add_argument('--mode', choices=MODES, default='direct',
+                            help='direct: كتابة مع كل زيارة، queued: عبر المخازن المؤجلة بكاتب واحد لكل عملية')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('الأمر لقواعد SQLite فقط')
+        primary.ensure_connection()
+        with primary.cursor() as cursor:
+            cursor.execute('SELECT id FROM auth_user LIMIT 50')
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute('SELECT id FROM books_book LIMIT 200')
+            book_ids = [row[0] for row in cursor.fetchall()]
+        if not user_ids or not book_ids:
+            raise CommandError('قاعدة البيانات تحتاج مستخدمين وكتباً للقياس')
+
+        profiles = PROFILES if options['profile'] == 'both' else (options['profile'],)
+        self.stdout.write(
+            f"{options['processes']} عمليات × {options['threads']} خيوط، {options['seconds']} ثوانٍ، "
+            f"الكتابة: {options['mode']}"
+        )
+        for profile in profiles:
+            totals = self._run(primary, profile, options, user_ids, book_ids)
+            line = (
+                f"{profile:<10} زيارات: {totals['visits']:>7} ({totals['visits'] / options['seconds']:.0f}/ث)  "
+                f"database is locked: {totals['locked']:>5}  أخطاء أخرى: {totals['errors']}  "
+                f"أبطأ زيارة: {totals['max_latency'] * 1000:.0f}ms"
+            )
+            self.stdout.write(self.style.SUCCESS(line) if not totals['locked'] else self.style.WARNING(line))
+
+    def _run(self, primary, profile, options, user_ids, book_ids):
+        # نسخة جديدة من القاعدة لكل تجربة حتى لا تُمس بيانات الموقع
+        fd, path = tempfile.mkstemp(suffix='.sqlite3', prefix='bookmark-bench-')
+        os.close(fd)
+        try:
+            target = sqlite3.connect(path)
+            primary.connection.backup(target)
+            target.execute(f"PRAGMA journal_mode={'WAL' if profile == 'production' else 'DELETE'}")
+            target.close()
+            db_options = dict(settings.SQLITE_PRODUCTION_OPTIONS) if profile == 'production' else {}
+
+            totals = {'visits': 0, 'locked': 0, 'errors': 0, 'max_latency': 0.0}
+            # spawn: كل عامل يبدأ جانغو واتصالاته من جديد كعمال gunicorn
+            with ProcessPoolExecutor(
+                max_workers=options['processes'], mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        run_worker, path, db_options, options['mode'], options['threads'],
+                        options['seconds'], user_ids, book_ids,
+                    )
+                    for _ in range(options['processes'])
+                ]
+                for future in futures:
+                    result = future.result()
+                    for key in ('visits', 'locked', 'errors'):
+                        totals[key] += result[key]
+                    totals['max_latency'] = max(totals['max_latency'], result['max_latency'])
+            return totals
+        finally:
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
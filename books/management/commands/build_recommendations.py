@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from books.recommendations import build
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب الكتب المشابهة من تزامن القراءة والإشارات المرجعية والتقييمات (يُشغَّل دورياً)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None,
+                            help='عدد الكتب المقترحة المحفوظة لكل كتاب (الافتراضي RECOMMENDATIONS_TOP_K)')
+
+    def handle(self, *args, **options):
+        count = build(options['top'])
+        self.stdout.write(self.style.SUCCESS(f'تم حساب المقترحات لـ {count} كتاب'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.autocomplete import refresh_entries
+from books.importing import NameResolver, clean_name
+from books.models import Author, AuthorStats, Book
+from books.search import index_books
+
+
+class Command(BaseCommand):
+    help = 'تحويل المؤلفين النصيين إلى نموذج Author'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='عدد الكتب في كل تحديث جماعي')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # الكتب التي لها اسم مؤلف نصي فقط، في قراءة واحدة
+        books = [
+            (pk, clean_name(name)) for pk, name in
+            Book.objects.filter(author__isnull=True).exclude(author_name__isnull=True).values_list('pk', 'author_name')
+        ]
+        books = [(pk, name) for pk, name in books if name]
+
+        authors = NameResolver(Author)
+        with transaction.atomic():
+            # إنشاء المؤلفين الجدد دفعة واحدة
+            created = authors.resolve(name for _, name in books)
+            # ربط الكتب بالمؤلفين
+            Book.objects.bulk_update(
+                [Book(pk=pk, author_id=authors.ids[name]) for pk, name in books], ['author'], batch_size=batch_size
+            )
+            AuthorStats.refresh({authors.ids[name] for _, name in books})
+
+        # bulk_update لا يرسل post_save: تحديث فهرس البحث والإكمال التلقائي يدوياً
+        updated = [pk for pk, _ in books]
+        for i in range(0, len(updated), batch_size):
+            index_books(updated[i:i + batch_size])
+            refresh_entries('book', updated[i:i + batch_size])
+        if created:
+            refresh_entries('author', created)
+
+        self.stdout.write(self.style.SUCCESS(f'تم إنشاء {len(created)} مؤلف جديد'))
+        self.stdout.write(f'تم ربط {len(updated)} كتاب بمؤلفيه')
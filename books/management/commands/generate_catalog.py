@@ -0,0 +1,272 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from books.context_processors import categories_snapshot
+from books.models import Author, AuthorStats, Book, Category, ReadingHistory, Review
+from books.stats import statistics_snapshot
+
+# كل ما يولده الأمر يبدأ بهذه البادئة (الروابط وأسماء المستخدمين)
+PREFIX = 'gen-'
+USER_PREFIX = 'loadtest-'
+# كلمة مرور مستخدمي الاختبار (لتجربة تسجيل الدخول في اختبار الحمل)
+PASSWORD = 'loadtest'
+
+ARABIC_WORDS = [
+    'الثلاثية', 'القاهرة', 'رواية', 'تاريخ', 'الأدب', 'العربي', 'فلسفة', 'علوم', 'البرمجة', 'مقدمة',
+    'أساسيات', 'الحضارة', 'الإسلامية', 'الشعر', 'الحديث', 'قصص', 'الأطفال', 'الاقتصاد', 'السياسة', 'مدخل',
+    'الفكر', 'المدينة', 'الرحلة', 'أسرار', 'الكون', 'الطب', 'النفس', 'الحب', 'الحرب', 'السلام',
+    'الأندلس', 'بغداد', 'دمشق', 'الصحراء', 'البحر', 'الليل', 'الذاكرة', 'الزمن', 'اللغة', 'المعرفة',
+]
+ENGLISH_WORDS = [
+    'introduction', 'python', 'django', 'history', 'science', 'novel', 'poetry', 'economics', 'design',
+    'patterns', 'algorithms', 'networks', 'security', 'modern', 'classic', 'guide', 'complete', 'advanced',
+    'the', 'art', 'of', 'systems', 'databases', 'mind', 'ocean', 'city', 'journey', 'empire', 'silent',
+]
+ARABIC_NAMES = [
+    'أحمد', 'محمد', 'نجيب', 'طه', 'غسان', 'رضوى', 'أحلام', 'عباس', 'توفيق', 'يوسف',
+    'ليلى', 'سلمى', 'إبراهيم', 'خالد', 'مريم', 'عمر', 'نوال', 'حنان', 'جبران', 'إحسان',
+]
+ARABIC_FAMILIES = [
+    'محفوظ', 'حسين', 'كنفاني', 'عاشور', 'مستغانمي', 'العقاد', 'الحكيم', 'إدريس', 'الشيخ', 'السعداوي',
+    'الكوني', 'صالح', 'منيف', 'خليل', 'عبد القدوس', 'زيدان', 'الطيب', 'جبرا', 'الأسواني', 'البرغوثي',
+]
+ENGLISH_NAMES = ['James', 'Mary', 'Robert', 'Linda', 'David', 'Susan', 'Daniel', 'Karen', 'Paul', 'Emma']
+ENGLISH_FAMILIES = ['Smith', 'Brown', 'Taylor', 'Wilson', 'Clarke', 'Hughes', 'Walker', 'Wright', 'Hall', 'Green']
+CATEGORY_NAMES = [
+    'روايات', 'تاريخ', 'فلسفة', 'علوم', 'برمجة', 'شعر', 'أطفال', 'اقتصاد', 'سياسة', 'طب',
+    'علم النفس', 'أديان', 'فنون', 'رحلات', 'سير ذاتية', 'قانون', 'رياضيات', 'هندسة', 'لغات', 'تنمية ذاتية',
+]
+COMMENTS = ['كتاب رائع', 'ممتع جداً', 'أنصح به', 'متوسط', 'لم يعجبني', 'Great read', 'Well written', 'Too long']
+# توزيع النجوم في المراجعات (أغلب التقييمات 4 و 5 كما في المواقع الفعلية)
+RATING_WEIGHTS = [5, 8, 20, 35, 32]
+
+
+def skewed(n, exponent=2.0):
+    """رقم عشوائي من 0 إلى n-1 يميل إلى الأرقام الصغيرة (كتب ومؤلفون أشهر من غيرهم)"""
+    return int(n * random.random() ** exponent)
+
+
+def distinct(n, k, exponent=2.0):
+    """k عناصر مختلفة من 0 إلى n-1 بنفس الميل"""
+    k = min(k, n)
+    chosen = set()
+    while len(chosen) < k:
+        chosen.add(skewed(n, exponent))
+    return chosen
+
+
+def random_date(now, days):
+    return now - timedelta(days=random.random() * days)
+
+
+@contextmanager
+def explicit_dates(*models):
+    """تعطيل auto_now و auto_now_add مؤقتاً حتى تُوزع التواريخ على سنوات بدل لحظة التوليد"""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'توليد كتالوج اصطناعي بحجم الإنتاج (كتب ومؤلفون ومستخدمون ومراجعات وسجلات قراءة) باستخدام bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100_000)
+        parser.add_argument('--authors', type=int, default=10_000)
+        parser.add_argument('--categories', type=int, default=40)
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--reviews', type=int, default=1_000_000)
+        parser.add_argument('--history', type=int, default=5_000_000, help='عدد سجلات القراءة')
+        parser.add_argument('--years', type=int, default=5, help='توزيع تواريخ الإنشاء على آخر عدد من السنوات')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--recommendations', action='store_true',
+                            help='حساب الكتب المشابهة أيضاً (بطيء مع ملايين سجلات القراءة)')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='عدم إعادة حساب التقييمات وإحصائيات المؤلفين وفهرس البحث بعد التوليد')
+
+    def handle(self, *args, **options):
+        if Book.objects.filter(slug__startswith=PREFIX).exists():
+            raise CommandError(
+                'القاعدة فيها كتالوج مولَّد مسبقاً؛ ولّد في قاعدة جديدة، مثلاً: '
+                'DATABASE_URL=sqlite:///loadtest.sqlite3 python manage.py migrate'
+            )
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['years'] * 365
+
+        with explicit_dates(Author, Book, Review, ReadingHistory):
+            category_ids = self.step('التصنيفات', self.categories, options['categories'])
+            author_ids = self.step('المؤلفون', self.authors, options['authors'])
+            book_ids = self.step('الكتب', self.books, options['books'], author_ids, category_ids)
+            user_ids = self.step('المستخدمون', self.users, options['users'])
+            self.step('المراجعات', self.reviews, options['reviews'], user_ids, book_ids)
+            self.step('سجلات القراءة', self.history, options['history'], user_ids, book_ids)
+
+        if not options['skip_derived']:
+            # bulk_create لا يرسل الإشارات: الإحصائيات المخزنة والفهرس تُحسب مرة واحدة في النهاية
+            self.step('إحصائيات التقييم', lambda: Book.recompute_rating_stats(batch_size=self.batch_size))
+            self.step('إحصائيات المؤلفين', AuthorStats.refresh)
+            self.step('فهرس البحث', call_command, 'rebuild_search_index', stdout=self.stdout)
+            if options['recommendations']:
+                self.step('الكتب المشابهة', call_command, 'build_recommendations', stdout=self.stdout)
+        categories_snapshot.invalidate()
+        statistics_snapshot.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"تم التوليد؛ يمكن تسجيل الدخول بـ {USER_PREFIX}0 وكلمة المرور {PASSWORD}"
+        ))
+
+    def step(self, label, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        count = len(result) if isinstance(result, list) else result
+        count = f' ({count})' if isinstance(count, int) else ''
+        self.stdout.write(f'{label}{count}: {time.perf_counter() - started:.1f} ثانية')
+        return result
+
+    def insert(self, model, rows, keep_ids=True):
+        """bulk_create على دفعات كل منها في معاملة؛ يعيد المفاتيح الأساسية الجديدة (أو عددها فقط)"""
+        ids = []
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                count += self._insert_batch(model, batch, ids if keep_ids else None)
+                batch = []
+        if batch:
+            count += self._insert_batch(model, batch, ids if keep_ids else None)
+        return ids if keep_ids else count
+
+    @staticmethod
+    def _insert_batch(model, batch, ids):
+        with transaction.atomic():
+            created = model.objects.bulk_create(batch)
+        if ids is not None:
+            ids += [obj.pk for obj in created]
+        return len(created)
+
+    def categories(self, count):
+        return self.insert(Category, (
+            Category(
+                name=CATEGORY_NAMES[i % len(CATEGORY_NAMES)] + (f' {i // len(CATEGORY_NAMES) + 1}' if i >= len(CATEGORY_NAMES) else ''),
+                slug=f'{PREFIX}category-{i}',
+                description='تصنيف مولَّد لاختبار الحمل',
+                features='مولَّد,اختبار',
+            )
+            for i in range(count)
+        ))
+
+    def authors(self, count):
+        def author(i):
+            arabic = random.random() < 0.7
+            if arabic:
+                name = f'{random.choice(ARABIC_NAMES)} {random.choice(ARABIC_FAMILIES)}'
+            else:
+                name = f'{random.choice(ENGLISH_NAMES)} {random.choice(ENGLISH_FAMILIES)}'
+            created = random_date(self.now, self.days)
+            return Author(
+                name=f'{name} {i}', bio='سيرة مولَّدة' if arabic else 'Generated biography',
+                specialization=random.choice(CATEGORY_NAMES), is_featured=i < 8,
+                created_at=created, updated_at=created,
+            )
+
+        return self.insert(Author, (author(i) for i in range(count)))
+
+    def books(self, count, author_ids, category_ids):
+        def book(i):
+            arabic = random.random() < 0.6
+            words = ARABIC_WORDS if arabic else ENGLISH_WORDS
+            title = ' '.join(random.choices(words, k=random.randint(2, 5)))
+            is_free = random.random() < 0.3
+            created = random_date(self.now, self.days)
+            views = skewed(50_000, 3)
+            return Book(
+                title=title.title() if not arabic else title,
+                slug=f'{PREFIX}{i}',
+                author_id=author_ids[skewed(len(author_ids))] if author_ids else None,
+                description=' '.join(random.choices(words, k=40)),
+                category_id=category_ids[skewed(len(category_ids), 1.5)],
+                published_year=random.randint(1950, self.now.year),
+                pages=random.randint(40, 900),
+                language='العربية' if arabic else 'English',
+                price=Decimal('0.00') if is_free else Decimal(random.randint(5, 300)),
+                is_free=is_free,
+                is_featured=random.random() < 0.005,
+                views=views,
+                downloads=views // random.randint(3, 20),
+                created_at=created,
+                updated_at=created,
+            )
+
+        return self.insert(Book, (book(i) for i in range(count)))
+
+    def users(self, count):
+        # تجزئة كلمة المرور مرة واحدة (التجزئة بطيئة عمداً)
+        password = make_password(PASSWORD)
+        return self.insert(User, (
+            User(
+                username=f'{USER_PREFIX}{i}', email=f'{USER_PREFIX}{i}@example.com', password=password,
+                date_joined=random_date(self.now, self.days),
+            )
+            for i in range(count)
+        ))
+
+    def per_user(self, total, user_ids, book_ids):
+        """(المستخدم، مجموعة كتب مختلفة) بمجموع total تقريباً، وبعض القراء أنشط كثيراً من غيرهم"""
+        if not user_ids or not book_ids:
+            return
+        average = total / len(user_ids)
+        # سقف لكل مستخدم حتى يبقى اختيار كتب مختلفة سريعاً
+        ceiling = max(1, min(len(book_ids) // 4, int(average * 10)))
+        remaining = total
+        for user_id in user_ids:
+            if remaining <= 0:
+                break
+            k = min(max(1, round(random.expovariate(1 / average))), ceiling, remaining)
+            remaining -= k
+            yield user_id, distinct(len(book_ids), k)
+
+    def reviews(self, count, user_ids, book_ids):
+        def rows():
+            for user_id, books in self.per_user(count, user_ids, book_ids):
+                for index in books:
+                    yield Review(
+                        user_id=user_id, book_id=book_ids[index],
+                        rating=random.choices(range(1, 6), RATING_WEIGHTS)[0],
+                        comment=random.choice(COMMENTS), created_at=random_date(self.now, self.days),
+                    )
+
+        return self.insert(Review, rows(), keep_ids=False)
+
+    def history(self, count, user_ids, book_ids):
+        def rows():
+            for user_id, books in self.per_user(count, user_ids, book_ids):
+                for index in books:
+                    yield ReadingHistory(
+                        user_id=user_id, book_id=book_ids[index], progress=random.randint(0, 100),
+                        reading_duration_minutes=random.randint(1, 600),
+                        last_read=random_date(self.now, self.days),
+                    )
+
+        return self.insert(ReadingHistory, rows(), keep_ids=False)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from books import images
+from books.models import Author, Book
+from books.workers import run_batched
+
+
+class Command(BaseCommand):
+    help = 'توليد النسخ المصغرة (بالأحجام والصيغ المختلفة) لأغلفة الكتب وصور المؤلفين الحالية'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(images.KINDS), action='append', dest='kinds',
+                            help='نوع الصور (cover أو avatar، يمكن تكراره)')
+        parser.add_argument('--force', action='store_true',
+                            help='إعادة التوليد حتى للصور التي لها نسخ جاهزة')
+        parser.add_argument('--sync', action='store_true',
+                            help='التوليد في هذه العملية بدلاً من مجموعة العمليات')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='أقصى عدد من الصور قيد المعالجة في نفس الوقت (50 افتراضياً)')
+
+    def handle(self, *args, **options):
+        models = {'cover': Book, 'avatar': Author}
+        total = failed = 0
+        try:
+            for kind in options['kinds'] or sorted(images.KINDS):
+                image_field = images.KINDS[kind][0]
+                queryset = models[kind].objects.exclude(**{f'{image_field}__isnull': True}) \
+                    .exclude(**{image_field: ''}).order_by('pk')
+                # القائمة كاملة قبل البدء: لا يبقى استعلام مفتوح أثناء حفظ النتائج من خيوط المجموعة
+                pending = [
+                    obj for obj in queryset.iterator()
+                    if options['force'] or images.needs_variants(obj, kind)
+                ]
+                for result in run_batched(
+                    lambda obj: images.generate(obj, kind, sync=options['sync'] or None),
+                    pending,
+                    max(options['batch_size'], 1),
+                ):
+                    if result is None or 'error' in result:
+                        failed += 1
+                total += len(pending)
+                self.stdout.write(f'{kind}: {len(pending)} صورة')
+        finally:
+            # ينتظر انتهاء حفظ النسخ من المهام الجارية
+            images.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'تم توليد نسخ {total - failed} صورة'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'تعذرت معالجة {failed} صورة'))
@@ -0,0 +1,88 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importing import FORMATS, CatalogImporter, ProgressFile, RecordError, detect_format, read_records
+
+
+class Command(BaseCommand):
+    help = 'استيراد كتالوج كتب من ملف CSV أو JSONL على دفعات مع إمكانية استئناف الاستيراد'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='مسار ملف الكتالوج')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='صيغة الملف (افتراضياً من امتداده)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='عدد السجلات في كل دفعة (معاملة واحدة لكل دفعة)')
+        parser.add_argument('--update', action='store_true',
+                            help='تحديث الكتب الموجودة بنفس الـ slug بدلاً من تخطيها')
+        parser.add_argument('--resume', action='store_true',
+                            help='متابعة الاستيراد من آخر دفعة مكتملة في ملف التقدم')
+        parser.add_argument('--restart', action='store_true',
+                            help='تجاهل ملف التقدم والبدء من أول الملف')
+        parser.add_argument('--progress-file',
+                            help='مسار ملف التقدم (افتراضياً <path>.progress)')
+        parser.add_argument('--max-errors', type=int, default=None,
+                            help='إيقاف الاستيراد إذا تجاوز عدد السجلات غير الصالحة هذا الحد')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'الملف غير موجود: {path}')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size يجب أن يكون أكبر من صفر')
+        try:
+            fmt = options['format'] or detect_format(path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        progress = ProgressFile(path, options['progress_file'])
+        start = 0
+        if progress.exists() and not options['restart']:
+            if not options['resume']:
+                raise CommandError(
+                    f'يوجد ملف تقدم من استيراد سابق ({progress.path}): '
+                    'استخدم --resume للمتابعة أو --restart للبدء من جديد'
+                )
+            try:
+                start = progress.load()
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'متابعة الاستيراد بعد السجل {start}')
+
+        importer = CatalogImporter(
+            batch_size=options['batch_size'], update=options['update'], max_errors=options['max_errors'],
+        )
+
+        def on_batch(done):
+            progress.save(done, importer.stats)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {done} سجل: ' + self._summary(importer.stats))
+
+        try:
+            importer.run(read_records(path, fmt), start=start, on_batch=on_batch)
+        except RecordError as e:
+            self._report_errors(importer.errors)
+            raise CommandError(f'{e}؛ يمكن المتابعة بعد الإصلاح باستخدام --resume')
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'تعذرت قراءة الملف: {e}')
+        progress.clear()
+
+        self._report_errors(importer.errors)
+        self.stdout.write(self.style.SUCCESS('اكتمل الاستيراد: ' + self._summary(importer.stats)))
+        self.stdout.write(
+            f'مؤلفون جدد: {len(importer.authors.created)}، تصنيفات جديدة: {len(importer.categories.created)}'
+        )
+        if importer.stats['created'] or importer.stats['updated']:
+            self.stdout.write('شغّل generate_image_variants و ingest_pdfs لمعالجة الأغلفة وملفات PDF المستوردة')
+
+    @staticmethod
+    def _summary(stats):
+        return (f"أُنشئ {stats['created']}، حُدّث {stats['updated']}، "
+                f"تُخطي {stats['skipped']}، غير صالح {stats['invalid']}")
+
+    def _report_errors(self, errors, limit=20):
+        for number, message in sorted(errors)[:limit]:
+            self.stderr.write(f'السجل {number}: {message}')
+        if len(errors) > limit:
+            self.stderr.write(f'... و{len(errors) - limit} خطأ آخر')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from books import ingestion
+from books.models import Book
+from books.workers import run_batched
+
+
+class Command(BaseCommand):
+    help = 'استخراج عدد الصفحات وبيانات ونص ملفات PDF للكتب الحالية وإضافتها لفهرس البحث'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, action='append', dest='book_ids',
+                            help='استخراج ملف كتاب محدد (يمكن تكراره)')
+        parser.add_argument('--force', action='store_true',
+                            help='إعادة الاستخراج حتى للملفات المستخرجة سابقاً')
+        parser.add_argument('--sync', action='store_true',
+                            help='الاستخراج في هذه العملية بدلاً من مجموعة العمليات')
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='أقصى عدد من الملفات قيد الاستخراج في نفس الوقت (20 افتراضياً)')
+
+    def handle(self, *args, **options):
+        if not ingestion.is_available():
+            raise CommandError('مكتبة pypdf غير مثبتة (pip install pypdf)')
+
+        queryset = Book.objects.exclude(pdf_file__isnull=True).exclude(pdf_file='').order_by('pk')
+        if options['book_ids']:
+            queryset = queryset.filter(pk__in=options['book_ids'])
+        books = [book for book in queryset.iterator() if options['force'] or ingestion.needs_ingestion(book)]
+
+        failed = 0
+        try:
+            for result in run_batched(
+                lambda book: ingestion.ingest(book, sync=options['sync'] or None),
+                books,
+                max(options['batch_size'], 1),
+            ):
+                if result is None or getattr(result, 'error', ''):
+                    failed += 1
+        finally:
+            # ينتظر انتهاء حفظ النتائج من المهام الجارية
+            ingestion.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'تم استخراج محتوى {len(books) - failed} ملف'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'تعذر استخراج {failed} ملف'))
@@ -0,0 +1,206 @@
+import json
+import random
+import subprocess
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from books import urls
+from books.loadtest import login_session, run, summarize
+from books.models import Author, Book, Category
+
+# مسارات لا تُطلب: تغيّر البيانات أو تنهي الجلسة، أو تتطلب POST، أو لا تنتهي (البث)،
+# أو تحتاج رابطاً موقَّعاً (ملف PDF يُطلب عبر download_book)
+SKIPPED = {
+    'logout', 'delete_book', 'toggle_user_status', 'toggle_staff_status', 'toggle_bookmark',
+    'add_review', 'reading_beacon', 'statistics_stream', 'book_pdf',
+}
+# نسخ إضافية من بعض الصفحات بمعاملات تغيّر مسار تنفيذها
+VARIANTS = {
+    'book_list?q': ('book_list', {'q': None}),
+    'book_list?page': ('book_list', {'page': 3}),
+    'search_books?q': ('search_books', {'q': None}),
+}
+# نوع المثال لمعامل slug حسب المسار (الافتراضي رابط كتاب)
+SLUGS = {'books_by_category': 'category_slug', 'download_book': 'pdf_slug'}
+SEARCH_TERMS = ['تاريخ', 'رواية', 'الأدب العربي', 'python', 'history', 'science', 'فلسفة', 'modern']
+# عدد الأمثلة لكل معامل (كتب ومؤلفون وتصنيفات مختلفة بدل صفحة واحدة مخزنة)
+SAMPLES = 50
+
+
+def samples():
+    """أمثلة من الكتالوج لملء معاملات المسارات، تميل للكتب الأكثر مشاهدة كما في الإنتاج"""
+    books = list(Book.objects.order_by('-views').values_list('pk', 'slug')[:SAMPLES])
+    if not books:
+        raise CommandError('الكتالوج فارغ؛ ولّد بيانات أولاً بـ generate_catalog')
+    return {
+        'book_id': [pk for pk, _ in books],
+        'book_slug': [slug for _, slug in books],
+        # التحميل يحتاج كتاباً له ملف PDF
+        'pdf_slug': list(Book.objects.exclude(pdf_file='').exclude(pdf_file__isnull=True).values_list('slug', flat=True)[:SAMPLES]),
+        'category_slug': list(Category.objects.order_by('?').values_list('slug', flat=True)[:SAMPLES]),
+        'author_id': list(Author.objects.order_by('-stats__total_views').values_list('pk', flat=True)[:SAMPLES]),
+        'dataset': ['books'],
+    }
+
+
+def route_paths(pattern, values):
+    """المسارات الممكنة لمسار من books/urls.py بقيم من الأمثلة"""
+    params = list(pattern.pattern.converters)
+    if not params:
+        return [reverse(pattern.name)]
+    paths = []
+    for _ in range(SAMPLES):
+        kwargs = {}
+        for param in params:
+            key = param
+            if param == 'slug':
+                key = SLUGS.get(pattern.name, 'book_slug')
+            if not values.get(key):
+                return []
+            kwargs[param] = random.choice(values[key])
+        paths.append(reverse(pattern.name, kwargs=kwargs))
+    return sorted(set(paths))
+
+
+def targets(values, only=None, skip=()):
+    """[(الاسم، [المسارات])] لكل مسار في books/urls.py ونسخه الإضافية"""
+    found = {}
+    for pattern in urls.urlpatterns:
+        if pattern.name in SKIPPED or pattern.name in found:
+            continue
+        found[pattern.name] = route_paths(pattern, values)
+    for label, (name, params) in VARIANTS.items():
+        if found.get(name):
+            found[label] = sorted({
+                f'{reverse(name)}?' + urlencode({key: term if value is None else value for key, value in params.items()})
+                for term in SEARCH_TERMS
+            })
+    return [
+        (label, paths) for label, paths in found.items()
+        if paths and (not only or label in only) and label not in skip
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def change(current, baseline):
+    """نسبة التغير بالمئة، أو None إذا تعذرت المقارنة"""
+    if current is None or not baseline:
+        return None
+    return (current - baseline) / baseline * 100
+
+
+class Command(BaseCommand):
+    help = 'اختبار حمل لكل مسارات books/urls.py على خادم يعمل، مع حفظ التقرير كخط أساس ومقارنته لاحقاً'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='عنوان الخادم (يشارك هذه القاعدة)')
+        parser.add_argument('--concurrency', type=int, default=16, help='عدد العملاء المتزامنين')
+        parser.add_argument('--seconds', type=float, default=60, help='مدة القياس')
+        parser.add_argument('--warmup', type=float, default=5, help='ثوانٍ قبل القياس لتسخين المخازن والاتصالات')
+        parser.add_argument('--user', help='اسم مستخدم تُطلب الصفحات بجلسته (موظف لتغطية لوحة التحكم)')
+        parser.add_argument('--only', action='append', help='قياس مسار محدد فقط (يتكرر)')
+        parser.add_argument('--skip', action='append', default=[], help='استثناء مسار (يتكرر)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--save', help='حفظ التقرير في ملف JSON (خط أساس)')
+        parser.add_argument('--compare', help='مقارنة النتائج بخط أساس محفوظ')
+        parser.add_argument('--tolerance', type=float, default=20,
+                            help='أقصى زيادة مقبولة في p95 بالمئة قبل اعتبارها تراجعاً')
+        parser.add_argument('--fail-on-regression', action='store_true', help='إنهاء الأمر بخطأ عند أي تراجع')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        pages = targets(samples(), options['only'], set(options['skip']))
+        if not pages:
+            raise CommandError('لا مسارات للقياس')
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        headers = {}
+        session = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"المستخدم غير موجود: {options['user']}")
+            session, headers['Cookie'] = login_session(user)
+
+        self.stdout.write(
+            f"{len(pages)} مساراً، {options['concurrency']} عملاء، {options['seconds']} ثانية على {options['base_url']}"
+            f"{' بجلسة ' + options['user'] if options['user'] else ' بدون تسجيل دخول'}"
+        )
+        try:
+            if options['warmup']:
+                run(options['base_url'], pages, options['concurrency'], options['warmup'], headers)
+            results = run(options['base_url'], pages, options['concurrency'], options['seconds'], headers)
+        finally:
+            if session is not None:
+                session.delete()
+
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'base_url': options['base_url'],
+            'concurrency': options['concurrency'],
+            'seconds': options['seconds'],
+            'user': options['user'],
+            'catalog': {'books': Book.objects.count(), 'authors': Author.objects.count()},
+            'routes': {},
+        }
+        for label, _ in pages:
+            report['routes'][label] = summarize(
+                results['latencies'].get(label, []), results['errors'][label], options['seconds']
+            )
+        every = [value for values in results['latencies'].values() for value in values]
+        report['total'] = summarize(every, sum(results['errors'].values()), options['seconds'])
+
+        regressions = self.print_report(report, baseline, options['tolerance'])
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"حُفظ التقرير في {options['save']}")
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"تراجع في {len(regressions)} مسار: {', '.join(regressions)}")
+
+    def print_report(self, report, baseline, tolerance):
+        """جدول النتائج لكل مسار مع الفرق عن خط الأساس؛ يعيد المسارات التي تراجعت"""
+        regressions = []
+        header = f"{'المسار':<24}{'طلبات':>8}{'/ث':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'أخطاء':>7}"
+        if baseline:
+            header += f"{'p95 مقابل الأساس':>20}{'/ث مقابل الأساس':>18}"
+        self.stdout.write(header)
+        rows = sorted(report['routes'].items(), key=lambda item: -(item[1]['p95'] or 0))
+        for label, summary in rows + [('الإجمالي', report['total'])]:
+            line = f"{label:<24}{summary['requests']:>8}{summary['rps']:>8.1f}"
+            for p in ('p50', 'p95', 'p99'):
+                line += f"{summary[p]:>7.0f}ms" if summary[p] is not None else f"{'-':>9}"
+            line += f"{summary['errors']:>7}"
+            regressed = False
+            if baseline:
+                before = baseline['total'] if label == 'الإجمالي' else baseline['routes'].get(label)
+                if before:
+                    p95 = change(summary['p95'], before['p95'])
+                    rps = change(summary['rps'], before['rps'])
+                    line += f"{p95:>+19.0f}%" if p95 is not None else f"{'-':>20}"
+                    line += f"{rps:>+17.0f}%" if rps is not None else f"{'-':>18}"
+                    regressed = (p95 is not None and p95 > tolerance) or summary['errors'] > before['errors']
+                else:
+                    line += f"{'جديد':>20}"
+            if regressed and label != 'الإجمالي':
+                regressions.append(label)
+            style = self.style.ERROR if regressed else (self.style.WARNING if summary['errors'] else None)
+            self.stdout.write(style(line) if style else line)
+        return regressions
@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from books.activity import user_activity
+from books.models import ActivityRollup
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب ملخصات النشاط اليومي (الزوار المميزون وعدد كل نوع نشاط) من جدول الأنشطة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, action='append', dest='dates',
+                            help='إعادة الحساب ليوم محدد YYYY-MM-DD (يمكن تكراره)')
+
+    def handle(self, *args, **options):
+        user_activity.flush()
+        with transaction.atomic():
+            count = ActivityRollup.rebuild(options['dates'])
+        self.stdout.write(self.style.SUCCESS(f'تم تحديث ملخصات {count} يوم'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from books.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء فهرس البحث النصي للكتب'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend.vendor is None:
+            self.stdout.write(self.style.WARNING('قاعدة البيانات الحالية لا تدعم الفهرس النصي، سيُستخدم البحث العادي'))
+            return
+
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'تمت فهرسة {count} كتاب ({backend.vendor})'))
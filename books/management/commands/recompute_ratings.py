@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب متوسط التقييم وعدد المراجعات وتوزيع النجوم لجميع الكتب'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--book', type=int, action='append', dest='book_ids',
+                            help='إعادة الحساب لكتاب محدد (يمكن تكراره)')
+
+    def handle(self, *args, **options):
+        books = Book.objects.all()
+        if options['book_ids']:
+            books = books.filter(pk__in=options['book_ids'])
+
+        Book.recompute_rating_stats(books, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'تم تحديث إحصائيات {books.count()} كتاب'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from books.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'إعادة تجميع إحصائيات المؤلفين (الكتب، القراء، التقييم، الصفحات، المشاهدات، التحميلات)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', type=int, action='append', dest='author_ids',
+                            help='إعادة الحساب لمؤلف محدد (يمكن تكراره)')
+
+    def handle(self, *args, **options):
+        count = AuthorStats.refresh(options['author_ids'])
+        self.stdout.write(self.style.SUCCESS(f'تم تحديث إحصائيات {count} مؤلف'))
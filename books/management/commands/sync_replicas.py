@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'نسخ قاعدة بيانات SQLite الرئيسية إلى ملفات النسخ المتماثلة (لتجربة توجيه القراءات محلياً)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='تكرار النسخ كل عدد من الثواني (محاكاة تأخر النسخ)؛ 0 = مرة واحدة')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        aliases = settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('لا توجد نسخ متماثلة: عرّف DATABASE_REPLICA_URLS')
+        if primary.vendor != 'sqlite' or any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            raise CommandError('الأمر لملفات SQLite فقط؛ في PostgreSQL استخدم النسخ المتدفق (streaming replication)')
+
+        while True:
+            for alias in aliases:
+                self._copy(primary, connections[alias])
+                self.stdout.write(f'{alias}: {connections[alias].settings_dict["NAME"]}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def _copy(primary, replica):
+        primary.ensure_connection()
+        replica.ensure_connection()
+        # واجهة النسخ الاحتياطي في SQLite تنسخ صفحات القاعدة كاملة بلقطة متسقة
+        primary.connection.backup(replica.connection)
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:55
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Book = apps.get_model("books", "Book")
+    Review = apps.get_model("books", "Review")
+
+    stats = Review.objects.values("book").annotate(
+        total=Count("id"),
+        **{f"r{i}": Count("id", filter=Q(rating=i)) for i in range(1, 6)},
+    )
+    for row in stats:
+        counts = {f"rating_count_{i}": row[f"r{i}"] for i in range(1, 6)}
+        rating_sum = sum(row[f"r{i}"] * i for i in range(1, 6))
+        Book.objects.filter(pk=row["book"]).update(
+            review_count=row["total"],
+            avg_rating=rating_sum / row["total"],
+            **counts,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_useractivity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="avg_rating",
+            field=models.FloatField(default=0, verbose_name="متوسط التقييم"),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_count_1",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="تقييمات نجمة واحدة"
+            ),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_count_2",
+            field=models.PositiveIntegerField(default=0, verbose_name="تقييمات نجمتين"),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_count_3",
+            field=models.PositiveIntegerField(default=0, verbose_name="تقييمات 3 نجوم"),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_count_4",
+            field=models.PositiveIntegerField(default=0, verbose_name="تقييمات 4 نجوم"),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_count_5",
+            field=models.PositiveIntegerField(default=0, verbose_name="تقييمات 5 نجوم"),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="عدد المراجعات"),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def backfill_author_stats(apps, schema_editor):
+    Author = apps.get_model("books", "Author")
+    AuthorStats = apps.get_model("books", "AuthorStats")
+    Book = apps.get_model("books", "Book")
+    ReadingHistory = apps.get_model("books", "ReadingHistory")
+
+    books = {
+        row["author"]: row
+        for row in Book.objects.filter(author__isnull=False)
+        .values("author")
+        .annotate(
+            books=Count("id"),
+            pages=Sum("pages"),
+            views=Sum("views"),
+            downloads=Sum("downloads"),
+            reviews=Sum("review_count"),
+            rating_sum=Sum(F("avg_rating") * F("review_count")),
+        )
+    }
+    readers = {
+        row["book__author"]: row["readers"]
+        for row in ReadingHistory.objects.filter(book__author__isnull=False)
+        .values("book__author")
+        .annotate(readers=Count("user", distinct=True))
+    }
+    rows = []
+    for pk in Author.objects.values_list("pk", flat=True):
+        row = books.get(pk, {})
+        reviews = row.get("reviews") or 0
+        rows.append(
+            AuthorStats(
+                author_id=pk,
+                books_count=row.get("books") or 0,
+                readers_count=readers.get(pk, 0),
+                review_count=reviews,
+                avg_rating=(row.get("rating_sum") or 0) / reviews if reviews else 0,
+                total_pages=row.get("pages") or 0,
+                total_views=row.get("views") or 0,
+                total_downloads=row.get("downloads") or 0,
+            )
+        )
+    AuthorStats.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_rating_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "author",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="books.author",
+                        verbose_name="المؤلف",
+                    ),
+                ),
+                (
+                    "books_count",
+                    models.PositiveIntegerField(default=0, verbose_name="عدد الكتب"),
+                ),
+                (
+                    "readers_count",
+                    models.PositiveIntegerField(default=0, verbose_name="عدد القراء"),
+                ),
+                (
+                    "review_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="عدد المراجعات"
+                    ),
+                ),
+                (
+                    "avg_rating",
+                    models.FloatField(default=0, verbose_name="متوسط التقييم"),
+                ),
+                (
+                    "total_pages",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="إجمالي الصفحات"
+                    ),
+                ),
+                (
+                    "total_views",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="إجمالي المشاهدات"
+                    ),
+                ),
+                (
+                    "total_downloads",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="إجمالي التحميلات"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "إحصائيات المؤلف",
+                "verbose_name_plural": "إحصائيات المؤلفين",
+            },
+        ),
+        migrations.RunPython(backfill_author_stats, migrations.RunPython.noop),
+    ]
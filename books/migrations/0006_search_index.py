@@ -0,0 +1,29 @@
+# إنشاء فهرس البحث النصي (FTS5 على SQLite و tsvector/GIN على PostgreSQL)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from books.search import document_rows, get_backend
+
+    Book = apps.get_model("books", "Book")
+    backend = get_backend(schema_editor.connection)
+    backend.install()
+    backend.index(document_rows(Book.objects.order_by()))
+
+
+def drop_search_index(apps, schema_editor):
+    from books.search import get_backend
+
+    get_backend(schema_editor.connection).uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0005_authorstats"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+TYPE_FIELDS = {
+    "login": "logins",
+    "view_book": "book_views",
+    "read_book": "book_reads",
+    "review": "reviews",
+    "bookmark": "bookmarks",
+}
+
+
+def backfill_activity_rollup(apps, schema_editor):
+    UserActivity = apps.get_model("books", "UserActivity")
+    ActivityRollup = apps.get_model("books", "ActivityRollup")
+    ActivityVisitor = apps.get_model("books", "ActivityVisitor")
+
+    activities = UserActivity.objects.annotate(date=TruncDate("visited_at"))
+    rows = {}
+    for row in (
+        activities.values("date", "activity_type").annotate(n=Count("id")).order_by()
+    ):
+        rollup = rows.setdefault(row["date"], ActivityRollup(date=row["date"]))
+        field = TYPE_FIELDS.get(row["activity_type"])
+        if field:
+            setattr(rollup, field, row["n"])
+
+    visitors = activities.values("date", "user").distinct().order_by()
+    ActivityVisitor.objects.bulk_create(
+        [ActivityVisitor(date=row["date"], user_id=row["user"]) for row in visitors],
+        batch_size=1000,
+    )
+    for row in (
+        visitors.values("date").annotate(n=Count("user", distinct=True)).order_by()
+    ):
+        rows[row["date"]].visitors = row["n"]
+    ActivityRollup.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0006_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActivityRollup",
+            fields=[
+                (
+                    "date",
+                    models.DateField(
+                        primary_key=True, serialize=False, verbose_name="اليوم"
+                    ),
+                ),
+                (
+                    "visitors",
+                    models.PositiveIntegerField(default=0, verbose_name="الزوار"),
+                ),
+                (
+                    "logins",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="تسجيلات الدخول"
+                    ),
+                ),
+                (
+                    "book_views",
+                    models.PositiveIntegerField(default=0, verbose_name="عرض الكتب"),
+                ),
+                (
+                    "book_reads",
+                    models.PositiveIntegerField(default=0, verbose_name="قراءة الكتب"),
+                ),
+                (
+                    "reviews",
+                    models.PositiveIntegerField(default=0, verbose_name="التقييمات"),
+                ),
+                (
+                    "bookmarks",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="الإشارات المرجعية"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "ملخص النشاط اليومي",
+                "verbose_name_plural": "ملخصات النشاط اليومي",
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="useractivity",
+            name="visited_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name="ActivityVisitor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="اليوم")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="المستخدم",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "زائر يومي",
+                "verbose_name_plural": "الزوار اليوميون",
+                "unique_together": {("date", "user")},
+            },
+        ),
+        migrations.RunPython(backfill_activity_rollup, migrations.RunPython.noop),
+    ]
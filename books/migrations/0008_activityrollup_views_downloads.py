@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0007_activity_rollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activityrollup",
+            name="downloads",
+            field=models.PositiveIntegerField(default=0, verbose_name="التحميلات"),
+        ),
+        migrations.AddField(
+            model_name="activityrollup",
+            name="views",
+            field=models.PositiveIntegerField(default=0, verbose_name="المشاهدات"),
+        ),
+    ]
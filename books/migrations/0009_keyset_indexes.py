@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0008_activityrollup_views_downloads"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="authorstats",
+            index=models.Index(
+                fields=["books_count", "author"], name="authorstats_books_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["created_at", "id"], name="book_created_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["category", "created_at", "id"], name="book_category_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["author", "created_at", "id"], name="book_author_keyset_idx"
+            ),
+        ),
+        # ترقيم المستخدمين في لوحة التحكم بالمؤشرات (date_joined, id)
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS auth_user_joined_keyset_idx "
+            "ON auth_user (date_joined, id)",
+            "DROP INDEX IF EXISTS auth_user_joined_keyset_idx",
+        ),
+    ]
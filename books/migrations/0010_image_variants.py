@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0009_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="author",
+            name="avatar_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="نسخ الصورة الشخصية",
+            ),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="cover_variants",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="نسخ الغلاف"
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rebuild_search_index(apps, schema_editor):
+    # إعادة إنشاء الفهرس بعمود نص ملف PDF
+    from books.search import document_rows, get_backend
+
+    Book = apps.get_model("books", "Book")
+    backend = get_backend(schema_editor.connection)
+    backend.uninstall()
+    backend.install()
+    backend.index(document_rows(Book.objects.order_by()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0010_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookContent",
+            fields=[
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="pdf_content",
+                        serialize=False,
+                        to="books.book",
+                        verbose_name="الكتاب",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(max_length=255, verbose_name="الملف المستخرج منه"),
+                ),
+                (
+                    "page_count",
+                    models.PositiveIntegerField(default=0, verbose_name="عدد الصفحات"),
+                ),
+                (
+                    "metadata",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="بيانات الملف"
+                    ),
+                ),
+                (
+                    "text",
+                    models.BinaryField(blank=True, default=b"", verbose_name="النص"),
+                ),
+                (
+                    "error",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="خطأ الاستخراج"
+                    ),
+                ),
+                (
+                    "extracted_at",
+                    models.DateTimeField(auto_now=True, verbose_name="تاريخ الاستخراج"),
+                ),
+            ],
+            options={
+                "verbose_name": "محتوى كتاب",
+                "verbose_name_plural": "محتوى الكتب",
+            },
+        ),
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
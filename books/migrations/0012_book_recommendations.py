@@ -0,0 +1,59 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0011_book_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookRecommendation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="الترتيب")),
+                ("score", models.FloatField(verbose_name="درجة التشابه")),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommendations",
+                        to="books.book",
+                        verbose_name="الكتاب",
+                    ),
+                ),
+                (
+                    "recommended",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommended_for",
+                        to="books.book",
+                        verbose_name="الكتاب المقترح",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "كتاب مقترح",
+                "verbose_name_plural": "الكتب المقترحة",
+                "ordering": ["book", "rank"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("book", "rank"),
+                        name="bookrecommendation_book_rank_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+# فهارس جدول المستخدمين (نموذج django.contrib.auth لا نملك Meta الخاص به)
+USER_INDEXES = [
+    # التحقق من عدم تكرار البريد عند التسجيل
+    ("auth_user_email_idx", "(email)"),
+    ("auth_user_active_idx", "(is_active)"),
+    # عدد الموظفين: قلة من المستخدمين
+    ("auth_user_staff_idx", "(id) WHERE is_staff"),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0012_book_recommendations"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="author",
+            index=models.Index(fields=["name"], name="author_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="author",
+            index=models.Index(
+                condition=models.Q(("is_featured", True)),
+                fields=["name"],
+                name="author_featured_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["is_free", "created_at", "id"], name="book_free_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["language", "created_at", "id"], name="book_language_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                condition=models.Q(("is_featured", True)),
+                fields=["created_at", "id"],
+                name="book_featured_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["avg_rating", "review_count"], name="book_top_rated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="readinghistory",
+            index=models.Index(
+                fields=["user", "last_read"], name="history_user_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["created_at", "rating"], name="review_created_idx"
+            ),
+        ),
+        migrations.RunSQL(
+            [
+                f"CREATE INDEX IF NOT EXISTS {name} ON auth_user {columns}"
+                for name, columns in USER_INDEXES
+            ],
+            [f"DROP INDEX IF EXISTS {name}" for name, _ in USER_INDEXES],
+        ),
+    ]
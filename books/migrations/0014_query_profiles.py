@@ -0,0 +1,125 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0013_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueryProfile",
+            fields=[
+                (
+                    "url_name",
+                    models.CharField(
+                        max_length=200,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="الصفحة",
+                    ),
+                ),
+                (
+                    "requests",
+                    models.PositiveIntegerField(default=0, verbose_name="الطلبات"),
+                ),
+                (
+                    "queries",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="الاستعلامات"
+                    ),
+                ),
+                (
+                    "time_ms",
+                    models.FloatField(default=0, verbose_name="زمن الاستعلامات (ms)"),
+                ),
+                (
+                    "max_queries",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="أكبر عدد استعلامات"
+                    ),
+                ),
+                (
+                    "max_time_ms",
+                    models.FloatField(
+                        default=0, verbose_name="أطول زمن استعلامات (ms)"
+                    ),
+                ),
+                (
+                    "over_budget",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="طلبات تجاوزت الميزانية"
+                    ),
+                ),
+                (
+                    "n_plus_one",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="طلبات فيها استعلام مكرر (N+1)"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "استعلامات صفحة",
+                "verbose_name_plural": "استعلامات الصفحات",
+                "ordering": ["-over_budget", "-max_queries"],
+            },
+        ),
+        migrations.CreateModel(
+            name="QueryFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=16, verbose_name="البصمة")),
+                ("sql", models.TextField(verbose_name="الاستعلام")),
+                (
+                    "requests",
+                    models.PositiveIntegerField(default=0, verbose_name="الطلبات"),
+                ),
+                (
+                    "executions",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="مرات التنفيذ"
+                    ),
+                ),
+                (
+                    "max_repeats",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="أكثر تكرار في طلب"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fingerprints",
+                        to="books.queryprofile",
+                        verbose_name="الصفحة",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "استعلام مكرر",
+                "verbose_name_plural": "الاستعلامات المكررة",
+                "ordering": ["-max_repeats"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("profile", "fingerprint"),
+                        name="queryfingerprint_profile_fingerprint_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def merge_duplicate_history(apps, schema_editor):
+    """دمج السجلات المكررة لكل (مستخدم، كتاب) في أحدثها قبل إضافة القيد"""
+    ReadingHistory = apps.get_model("books", "ReadingHistory")
+
+    duplicates = (
+        ReadingHistory.objects.values("user", "book")
+        .annotate(
+            rows=Count("id"),
+            last=Max("last_read"),
+            progress_max=Max("progress"),
+            minutes=Sum("reading_duration_minutes"),
+        )
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        rows = ReadingHistory.objects.filter(user=row["user"], book=row["book"])
+        keep = rows.order_by("-last_read", "-id").values_list("id", flat=True).first()
+        rows.exclude(id=keep).delete()
+        # update() لا يطبق auto_now، فيبقى آخر وقت قراءة كما هو
+        ReadingHistory.objects.filter(id=keep).update(
+            last_read=row["last"],
+            progress=row["progress_max"],
+            reading_duration_minutes=row["minutes"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0014_query_profiles"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_history, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="readinghistory",
+            constraint=models.UniqueConstraint(
+                fields=("user", "book"), name="readinghistory_user_book_uniq"
+            ),
+        ),
+    ]
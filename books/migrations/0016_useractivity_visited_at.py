@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0015_readinghistory_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="useractivity",
+            name="visited_at",
+            field=models.DateTimeField(
+                db_index=True, default=django.utils.timezone.now
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# فهرس البحث على PostgreSQL دون المفتاح الأجنبي إلى books_book (يمنع TRUNCATE في flush والاختبارات)
+
+from django.db import migrations
+
+
+def drop_search_foreign_key(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from books.search import SEARCH_TABLE
+
+    schema_editor.execute(
+        f"ALTER TABLE IF EXISTS {SEARCH_TABLE} DROP CONSTRAINT IF EXISTS {SEARCH_TABLE}_book_id_fkey"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0016_useractivity_visited_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_foreign_key, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
+import zlib
 
 class Category(models.Model):
     name = models.CharField(max_length=100, verbose_name="اسم التصنيف")
@@ -33,6 +35,8 @@ class Author(models.Model):
     name = models.CharField(max_length=200, verbose_name="اسم المؤلف")
     bio = models.TextField(verbose_name="السيرة الذاتية", blank=True, null=True)
     avatar = models.ImageField(upload_to='authors/avatars/', verbose_name="الصورة الشخصية", blank=True, null=True)
+    # نسخ الصورة المصغرة بالأحجام والصيغ المختلفة (تُولَّد في books/images.py)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="نسخ الصورة الشخصية")
     specialization = models.CharField(max_length=200, verbose_name="التخصص", blank=True, null=True)
     website = models.URLField(verbose_name="الموقع الإلكتروني", blank=True, null=True)
     email = models.EmailField(verbose_name="البريد الإلكتروني", blank=True, null=True)
@@ -44,17 +48,39 @@ class Author(models.Model):
         verbose_name = "مؤلف"
         verbose_name_plural = "المؤلفون"
         ordering = ['name']
+        indexes = [
+            # الترتيب الافتراضي والبحث عن المؤلف بالاسم عند الاستيراد
+            models.Index(fields=['name'], name='author_name_idx'),
+            # المؤلفون المميزون في الصفحة الرئيسية (قلة من المؤلفين)
+            models.Index(fields=['name'], condition=models.Q(is_featured=True), name='author_featured_idx'),
+        ]
     
     def __str__(self):
         return self.name
         
+    def get_stats(self):
+        """إحصائيات المؤلف المخزنة أو None إذا لم تُحسب بعد"""
+        try:
+            return self.stats
+        except AuthorStats.DoesNotExist:
+            return None
+
     def get_books_count(self):
+        stats = self.get_stats()
+        if stats:
+            return stats.books_count
         return self.books.count()
 
     def get_total_readers(self):
+        stats = self.get_stats()
+        if stats:
+            return stats.readers_count
         return ReadingHistory.objects.filter(book__author=self).values('user').distinct().count()
 
     def average_rating(self):
+        stats = self.get_stats()
+        if stats:
+            return stats.avg_rating
         from django.db.models import Avg
         avg = self.books.aggregate(avg_rating=Avg('reviews__rating'))['avg_rating']
         return avg if avg else 0
@@ -66,6 +92,8 @@ class Book(models.Model):
     author_name = models.CharField(max_length=100, verbose_name="اسم المؤلف (إذا لم يكن مسجلاً)", blank=True, null=True)  # ← إضافة حقل احتياطي
     description = models.TextField(verbose_name="الوصف")
     cover_image = models.ImageField(upload_to='book_covers/', verbose_name="صورة الغلاف", blank=True, null=True)
+    # نسخ الغلاف المصغرة بالأحجام والصيغ المختلفة (تُولَّد في books/images.py)
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="نسخ الغلاف")
     pdf_file = models.FileField(upload_to='books/pdfs/', blank=True, null=True, verbose_name="ملف PDF")
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='books', verbose_name="التصنيف")
     published_year = models.IntegerField(verbose_name="سنة النشر")
@@ -80,34 +108,150 @@ class Book(models.Model):
     downloads = models.IntegerField(default=0, verbose_name="عدد التحميلات")
     views = models.IntegerField(default=0, verbose_name="عدد المشاهدات")
 
+    # إحصائيات التقييم المخزنة (تُحدَّث مع كل إضافة أو تعديل أو حذف لمراجعة)
+    avg_rating = models.FloatField(default=0, verbose_name="متوسط التقييم")
+    review_count = models.PositiveIntegerField(default=0, verbose_name="عدد المراجعات")
+    rating_count_1 = models.PositiveIntegerField(default=0, verbose_name="تقييمات نجمة واحدة")
+    rating_count_2 = models.PositiveIntegerField(default=0, verbose_name="تقييمات نجمتين")
+    rating_count_3 = models.PositiveIntegerField(default=0, verbose_name="تقييمات 3 نجوم")
+    rating_count_4 = models.PositiveIntegerField(default=0, verbose_name="تقييمات 4 نجوم")
+    rating_count_5 = models.PositiveIntegerField(default=0, verbose_name="تقييمات 5 نجوم")
+
     class Meta:
         verbose_name = "كتاب"
         verbose_name_plural = "الكتب"
         ordering = ['-created_at']
+        # فهارس مطابقة لترتيب الترقيم بالمؤشرات (created_at, id)
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='book_created_keyset_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='book_category_keyset_idx'),
+            models.Index(fields=['author', 'created_at', 'id'], name='book_author_keyset_idx'),
+            # تصفية قائمة الكتب حسب السعر واللغة مع نفس الترتيب، وعدد الكتب المجانية
+            models.Index(fields=['is_free', 'created_at', 'id'], name='book_free_keyset_idx'),
+            models.Index(fields=['language', 'created_at', 'id'], name='book_language_keyset_idx'),
+            # الكتب المميزة قليلة: فهرس جزئي لها فقط
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_featured=True), name='book_featured_idx'),
+            # الأعلى تقييماً في الصفحة الرئيسية
+            models.Index(fields=['avg_rating', 'review_count'], name='book_top_rated_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
-    def save(self, *args, **kwargs):
+    # حقول تُحدَّث بتعبيرات F() أو في الخلفية (العدادات والتقييمات ونسخ الغلاف)
+    DERIVED_FIELDS = (
+        'views', 'downloads', 'avg_rating', 'review_count',
+        'rating_count_1', 'rating_count_2', 'rating_count_3', 'rating_count_4', 'rating_count_5',
+        'cover_variants',
+    )
+
+    def save(self, *args, keep_derived=False, **kwargs):
+        """keep_derived=True يحفظ كل الحقول عدا DERIVED_FIELDS، فلا تكتب نسخة قديمة من الكتاب
+        (مثل نموذج التعديل) فوق عدادات كُتبت بعد تحميلها"""
         if not self.slug:
             self.slug = slugify(self.title, allow_unicode=True)
+        if keep_derived and not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DERIVED_FIELDS and f.attname not in deferred
+            ]
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         return reverse('book_detail', kwargs={'slug': self.slug})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # نحتفظ بالمؤلف الأصلي لتحديث إحصائيات المؤلفين عند نقل الكتاب
+        instance._loaded_author_id = instance.__dict__.get('author_id')
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
     
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum([review.rating for review in reviews]) / len(reviews)
-        return 0
+        return self.avg_rating
+
+    def ratings_histogram(self):
+        """توزيع التقييمات من 5 نجوم إلى نجمة واحدة"""
+        return [
+            {'stars': i, 'count': getattr(self, f'rating_count_{i}')}
+            for i in range(5, 0, -1)
+        ]
+
+    @classmethod
+    def apply_rating_change(cls, book_id, added=None, removed=None):
+        """تحديث إحصائيات التقييم تزايدياً عند إضافة تقييم أو حذفه أو تغييره"""
+        from django.db.models import F, Case, When, Value
+        from django.db.models.functions import Greatest
+
+        def decrement(field):
+            # مراجعات bulk_create لا ترسل إشارات فقد تكون الأعداد المخزنة أقل من الفعلية؛
+            # لا ننزل تحت الصفر (قيد PositiveIntegerField)
+            return Greatest(F(field) - 1, 0)
+
+        counts = {}
+        if added:
+            counts[f'rating_count_{added}'] = F(f'rating_count_{added}') + 1
+        if removed:
+            counts[f'rating_count_{removed}'] = decrement(f'rating_count_{removed}')
+        if not counts:
+            return
+        if added and not removed:
+            counts['review_count'] = F('review_count') + 1
+        elif removed and not added:
+            counts['review_count'] = decrement('review_count')
+
+        books = cls.objects.filter(pk=book_id)
+        books.update(**counts)
+        # المتوسط يُحسب من التوزيع في استعلام ثانٍ ليقرأ القيم المحدثة
+        rating_sum = sum(F(f'rating_count_{i}') * i for i in range(1, 6))
+        books.update(avg_rating=Case(
+            When(review_count=0, then=Value(0.0)),
+            default=rating_sum * 1.0 / F('review_count'),
+            output_field=models.FloatField(),
+        ))
+
+    @classmethod
+    def recompute_rating_stats(cls, queryset=None, batch_size=500):
+        """إعادة حساب إحصائيات التقييم من جدول المراجعات (للإصلاح الجماعي)"""
+        from django.db.models import Count, Q
+
+        books = cls.objects.all() if queryset is None else queryset
+        aggregates = Review.objects.filter(book__in=books).values('book').annotate(
+            total=Count('id'),
+            **{f'r{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)}
+        )
+        stats = {row['book']: row for row in aggregates}
+
+        fields = ['avg_rating', 'review_count'] + [f'rating_count_{i}' for i in range(1, 6)]
+        updated = []
+        for book in books.only('pk', *fields).iterator(chunk_size=batch_size):
+            row = stats.get(book.pk)
+            book.review_count = row['total'] if row else 0
+            for i in range(1, 6):
+                setattr(book, f'rating_count_{i}', row[f'r{i}'] if row else 0)
+            book.avg_rating = (
+                sum(getattr(book, f'rating_count_{i}') * i for i in range(1, 6)) / book.review_count
+                if book.review_count else 0
+            )
+            updated.append(book)
+            if len(updated) >= batch_size:
+                cls.objects.bulk_update(updated, fields)
+                updated = []
+        if updated:
+            cls.objects.bulk_update(updated, fields)
+
     def increment_views(self):
+        from .counters import book_counters
         self.views += 1
-        self.save(update_fields=['views'])
+        book_counters.incr(self.pk, 'views')
 
     def increment_downloads(self):
+        from .counters import book_counters
         self.downloads += 1
-        self.save(update_fields=['downloads'])
+        book_counters.incr(self.pk, 'downloads')
 
 
 class Review(models.Model):
@@ -125,6 +269,20 @@ class Review(models.Model):
         verbose_name_plural = "المراجعات"
         ordering = ['-created_at']
         unique_together = ['book', 'user']
+        indexes = [
+            # الإحصائيات الزمنية حسب تاريخ المراجعة، ومتوسط التقييمات من الفهرس وحده
+            models.Index(fields=['created_at', 'rating'], name='review_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # نحتفظ بالتقييم الأصلي لحساب الفرق عند الحفظ، إلا إذا حُمِّلت المراجعة دونه
+        # (only أو defer) فيُعاد حساب إحصائيات الكتاب كاملة
+        if not {'rating', 'book_id'} & instance.get_deferred_fields():
+            instance._loaded_rating = instance.rating
+            instance._loaded_book_id = instance.book_id
+        return instance
     
     def __str__(self):
         return f"مراجعة {self.user.username} على {self.book.title}"
@@ -140,6 +298,14 @@ class ReadingHistory(models.Model):
         verbose_name = "سجل القراءة"
         verbose_name_plural = "سجلات القراءة"
         ordering = ['-last_read']
+        indexes = [
+            # آخر ما قرأه المستخدم في لوحة التحكم والملف الشخصي
+            models.Index(fields=['user', 'last_read'], name='history_user_recent_idx'),
+        ]
+        constraints = [
+            # سجل واحد لكل (مستخدم، كتاب) حتى مع كتابة عدة عمليات للمخزن في نفس الوقت
+            models.UniqueConstraint(fields=['user', 'book'], name='readinghistory_user_book_uniq'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
@@ -155,4 +321,313 @@ class Bookmark(models.Model):
         unique_together = ['user', 'book']
     
     def __str__(self):
-        return f"{self.user.username} - {self.book.title}"
\ No newline at end of file
+        return f"{self.user.username} - {self.book.title}"
+
+
+class UserActivity(models.Model):
+    """نموذج لتتبع نشاط المستخدمين"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
+    activity_type = models.CharField(max_length=50, choices=[
+        ('login', 'تسجيل دخول'),
+        ('view_book', 'عرض كتاب'),
+        ('read_book', 'قراءة كتاب'),
+        ('review', 'إضافة تقييم'),
+        ('bookmark', 'إضافة إشارة مرجعية'),
+    ])
+    details = models.TextField(blank=True, null=True)
+    # وقت النشاط نفسه، لا وقت كتابته من المخزن المؤجل
+    visited_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        verbose_name = "نشاط المستخدم"
+        verbose_name_plural = "أنشطة المستخدمين"
+        ordering = ['-visited_at']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.activity_type} - {self.visited_at}"
+
+
+class AuthorStats(models.Model):
+    """إحصائيات مجمعة لكل مؤلف تُحدَّث عبر الإشارات أو أمر التجميع الدوري"""
+    author = models.OneToOneField(Author, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="المؤلف")
+    books_count = models.PositiveIntegerField(default=0, verbose_name="عدد الكتب")
+    readers_count = models.PositiveIntegerField(default=0, verbose_name="عدد القراء")
+    review_count = models.PositiveIntegerField(default=0, verbose_name="عدد المراجعات")
+    avg_rating = models.FloatField(default=0, verbose_name="متوسط التقييم")
+    total_pages = models.PositiveIntegerField(default=0, verbose_name="إجمالي الصفحات")
+    total_views = models.PositiveIntegerField(default=0, verbose_name="إجمالي المشاهدات")
+    total_downloads = models.PositiveIntegerField(default=0, verbose_name="إجمالي التحميلات")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "إحصائيات المؤلف"
+        verbose_name_plural = "إحصائيات المؤلفين"
+        indexes = [
+            models.Index(fields=['books_count', 'author'], name='authorstats_books_keyset_idx'),
+        ]
+
+    def __str__(self):
+        return f"إحصائيات {self.author}"
+
+    @classmethod
+    def refresh(cls, author_ids=None):
+        """إعادة حساب الإحصائيات لمؤلفين محددين (أو للجميع) باستعلامات مجمعة"""
+        from django.db.models import Count, Sum, F
+
+        authors = Author.objects.all()
+        books = Book.objects.filter(author__isnull=False)
+        history = ReadingHistory.objects.filter(book__author__isnull=False)
+        if author_ids is not None:
+            author_ids = [pk for pk in author_ids if pk]
+            authors = authors.filter(pk__in=author_ids)
+            books = books.filter(author_id__in=author_ids)
+            history = history.filter(book__author_id__in=author_ids)
+        ids = list(authors.values_list('pk', flat=True))
+        if not ids:
+            return 0
+
+        books = books.values('author').annotate(
+            books=Count('id'),
+            pages=Sum('pages'),
+            views=Sum('views'),
+            downloads=Sum('downloads'),
+            reviews=Sum('review_count'),
+            rating_sum=Sum(F('avg_rating') * F('review_count')),
+        )
+        books_map = {row['author']: row for row in books}
+        readers = history.values('book__author').annotate(
+            readers=Count('user', distinct=True)
+        )
+        readers_map = {row['book__author']: row['readers'] for row in readers}
+
+        rows = []
+        for pk in ids:
+            row = books_map.get(pk, {})
+            reviews = row.get('reviews') or 0
+            rows.append(cls(
+                author_id=pk,
+                books_count=row.get('books') or 0,
+                readers_count=readers_map.get(pk, 0),
+                review_count=reviews,
+                avg_rating=(row.get('rating_sum') or 0) / reviews if reviews else 0,
+                total_pages=row.get('pages') or 0,
+                total_views=row.get('views') or 0,
+                total_downloads=row.get('downloads') or 0,
+            ))
+        cls.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['author'],
+            update_fields=[
+                'books_count', 'readers_count', 'review_count', 'avg_rating',
+                'total_pages', 'total_views', 'total_downloads', 'updated_at',
+            ],
+        )
+        return len(rows)
+
+
+class ActivityRollup(models.Model):
+    """ملخص يومي لنشاط المستخدمين يُحدَّث تزايدياً مع كل دفعة أنشطة"""
+    # حقل العداد في الملخص لكل نوع نشاط
+    TYPE_FIELDS = {
+        'login': 'logins',
+        'view_book': 'book_views',
+        'read_book': 'book_reads',
+        'review': 'reviews',
+        'bookmark': 'bookmarks',
+    }
+
+    date = models.DateField(primary_key=True, verbose_name="اليوم")
+    visitors = models.PositiveIntegerField(default=0, verbose_name="الزوار")
+    logins = models.PositiveIntegerField(default=0, verbose_name="تسجيلات الدخول")
+    book_views = models.PositiveIntegerField(default=0, verbose_name="عرض الكتب")
+    book_reads = models.PositiveIntegerField(default=0, verbose_name="قراءة الكتب")
+    reviews = models.PositiveIntegerField(default=0, verbose_name="التقييمات")
+    bookmarks = models.PositiveIntegerField(default=0, verbose_name="الإشارات المرجعية")
+    # مشاهدات وتحميلات الكتب لجميع الزوار (تُضاف عند كتابة عدادات الكتب)
+    views = models.PositiveIntegerField(default=0, verbose_name="المشاهدات")
+    downloads = models.PositiveIntegerField(default=0, verbose_name="التحميلات")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "ملخص النشاط اليومي"
+        verbose_name_plural = "ملخصات النشاط اليومي"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"نشاط {self.date}"
+
+    @classmethod
+    def for_date(cls, date=None):
+        """ملخص يوم محدد (اليوم افتراضياً)، أو ملخص فارغ إن لم يُسجَّل فيه نشاط"""
+        date = date or timezone.localdate()
+        return cls.objects.filter(pk=date).first() or cls(date=date)
+
+    def as_dict(self):
+        return {
+            'visitors': self.visitors,
+            **{field: getattr(self, field) for field in self.TYPE_FIELDS.values()},
+            'views': self.views,
+            'downloads': self.downloads,
+        }
+
+    @classmethod
+    def rebuild(cls, dates=None):
+        """إعادة حساب الملخصات (والزوار المميزين) من جدول الأنشطة"""
+        from django.db.models import Count
+        from django.db.models.functions import TruncDate
+
+        activities = UserActivity.objects.annotate(date=TruncDate('visited_at'))
+        if dates is not None:
+            activities = activities.filter(date__in=dates)
+
+        rows = {}
+        for row in activities.values('date', 'activity_type').annotate(n=Count('id')).order_by():
+            rollup = rows.setdefault(row['date'], cls(date=row['date']))
+            field = cls.TYPE_FIELDS.get(row['activity_type'])
+            if field:
+                setattr(rollup, field, row['n'])
+
+        visitors = activities.values('date', 'user').distinct().order_by()
+        ActivityVisitor.objects.filter(date__in=rows).delete()
+        ActivityVisitor.objects.bulk_create(
+            [ActivityVisitor(date=row['date'], user_id=row['user']) for row in visitors.iterator()],
+            batch_size=1000,
+        )
+        for row in visitors.values('date').annotate(n=Count('user', distinct=True)).order_by():
+            rows[row['date']].visitors = row['n']
+
+        cls.objects.bulk_create(
+            rows.values(),
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['visitors', *cls.TYPE_FIELDS.values(), 'updated_at'],
+        )
+        return len(rows)
+
+
+class ActivityVisitor(models.Model):
+    """المستخدمون المميزون لكل يوم (لحساب عدد الزوار في الملخص دون مسح جدول الأنشطة)"""
+    date = models.DateField(verbose_name="اليوم")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name="المستخدم")
+
+    class Meta:
+        verbose_name = "زائر يومي"
+        verbose_name_plural = "الزوار اليوميون"
+        unique_together = ['date', 'user']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date}"
+
+
+class BookContent(models.Model):
+    """محتوى ملف PDF للكتاب: عدد الصفحات وبياناته ونص صفحاته (يُستخرج في books/ingestion.py)"""
+    # فاصل الصفحات في النص المخزن
+    PAGE_SEPARATOR = '\f'
+
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='pdf_content', verbose_name="الكتاب")
+    source = models.CharField(max_length=255, verbose_name="الملف المستخرج منه")
+    page_count = models.PositiveIntegerField(default=0, verbose_name="عدد الصفحات")
+    metadata = models.JSONField(default=dict, blank=True, verbose_name="بيانات الملف")
+    # نص الصفحات مضغوطاً بـ zlib (أصغر بكثير من النص الخام)
+    text = models.BinaryField(default=b'', blank=True, verbose_name="النص")
+    error = models.CharField(max_length=255, blank=True, verbose_name="خطأ الاستخراج")
+    extracted_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ الاستخراج")
+
+    class Meta:
+        verbose_name = "محتوى كتاب"
+        verbose_name_plural = "محتوى الكتب"
+
+    def __str__(self):
+        return f"{self.book_id} - {self.page_count}"
+
+    @classmethod
+    def compress(cls, pages):
+        return zlib.compress(cls.PAGE_SEPARATOR.join(pages).encode(), 6)
+
+    @staticmethod
+    def decompress(data):
+        return zlib.decompress(bytes(data)).decode() if data else ''
+
+    @property
+    def full_text(self):
+        return self.decompress(self.text)
+
+    @property
+    def pages(self):
+        """نص كل صفحة بالترتيب"""
+        text = self.full_text
+        return text.split(self.PAGE_SEPARATOR) if text else []
+
+
+class BookRecommendation(models.Model):
+    """أقرب الكتب لكل كتاب حسب تزامن القراءة والإشارات والتقييمات (يُبنى في books/recommendations.py)"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='recommendations', verbose_name="الكتاب")
+    recommended = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='recommended_for', verbose_name="الكتاب المقترح")
+    rank = models.PositiveSmallIntegerField(verbose_name="الترتيب")
+    score = models.FloatField(verbose_name="درجة التشابه")
+
+    class Meta:
+        verbose_name = "كتاب مقترح"
+        verbose_name_plural = "الكتب المقترحة"
+        ordering = ['book', 'rank']
+        # قراءة المقترحات لكتاب تتم من هذا الفهرس مباشرة بالترتيب
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='bookrecommendation_book_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} -> {self.recommended_id} ({self.score:.3f})"
+
+
+class QueryProfile(models.Model):
+    """استعلامات قاعدة البيانات لكل صفحة مجمعة من كل العمال (تُكتب من books/querybudget.py)"""
+    url_name = models.CharField(max_length=200, primary_key=True, verbose_name="الصفحة")
+    requests = models.PositiveIntegerField(default=0, verbose_name="الطلبات")
+    queries = models.PositiveBigIntegerField(default=0, verbose_name="الاستعلامات")
+    time_ms = models.FloatField(default=0, verbose_name="زمن الاستعلامات (ms)")
+    max_queries = models.PositiveIntegerField(default=0, verbose_name="أكبر عدد استعلامات")
+    max_time_ms = models.FloatField(default=0, verbose_name="أطول زمن استعلامات (ms)")
+    over_budget = models.PositiveIntegerField(default=0, verbose_name="طلبات تجاوزت الميزانية")
+    n_plus_one = models.PositiveIntegerField(default=0, verbose_name="طلبات فيها استعلام مكرر (N+1)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "استعلامات صفحة"
+        verbose_name_plural = "استعلامات الصفحات"
+        ordering = ['-over_budget', '-max_queries']
+
+    def __str__(self):
+        return self.url_name
+
+    @property
+    def avg_queries(self):
+        return self.queries / self.requests if self.requests else 0
+
+    @property
+    def avg_time_ms(self):
+        return self.time_ms / self.requests if self.requests else 0
+
+
+class QueryFingerprint(models.Model):
+    """استعلام تكرر في طلب واحد أكثر من حد N+1، بقيمه مستبدلة بعلامات"""
+    profile = models.ForeignKey(QueryProfile, on_delete=models.CASCADE, related_name='fingerprints', verbose_name="الصفحة")
+    fingerprint = models.CharField(max_length=16, verbose_name="البصمة")
+    sql = models.TextField(verbose_name="الاستعلام")
+    requests = models.PositiveIntegerField(default=0, verbose_name="الطلبات")
+    executions = models.PositiveBigIntegerField(default=0, verbose_name="مرات التنفيذ")
+    max_repeats = models.PositiveIntegerField(default=0, verbose_name="أكثر تكرار في طلب")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "استعلام مكرر"
+        verbose_name_plural = "الاستعلامات المكررة"
+        ordering = ['-max_repeats']
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'fingerprint'], name='queryfingerprint_profile_fingerprint_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.profile_id} ×{self.max_repeats}"
@@ -0,0 +1,265 @@
+"""
+ترقيم الصفحات بالمؤشرات (keyset / cursor).
+
+الصفحات الأولى تُخدم بأرقام الصفحات كالمعتاد (لتعمل القوالب الحالية)، ومن آخر
+صفحة "قريبة" يصبح رابط الصفحة التالية مؤشراً مشفراً يحمل قيم الترتيب لآخر عنصر.
+صفحة المؤشر تُجلب بشرط (created_at, id) < (القيم) مع LIMIT، فتستفيد من الفهرس
+المطابق للترتيب دون OFFSET، ويبقى زمنها ثابتاً مهما تعمق الزائر.
+
+عدد النتائج الكلي (للعرض فقط) يُخزن مؤقتاً بدلاً من COUNT(*) مع كل طلب، وفي PostgreSQL
+يُقدَّر عدد صفوف الجداول الكبيرة غير المصفاة من إحصاءات المخطط بدل عدها.
+"""
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import OrderBy, Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'books.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def shallow_pages():
+    """عدد الصفحات التي تُخدم بأرقام الصفحات قبل التحول إلى المؤشرات"""
+    return getattr(settings, 'PAGINATION_SHALLOW_PAGES', 5)
+
+
+def estimated_count(queryset):
+    """
+    تقدير عدد صفوف جدول كامل من pg_class.reltuples (يحدّثه ANALYZE و autovacuum)؛
+    COUNT(*) في PostgreSQL يقرأ الجدول كله. يعيد None إن كان الاستعلام مصفى أو فيه
+    ربط بجداول أخرى، أو كان الجدول أصغر من PAGINATION_ESTIMATE_THRESHOLD (فيُعد بدقة).
+    """
+    conn = connections[queryset.db]
+    query = queryset.query
+    if (
+        conn.vendor != 'postgresql' or query.has_filters() or query.distinct or query.combinator
+        or query.is_sliced or len(query.alias_map) > 1
+    ):
+        return None
+    threshold = getattr(settings, 'PAGINATION_ESTIMATE_THRESHOLD', 100000)
+    if not threshold:
+        return None
+    with conn.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    # -1 للجدول الذي لم يُحلَّل بعد
+    if row is None or row[0] < threshold:
+        return None
+    return row[0]
+
+
+def cached_count(queryset):
+    """عدد نتائج الاستعلام مخزناً لفترة قصيرة (المفتاح بصمة نص الاستعلام)"""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'books:count:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+
+    def count():
+        estimate = estimated_count(queryset)
+        return queryset.count() if estimate is None else estimate
+
+    return cache.get_or_set(key, count, getattr(settings, 'PAGINATION_COUNT_TIMEOUT', 60))
+
+
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def _value(obj, path):
+    for part in path.split('__'):
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return None
+    return obj
+
+
+def _field(order):
+    """(الحقل، تنازلي، القيم الفارغة في النهاية) من عنصر ترتيب نصي أو F().desc(nulls_last=True)"""
+    if isinstance(order, OrderBy):
+        nulls_last = True if order.nulls_last else False if order.nulls_first else None
+        return order.expression.name, order.descending, nulls_last
+    return order.lstrip('-'), order.startswith('-'), None
+
+
+class KeysetPaginator:
+    """ترقيم بالمؤشرات على ترتيب ثابت فريد، مثل ('-created_at', '-id')
+
+    الحقل الذي قد يكون فارغاً (عبر ربط خارجي) يُمرَّر بترتيب يحدد موضع القيم الفارغة، مثل
+    F('stats__books_count').desc(nulls_last=True).
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.ordering = [_field(order) for order in ordering]
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+
+    def cursor(self, obj, direction='next'):
+        values = []
+        for field, _, nulls_last in self.ordering:
+            value = _value(obj, field)
+            # الحقول التي لا يُحدد موضع قيمها الفارغة تُعامل فيها القيمة الفارغة كصفر
+            values.append(_dump(0 if value is None and nulls_last is None else value))
+        return signing.dumps({'d': direction, 'v': values}, salt=CURSOR_SALT, compress=True)
+
+    def decode(self, token):
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+            direction, values = data['d'], [_load(v) for v in data['v']]
+        except (signing.BadSignature, KeyError, TypeError, ValueError) as e:
+            raise InvalidCursor(str(e))
+        if direction not in ('next', 'prev') or len(values) != len(self.ordering):
+            raise InvalidCursor('مؤشر غير صالح')
+        return direction, values
+
+    def _seek(self, values, forward):
+        """شرط (a, b) بعد/قبل القيم حسب اتجاه كل حقل في الترتيب"""
+        condition = Q()
+        for i, (field, descending, nulls_last) in enumerate(self.ordering):
+            term = self._after(field, values[i], descending == forward, nulls_last == forward)
+            if term is None:
+                continue
+            for j in range(i):
+                # field=None تعني IS NULL
+                term &= Q(**{self.ordering[j][0]: values[j]})
+            condition |= term
+        return condition
+
+    @staticmethod
+    def _after(field, value, smaller, nulls_after):
+        """الصفوف التي تأتي بعد القيمة في هذا الحقل وحده؛ None إذا لم يأتِ بعدها شيء"""
+        if value is None:
+            return None if nulls_after else Q(**{f'{field}__isnull': False})
+        term = Q(**{f"{field}__{'lt' if smaller else 'gt'}": value})
+        if nulls_after:
+            term |= Q(**{f'{field}__isnull': True})
+        return term
+
+    def page(self, token):
+        direction, values = self.decode(token)
+        forward = direction == 'next'
+        queryset = self.queryset.filter(self._seek(values, forward))
+        if not forward:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        return CursorPage(
+            rows,
+            self,
+            has_next=more if forward else True,
+            has_previous=True if forward else more,
+        )
+
+
+class CursorPage:
+    """صفحة مؤشرات بواجهة قريبة من Page في جانغو"""
+    is_cursor = True
+    number = None
+
+    def __init__(self, object_list, keyset, has_next, has_previous):
+        self.object_list = object_list
+        self.keyset = keyset
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    @cached_property
+    def paginator(self):
+        return CachedCountPaginator(self.keyset.queryset, self.keyset.per_page)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        return self.keyset.cursor(self.object_list[-1], 'next') if self._has_next else None
+
+    @cached_property
+    def previous_cursor(self):
+        return self.keyset.cursor(self.object_list[0], 'prev') if self._has_previous else None
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+def paginate(request, queryset, per_page, ordering=None):
+    """صفحة الطلب الحالي: ?cursor= بالمؤشرات، وإلا ?page= برقم الصفحة
+
+    بدون ordering (مثل نتائج البحث المرتبة حسب الصلة) تُستخدم أرقام الصفحات فقط.
+    """
+    keyset = KeysetPaginator(queryset, per_page, ordering) if ordering else None
+    token = request.GET.get('cursor')
+    if keyset and token:
+        try:
+            return keyset.page(token)
+        except InvalidCursor:
+            pass
+
+    paginator = CachedCountPaginator(keyset.queryset if keyset else queryset, per_page)
+    number = request.GET.get('page')
+    if keyset:
+        # ?page=N العميق (رابط قديم أو مكتوب يدوياً) لا يصل إلى OFFSET كبير: يُخدم بآخر صفحة
+        # قريبة، ومنها يكمل الزائر برابط المؤشر
+        try:
+            number = min(int(number), shallow_pages())
+        except (TypeError, ValueError):
+            pass
+    page = paginator.get_page(number)
+    page.is_cursor = False
+    page.previous_cursor = None
+    page.next_cursor = None
+    # أرقام الصفحات التي تعرضها القوالب: لا روابط لصفحات بعد الصفحات القريبة (ولا لآخر صفحة)
+    page.page_numbers = paginator.page_range
+    if keyset:
+        page.page_numbers = range(1, min(paginator.num_pages, shallow_pages()) + 1)
+    # من آخر صفحة قريبة ننتقل إلى المؤشرات بدلاً من OFFSET متزايد
+    if keyset and page.has_next() and page.number >= shallow_pages():
+        page.next_cursor = keyset.cursor(page[len(page) - 1], 'next')
+    return page
@@ -0,0 +1,262 @@
+"""
+ميزانية الاستعلامات لكل طلب وكشف أنماط N+1.
+
+- كل اتصال بقاعدة البيانات (الرئيسية والنسخ المتماثلة) يمر استعلامه على مسجِّل الطلب
+  الحالي إن وُجد (متغير سياقي، فيعمل في الصفحات المتزامنة وغير المتزامنة).
+- QueryBudgetMiddleware يعدّ استعلامات الطلب وزمنها، ويسجل تحذيراً إذا تجاوز الطلب
+  الميزانية (QUERY_BUDGET_MAX_QUERIES و QUERY_BUDGET_MAX_TIME_MS) أو تكررت بصمة واحدة
+  (الاستعلام بعد استبدال قيمه بعلامات) QUERY_BUDGET_REPEAT_THRESHOLD مرة أو أكثر
+  (غالباً استعلام داخل حلقة في القالب أو الصفحة).
+- أداة تشخيص: معطلة افتراضياً خارج DEBUG، ويمكن قياس نسبة من الطلبات فقط
+  (QUERY_BUDGET_SAMPLE_RATE). البصمات تُحسب في نهاية الطلب مرة لكل نص استعلام مختلف،
+  وفقط إذا بلغ عدد استعلاماته حد التكرار.
+- الأرقام لكل صفحة (اسم المسار) تُجمع في مخزن مؤجل وتُكتب إلى QueryProfile و
+  QueryFingerprint، فتعرض لوحة التحكم ملخصاً من كل العمال.
+- استعلامات الاستجابات المتدفقة بعد خروجها من الوسيط لا تُحسب.
+"""
+import hashlib
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .buffers import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+# مسجِّل الطلب الحالي (من QueryBudgetMiddleware)
+_recorder = ContextVar('books_query_recorder', default=None)
+
+SUM_FIELDS = ('requests', 'queries', 'time_ms', 'over_budget', 'n_plus_one')
+MAX_FIELDS = ('max_queries', 'max_time_ms')
+# أطول نص يُحفظ للاستعلام المكرر
+SQL_SAMPLE_LENGTH = 2000
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def enabled():
+    return getattr(settings, 'QUERY_BUDGET_ENABLED', False)
+
+
+def sampled():
+    """هل يُقاس هذا الطلب (نسبة QUERY_BUDGET_SAMPLE_RATE من الطلبات)"""
+    if not enabled():
+        return False
+    rate = getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 1.0)
+    return rate >= 1 or random.random() < rate
+
+
+def normalize(sql):
+    """الاستعلام بقيمه مستبدلة بعلامات، فتتطابق استعلامات الحلقة الواحدة"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    """بصمة الاستعلام بعد normalize"""
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+class QueryRecorder:
+    """عدد استعلامات الطلب وزمنها وتكرار كل نص استعلام"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        # النص كما نُفذ (قيمه غالباً علامات %s)، فالعدّ هنا لا يكلف تطبيعاً ولا تجزئة
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        """البصمات التي تكررت threshold مرة أو أكثر: {البصمة: (التكرار، الاستعلام)}"""
+        if self.count < threshold:
+            return {}
+        counts, samples = Counter(), {}
+        for sql, n in self.statements.items():
+            normalized = normalize(sql)
+            key = fingerprint(normalized)
+            counts[key] += n
+            samples.setdefault(key, normalized)
+        return {
+            key: (n, samples[key][:SQL_SAMPLE_LENGTH])
+            for key, n in counts.most_common()
+            if n >= threshold
+        }
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    """تركيب المسجِّل على اتصال جديد (إشارة connection_created)"""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def _blank():
+    return {**dict.fromkeys(SUM_FIELDS + MAX_FIELDS, 0), 'fingerprints': {}}
+
+
+def _combine(into, delta):
+    for field in SUM_FIELDS:
+        into[field] += delta[field]
+    for field in MAX_FIELDS:
+        into[field] = max(into[field], delta[field])
+    for key, (requests, executions, max_repeats, sql) in delta['fingerprints'].items():
+        current = into['fingerprints'].get(key, (0, 0, 0, sql))
+        into['fingerprints'][key] = (
+            current[0] + requests, current[1] + executions, max(current[2], max_repeats), current[3],
+        )
+
+
+class QueryStatsBuffer(WriteBehindBuffer):
+    """مخزن مؤقت لأرقام الاستعلامات لكل صفحة"""
+
+    interval_setting = 'QUERY_STATS_FLUSH_INTERVAL'
+    threshold_setting = 'QUERY_STATS_FLUSH_THRESHOLD'
+    default_interval = 30
+    name = 'query-stats'
+
+    def empty(self):
+        return {}
+
+    def merge(self, pending):
+        for url_name, delta in pending.items():
+            _combine(self._pending.setdefault(url_name, _blank()), delta)
+
+    def add(self, url_name, recorder, over_budget, repeated):
+        time_ms = recorder.time * 1000
+        delta = {
+            'requests': 1,
+            'queries': recorder.count,
+            'time_ms': time_ms,
+            'over_budget': int(over_budget),
+            'n_plus_one': int(bool(repeated)),
+            'max_queries': recorder.count,
+            'max_time_ms': time_ms,
+            'fingerprints': {key: (1, n, n, sql) for key, (n, sql) in repeated.items()},
+        }
+        self.record(lambda pending: _combine(pending.setdefault(url_name, _blank()), delta))
+
+    def write(self, pending):
+        from .models import QueryFingerprint, QueryProfile
+
+        with transaction.atomic():
+            QueryProfile.objects.bulk_create(
+                [QueryProfile(url_name=url_name) for url_name in pending], ignore_conflicts=True
+            )
+            for url_name, delta in pending.items():
+                QueryProfile.objects.filter(pk=url_name).update(
+                    **{field: F(field) + delta[field] for field in SUM_FIELDS},
+                    **{field: Greatest(F(field), delta[field]) for field in MAX_FIELDS},
+                )
+                fingerprints = delta['fingerprints']
+                if not fingerprints:
+                    continue
+                QueryFingerprint.objects.bulk_create(
+                    [
+                        QueryFingerprint(profile_id=url_name, fingerprint=key, sql=sql)
+                        for key, (_, _, _, sql) in fingerprints.items()
+                    ],
+                    ignore_conflicts=True,
+                )
+                for key, (requests, executions, max_repeats, _) in fingerprints.items():
+                    QueryFingerprint.objects.filter(profile_id=url_name, fingerprint=key).update(
+                        requests=F('requests') + requests,
+                        executions=F('executions') + executions,
+                        max_repeats=Greatest(F('max_repeats'), max_repeats),
+                    )
+
+
+query_stats = QueryStatsBuffer()
+
+
+class QueryBudgetMiddleware:
+    """عدّ استعلامات كل طلب ومقارنتها بالميزانية"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not sampled():
+            return self.get_response(request)
+        recorder, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._finish(request, recorder, response)
+
+    async def __acall__(self, request):
+        if not sampled():
+            return await self.get_response(request)
+        recorder, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        # المخزن يكتب فوراً إذا كانت فترته 0
+        return await sync_to_async(self._finish)(request, recorder, response)
+
+    @staticmethod
+    def _start():
+        recorder = QueryRecorder()
+        return recorder, _recorder.set(recorder)
+
+    @staticmethod
+    def _finish(request, recorder, response):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            # الملفات الثابتة وصفحات 404 خارج المسارات
+            return response
+
+        time_ms = recorder.time * 1000
+        over_budget = (
+            recorder.count > settings.QUERY_BUDGET_MAX_QUERIES
+            or time_ms > settings.QUERY_BUDGET_MAX_TIME_MS
+        )
+        repeated = recorder.repeated(settings.QUERY_BUDGET_REPEAT_THRESHOLD)
+        if over_budget or repeated:
+            logger.warning(
+                'ميزانية الاستعلامات في %s (%s): %d استعلام في %.1fms%s',
+                match.view_name, request.path, recorder.count, time_ms,
+                ''.join(f'\n  ×{n} {sql[:300]}' for n, sql in list(repeated.values())[:3]),
+            )
+        if settings.QUERY_BUDGET_HEADERS:
+            # يظهر في أدوات المطور في المتصفح (تبويب Timing)
+            response['Server-Timing'] = f'db;dur={time_ms:.1f};desc="{recorder.count} queries"'
+        query_stats.add(match.view_name, recorder, over_budget, repeated)
+        return response
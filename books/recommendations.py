@@ -0,0 +1,119 @@
+"""
+مقترحات "كتب مشابهة" من تزامن تفاعلات القراء (item-to-item).
+
+- لكل مستخدم متجه متناثر {الكتاب: الوزن} من سجل القراءة والإشارات المرجعية والتقييمات.
+- مصفوفة التزامن بين الكتب = مجموع حواصل ضرب أوزان كل مستخدم لكل زوج من كتبه
+  (Aᵀ·A متناثرة)، ثم تشابه جيب التمام بالقسمة على طول متجه كل كتاب.
+- يُحفظ أعلى k جار لكل كتاب في BookRecommendation، وتقرأها صفحة الكتاب باستعلام
+  واحد على الفهرس (book, rank)، مع إكمال النقص من نفس التصنيف.
+
+تُبنى دورياً بأمر build_recommendations (مثلاً من cron).
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+# أوزان التفاعلات: القراءة أضعف إشارة، والإشارة المرجعية أقوى، والتقييم حسب عدد النجوم
+READ_WEIGHT = 1.0
+BOOKMARK_WEIGHT = 2.0
+
+
+def review_weight(rating):
+    # 1 نجمة -> 0.5 ... 5 نجوم -> 3
+    return 0.5 + (rating - 1) * 0.625
+
+
+def top_k():
+    return getattr(settings, 'RECOMMENDATIONS_TOP_K', 12)
+
+
+def max_items_per_user():
+    """أقصى عدد كتب يُحتسب لكل مستخدم (تكلفة المستخدم تربيعية في عدد كتبه)"""
+    return getattr(settings, 'RECOMMENDATIONS_MAX_ITEMS_PER_USER', 200)
+
+
+def user_vectors():
+    """{المستخدم: {الكتاب: الوزن}} بأقوى تفاعل لكل زوج"""
+    from .models import Bookmark, ReadingHistory, Review
+
+    vectors = defaultdict(dict)
+
+    def add(rows, weight):
+        for user_id, book_id, *extra in rows.iterator(chunk_size=5000):
+            w = weight(*extra) if callable(weight) else weight
+            vector = vectors[user_id]
+            if w > vector.get(book_id, 0):
+                vector[book_id] = w
+
+    add(ReadingHistory.objects.values_list('user_id', 'book_id'), READ_WEIGHT)
+    add(Bookmark.objects.values_list('user_id', 'book_id'), BOOKMARK_WEIGHT)
+    add(Review.objects.values_list('user_id', 'book_id', 'rating'), review_weight)
+    return vectors
+
+
+def similarities(vectors, limit=None, max_items=None):
+    """{الكتاب: [(الدرجة، الكتاب المشابه)...]} أعلى limit جار لكل كتاب بتشابه جيب التمام"""
+    limit = limit or top_k()
+    max_items = max_items or max_items_per_user()
+    cooccurrence = defaultdict(lambda: defaultdict(float))
+    norms = defaultdict(float)
+
+    for vector in vectors.values():
+        items = vector.items()
+        if len(vector) > max_items:
+            items = heapq.nlargest(max_items, items, key=lambda item: item[1])
+        items = sorted(items)
+        for i, (a, wa) in enumerate(items):
+            norms[a] += wa * wa
+            row_a = cooccurrence[a]
+            for b, wb in items[i + 1:]:
+                product = wa * wb
+                row_a[b] += product
+                cooccurrence[b][a] += product
+
+    result = {}
+    for a, row in cooccurrence.items():
+        norm_a = math.sqrt(norms[a])
+        scored = ((value / (norm_a * math.sqrt(norms[b])), b) for b, value in row.items())
+        # عند تساوي الدرجة يُقدَّم الكتاب الأحدث (المعرف الأكبر) بشكل ثابت
+        result[a] = heapq.nlargest(limit, scored)
+    return result
+
+
+def build(limit=None):
+    """إعادة حساب المقترحات وحفظها؛ يعيد عدد الكتب التي لها مقترحات"""
+    from .models import Book, BookRecommendation
+
+    neighbours = similarities(user_vectors(), limit)
+    existing = set(Book.objects.filter(pk__in=neighbours).values_list('pk', flat=True))
+    rows = [
+        BookRecommendation(book_id=book_id, recommended_id=other_id, rank=rank, score=score)
+        for book_id, scored in neighbours.items() if book_id in existing
+        for rank, (score, other_id) in enumerate(scored) if other_id in existing
+    ]
+    with transaction.atomic():
+        BookRecommendation.objects.all().delete()
+        BookRecommendation.objects.bulk_create(rows, batch_size=1000)
+    return len({row.book_id for row in rows})
+
+
+def similar_books(book, limit=4):
+    """الكتب المشابهة: المقترحات المحسوبة أولاً ثم الأعلى تقييماً من نفس التصنيف"""
+    from .models import Book
+
+    books = list(
+        Book.objects.filter(recommended_for__book=book)
+        .select_related('author')
+        .order_by('recommended_for__rank')[:limit]
+    )
+    if len(books) < limit:
+        books += list(
+            Book.objects.filter(category_id=book.category_id)
+            .exclude(pk__in=[book.pk, *(b.pk for b in books)])
+            .select_related('author')
+            .order_by('-avg_rating', '-views', '-id')[:limit - len(books)]
+        )
+    return books
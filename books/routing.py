@@ -0,0 +1,153 @@
+"""
+توجيه القراءات إلى نسخ قاعدة البيانات المتماثلة (replicas).
+
+- الصفحات المعلَّمة بـ read_replica تقرأ من نسخة متماثلة عشوائية (DATABASE_REPLICAS)،
+  وكل ما عداها (وكل الكتابات) على قاعدة البيانات الرئيسية.
+- قراءة ما كتبه المستخدم: أي كتابة في الطلب تعيد بقية قراءاته إلى الرئيسية، وتضع
+  كوكي يثبّت طلباته التالية على الرئيسية لمدة DATABASE_REPLICA_STICKY_SECONDS
+  (أطول من تأخر النسخ المتوقع)، فيرى تقييمه أو إشارته المرجعية فور إعادة التوجيه.
+- داخل معاملة على الرئيسية تبقى القراءات عليها.
+- الجلسات والمستخدمون (request.user) من الرئيسية دائماً، فلا يخرج مستخدم سجّل دخوله
+  للتو لأن جلسته لم تصل بعد إلى النسخة المتماثلة.
+- جدول الذاكرة المؤقتة (CACHE_URL=db://) من الرئيسية دائماً: أرقام الإصدار والنسخ المخزنة
+  تُقرأ بعد الإبطال مباشرة، والجدول لا يُنشأ على النسخ المتماثلة. الكتابة فيه لا تثبّت المستخدم.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary'
+PRIMARY_APPS = {'sessions', 'auth', 'django_cache'}
+# كتابات لا تخص المستخدم فلا تستدعي قراءة ما كتبه (DatabaseCache)
+UNPINNED_APPS = {'django_cache'}
+
+# هل يسمح السياق الحالي بالقراءة من النسخ المتماثلة (الصفحة معلَّمة بـ read_replica)
+_replica_reads = ContextVar('books_replica_reads', default=False)
+# حالة الطلب الحالي (من ReplicaPinMiddleware)
+_request_state = ContextVar('books_replica_request', default=None)
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        # الكوكي موجود: المستخدم كتب قبل قليل
+        self.pinned = pinned
+        # كتابة حدثت أثناء هذا الطلب
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """القراءات داخل الكتلة من النسخ المتماثلة (أو من الرئيسية مع enabled=False)"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads():
+    """القراءات داخل الكتلة من الرئيسية، مثل بناء النسخ المخزنة المشتركة"""
+    return replica_reads(False)
+
+
+def read_replica(view):
+    """تعليم صفحة قراءة فقط (متزامنة أو غير متزامنة) لتُخدم من النسخ المتماثلة"""
+    if iscoroutinefunction(view):
+        # المتغيرات السياقية تنتقل إلى الخيوط التي ينفذ فيها ORM الاستعلامات
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+        return wrapped
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or not _replica_reads.get():
+            return None
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        state = _request_state.get()
+        if (state is not None and (state.pinned or state.wrote)) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label not in UNPINNED_APPS:
+            state.wrote = True
+        # حتى للكائنات المقروءة من نسخة متماثلة
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # النسخ المتماثلة تأخذ مخططها وبياناتها من الرئيسية
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """تثبيت قراءات المستخدم على الرئيسية بعد أي كتابة"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(state, response)
+
+    @staticmethod
+    def _start(request):
+        state = RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        return state, _request_state.set(state)
+
+    @staticmethod
+    def _finish(state, response):
+        if state.wrote and replicas():
+            response.set_cookie(PIN_COOKIE, '1', max_age=sticky_seconds(), httponly=True, samesite='Lax')
+        return response
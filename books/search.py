@@ -0,0 +1,350 @@
+"""
+فهرس البحث النصي الكامل للكتب.
+
+- SQLite: جدول افتراضي FTS5 مع ترتيب bm25.
+- PostgreSQL: جدول tsvector مع فهرس GIN وترتيب ts_rank_cd، والمطابقة والترتيب داخل
+  استعلام الكتب نفسه (استعلام فرعي) بدل جلب المعرّفات أولاً.
+- غير ذلك (أو إذا لم يكن الفهرس متاحاً): الرجوع إلى icontains.
+
+تُطبَّع النصوص العربية قبل الفهرسة وقبل البحث بنفس الدالة.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'books_search'
+
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06dc\u06df-\u06e8\u06ea-\u06ed]')
+ARABIC_LETTERS = str.maketrans({
+    '\u0640': '',  # التطويل
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627',  # أ إ آ ٱ -> ا
+    '\u0649': '\u064a',  # ى -> ي
+    '\u0629': '\u0647',  # ة -> ه
+})
+TOKEN_RE = re.compile(r'\w+')
+# أداة التعريف وما يسبقها من حروف العطف والجر (تُحذف إذا بقي بعدها حرفان على الأقل)
+ARTICLE_RE = re.compile('^(?:\u0648\u0627\u0644|\u0628\u0627\u0644|\u0643\u0627\u0644|\u0641\u0627\u0644|\u0644\u0644|\u0627\u0644)(?=\\w{2})')
+
+_available = {}
+
+
+def normalize_arabic(text):
+    """إزالة التشكيل والتطويل وتوحيد أشكال الألف والياء والتاء المربوطة"""
+    if not text:
+        return ''
+    text = ARABIC_DIACRITICS.sub('', text).translate(ARABIC_LETTERS)
+    return ' '.join(text.casefold().split())
+
+
+def tokenize(text):
+    return [ARTICLE_RE.sub('', token) for token in TOKEN_RE.findall(normalize_arabic(text))]
+
+
+def search_text(text):
+    """النص كما يُخزَّن في الفهرس: مطبّع وبدون أداة التعريف"""
+    return ' '.join(tokenize(text))
+
+
+def max_results():
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 500)
+
+
+def max_content_chars():
+    """أقصى عدد أحرف يُفهرس من نص ملف PDF لكل كتاب"""
+    return getattr(settings, 'SEARCH_CONTENT_MAX_CHARS', 100_000)
+
+
+def content_text(data):
+    """نص ملف PDF المضغوط (BookContent.text) مطبّعاً ومقتطعاً للفهرسة"""
+    if not data:
+        return ''
+    limit = max_content_chars()
+    text = zlib.decompress(bytes(data)).decode()[:limit]
+    return search_text(text)
+
+
+def document_rows(books):
+    """(id، العنوان، المؤلف، التصنيف، الوصف، نص الملف) مطبّعة لكل كتاب"""
+    fields = ['pk', 'title', 'author__name', 'author_name', 'category__name', 'description']
+    # النماذج التاريخية في الترحيلات القديمة لا تعرف محتوى ملفات PDF
+    has_content = any(f.name == 'pdf_content' for f in books.model._meta.get_fields())
+    rows = books.values_list(*fields, *(['pdf_content__text'] if has_content else []))
+    for pk, title, author, author_name, category, description, *content in rows.iterator(chunk_size=100):
+        authors = ' '.join(name for name in (author, author_name) if name)
+        yield (
+            pk,
+            search_text(title),
+            search_text(authors),
+            search_text(category),
+            search_text(description),
+            content_text(content[0] if content else None),
+        )
+
+
+class SearchBackend:
+    vendor = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        pass
+
+    def uninstall(self):
+        pass
+
+    def is_available(self):
+        return False
+
+    def index(self, rows):
+        pass
+
+    def remove(self, book_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def ranked_ids(self, query, limit):
+        return []
+
+    def search(self, queryset, query, limit):
+        """الكتب المطابقة مرتبة حسب الصلة: المعرّفات من الفهرس ثم ترتيبها بـ CASE"""
+        ids = self.ranked_ids(query, limit)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+                output_field=IntegerField(),
+            )
+        ).order_by('search_rank')
+
+    def _table_exists(self):
+        # نتيجة الفحص تُحفظ لكل قاعدة بيانات لتجنب استعلام إضافي مع كل بحث
+        key = (self.connection.alias, self.connection.settings_dict['NAME'])
+        if key not in _available:
+            with self.connection.cursor() as cursor:
+                _available[key] = SEARCH_TABLE in self.connection.introspection.table_names(cursor)
+        return _available[key]
+
+    def _reset_availability(self):
+        _available.pop((self.connection.alias, self.connection.settings_dict['NAME']), None)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    vendor = 'sqlite'
+    # أوزان bm25 للأعمدة: العنوان، المؤلف، التصنيف، الوصف، نص الملف
+    weights = (10.0, 6.0, 3.0, 1.0, 0.5)
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                "title, author, category, description, content, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        self._reset_availability()
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+        self._reset_availability()
+
+    def is_available(self):
+        return self._table_exists()
+
+    def index(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        self.remove([row[0] for row in rows])
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, author, category, description, content) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, book_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in book_ids])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def ranked_ids(self, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(w) for w in self.weights)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SearchBackend):
+    vendor = 'postgresql'
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            # دون مفتاح أجنبي إلى books_book: الجدول خارج نماذج Django، فيفشل معه TRUNCATE
+            # في flush والاختبارات؛ صفوف الكتب المحذوفة يحذفها index_books
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+                'book_id bigint PRIMARY KEY, '
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin ON {SEARCH_TABLE} USING GIN (document)'
+            )
+        self._reset_availability()
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+        self._reset_availability()
+
+    def is_available(self):
+        return self._table_exists()
+
+    def index(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (book_id, document) VALUES (%s, '
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'D') || "
+                "setweight(to_tsvector('simple', %s), 'D')) "
+                'ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+    def remove(self, book_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE book_id = ANY(%s)', [list(book_ids)])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+    # أفضل limit نتيجة حسب الصلة (يستخدمه ranked_ids والاستعلام الفرعي في search)
+    MATCHES_SQL = (
+        f"SELECT book_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+        'WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC, book_id DESC LIMIT %s'
+    )
+
+    @staticmethod
+    def tsquery(query):
+        return ' & '.join(f'{token}:*' for token in tokenize(query))
+
+    def ranked_ids(self, query, limit):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.MATCHES_SQL, [tsquery, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, queryset, query, limit):
+        """
+        المطابقة والترتيب في استعلام واحد: استعلام فرعي لأفضل النتائج بدل قائمة معرّفات
+        في IN، ودرجة الصلة لكل كتاب من صفه في الفهرس (بالمفتاح الأساسي) بدل CASE طويل.
+        """
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return queryset.none()
+        table = self.connection.ops.quote_name(queryset.model._meta.db_table)
+        rank = RawSQL(
+            f"SELECT ts_rank_cd(document, to_tsquery('simple', %s)) FROM {SEARCH_TABLE} "
+            f'WHERE book_id = {table}.id',
+            [tsquery],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=RawSQL(self.MATCHES_SQL, [tsquery, limit])).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-pk')
+
+
+BACKENDS = {
+    backend.vendor: backend
+    for backend in (SQLiteSearchBackend, PostgresSearchBackend)
+}
+
+
+def get_backend(conn=None):
+    conn = conn or connection
+    return BACKENDS.get(conn.vendor, SearchBackend)(conn)
+
+
+def fallback_filter(queryset, query, fields):
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition)
+
+
+FALLBACK_FIELDS = ('title', 'author__name', 'author_name', 'description')
+
+
+def search_books(queryset, query, fallback_fields=FALLBACK_FIELDS):
+    """تصفية الكتب حسب نص البحث وترتيبها حسب الصلة"""
+    # الفهرس على نفس قاعدة البيانات التي تُقرأ منها الكتب (النسخة المتماثلة في صفحات القراءة)
+    backend = get_backend(connections[queryset.db])
+    if not backend.is_available():
+        return fallback_filter(queryset, query, fallback_fields)
+
+    return backend.search(queryset, query, max_results())
+
+
+def index_books(book_ids):
+    """تحديث الفهرس لكتب محددة (أو حذفها منه إن لم تعد موجودة)"""
+    from .models import Book
+
+    book_ids = set(book_ids)
+    if not book_ids:
+        return
+    backend = get_backend()
+    if not backend.is_available():
+        return
+    with transaction.atomic():
+        rows = list(document_rows(Book.objects.filter(pk__in=book_ids)))
+        backend.index(rows)
+        missing = book_ids - {row[0] for row in rows}
+        if missing:
+            backend.remove(missing)
+
+
+def rebuild_index(batch_size=1000):
+    """إعادة بناء الفهرس بالكامل"""
+    from .models import Book
+
+    backend = get_backend()
+    backend.install()
+    count = 0
+    with transaction.atomic():
+        backend.clear()
+        batch = []
+        for row in document_rows(Book.objects.order_by()):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                backend.index(batch)
+                count += len(batch)
+                batch = []
+        backend.index(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,232 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Author, AuthorStats, Book, Category, Review, ReadingHistory
+from .search import index_books
+from .autocomplete import refresh_entries
+from .context_processors import categories_snapshot
+from .activity import log_activity
+from .stats import statistics_snapshot
+from . import images, ingestion, querybudget
+
+
+
+def refresh_author_stats_on_commit(*author_ids):
+    """جدولة إعادة حساب إحصائيات المؤلفين بعد نجاح المعاملة الحالية"""
+    author_ids = {pk for pk in author_ids if pk}
+    if author_ids:
+        transaction.on_commit(lambda: AuthorStats.refresh(author_ids))
+
+
+@receiver(post_save, sender=Review)
+def update_book_rating_on_save(sender, instance, created, **kwargs):
+    """تحديث إحصائيات تقييم الكتاب بعد حفظ المراجعة"""
+    old_book_id = getattr(instance, '_loaded_book_id', None)
+    with transaction.atomic():
+        if created:
+            Book.apply_rating_change(instance.book_id, added=instance.rating)
+        elif not hasattr(instance, '_loaded_rating'):
+            # مراجعة لم تُحمَّل من قاعدة البيانات: لا نعرف التقييم السابق
+            Book.recompute_rating_stats(Book.objects.filter(pk=instance.book_id))
+        elif instance._loaded_book_id != instance.book_id:
+            Book.apply_rating_change(instance._loaded_book_id, removed=instance._loaded_rating)
+            Book.apply_rating_change(instance.book_id, added=instance.rating)
+        elif instance._loaded_rating != instance.rating:
+            Book.apply_rating_change(
+                instance.book_id, added=instance.rating, removed=instance._loaded_rating
+            )
+    instance._loaded_rating = instance.rating
+    instance._loaded_book_id = instance.book_id
+
+    refresh_author_stats_on_commit(*Book.objects.filter(
+        pk__in=[instance.book_id, old_book_id]
+    ).values_list('author_id', flat=True))
+
+
+@receiver(post_delete, sender=Review)
+def update_book_rating_on_delete(sender, instance, **kwargs):
+    """تحديث إحصائيات تقييم الكتاب بعد حذف المراجعة"""
+    book_id = getattr(instance, '_loaded_book_id', instance.book_id)
+    with transaction.atomic():
+        if hasattr(instance, '_loaded_rating') or 'rating' not in instance.get_deferred_fields():
+            Book.apply_rating_change(book_id, removed=getattr(instance, '_loaded_rating', instance.rating))
+        else:
+            # التقييم مؤجل ولا يمكن قراءته بعد الحذف: إعادة حساب من المراجعات الباقية
+            Book.recompute_rating_stats(Book.objects.filter(pk=book_id))
+
+    refresh_author_stats_on_commit(*Book.objects.filter(
+        pk=book_id
+    ).values_list('author_id', flat=True))
+
+
+@receiver(post_save, sender=Author)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(author=instance)
+
+
+@receiver(post_save, sender=Book)
+def update_author_stats_on_book_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= set(Book.DERIVED_FIELDS):
+        return
+    refresh_author_stats_on_commit(instance.author_id, getattr(instance, '_loaded_author_id', None))
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Book)
+def update_author_stats_on_book_delete(sender, instance, **kwargs):
+    refresh_author_stats_on_commit(instance.author_id)
+
+
+@receiver(post_save, sender=ReadingHistory)
+def update_author_readers_on_history_save(sender, instance, created, **kwargs):
+    if created:
+        refresh_author_stats_on_commit(instance.book.author_id)
+
+
+@receiver(post_delete, sender=ReadingHistory)
+def update_author_readers_on_history_delete(sender, instance, **kwargs):
+    refresh_author_stats_on_commit(
+        *Book.objects.filter(pk=instance.book_id).values_list('author_id', flat=True)
+    )
+
+
+def index_books_on_commit(book_ids):
+    """تحديث فهرس البحث وفهرس الإكمال التلقائي بعد نجاح المعاملة الحالية"""
+    book_ids = set(book_ids)
+    if book_ids:
+        transaction.on_commit(lambda: index_books(book_ids))
+        transaction.on_commit(lambda: refresh_entries('book', book_ids))
+
+
+def refresh_autocomplete_on_commit(kind, pk):
+    transaction.on_commit(lambda: refresh_entries(kind, [pk]))
+
+
+@receiver(post_save, sender=Book)
+def index_book_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= set(Book.DERIVED_FIELDS):
+        return
+    index_books_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def remove_book_from_index(sender, instance, **kwargs):
+    index_books_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def index_author_books_on_save(sender, instance, created, **kwargs):
+    refresh_autocomplete_on_commit('author', instance.pk)
+    if not created:
+        index_books_on_commit(instance.books.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def index_category_books_on_save(sender, instance, created, **kwargs):
+    refresh_autocomplete_on_commit('category', instance.pk)
+    if not created:
+        index_books_on_commit(instance.books.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def remove_author_from_autocomplete(sender, instance, **kwargs):
+    refresh_autocomplete_on_commit('author', instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_from_autocomplete(sender, instance, **kwargs):
+    refresh_autocomplete_on_commit('category', instance.pk)
+
+
+def invalidate_categories_on_commit():
+    transaction.on_commit(categories_snapshot.invalidate)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories_on_category_change(sender, instance, **kwargs):
+    invalidate_categories_on_commit()
+
+
+@receiver(post_save, sender=Book)
+def invalidate_categories_on_book_save(sender, instance, created, **kwargs):
+    # عدد الكتب في التصنيف يتغير فقط عند الإضافة أو نقل الكتاب إلى تصنيف آخر
+    if created or getattr(instance, '_loaded_category_id', instance.category_id) != instance.category_id:
+        invalidate_categories_on_commit()
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_delete, sender=Book)
+def invalidate_categories_on_book_delete(sender, instance, **kwargs):
+    invalidate_categories_on_commit()
+
+
+def invalidate_statistics_on_commit():
+    transaction.on_commit(statistics_snapshot.invalidate)
+
+
+@receiver(post_save, sender=Book)
+def invalidate_statistics_on_book_save(sender, instance, created, **kwargs):
+    if created:
+        invalidate_statistics_on_commit()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=User)
+def invalidate_statistics_on_change(sender, instance, **kwargs):
+    invalidate_statistics_on_commit()
+
+
+@receiver(post_save, sender=User)
+def invalidate_statistics_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    # تسجيل الدخول يحفظ last_login فقط ولا يغير الإحصائيات
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_statistics_on_commit()
+
+
+@receiver(user_logged_in)
+def log_user_login(sender, request, user, **kwargs):
+    log_activity(user, 'login')
+
+
+def generate_image_variants_on_commit(instance, kind):
+    """توليد نسخ الصورة المصغرة بعد نجاح المعاملة إذا رُفعت صورة جديدة"""
+    if images.needs_variants(instance, kind):
+        transaction.on_commit(lambda: images.generate(instance, kind))
+
+
+@receiver(post_save, sender=Book)
+def generate_cover_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= set(Book.DERIVED_FIELDS):
+        return
+    generate_image_variants_on_commit(instance, 'cover')
+
+
+@receiver(post_save, sender=Author)
+def generate_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'avatar_variants'}:
+        return
+    generate_image_variants_on_commit(instance, 'avatar')
+
+
+@receiver(post_save, sender=Book)
+def ingest_pdf_on_save(sender, instance, update_fields=None, **kwargs):
+    """استخراج محتوى ملف PDF بعد نجاح المعاملة إذا رُفع ملف جديد"""
+    if update_fields and set(update_fields) <= set(Book.DERIVED_FIELDS):
+        return
+    if ingestion.needs_ingestion(instance):
+        transaction.on_commit(lambda: ingestion.ingest(instance))
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """عدّ استعلامات الطلب الحالي على كل اتصال جديد (ميزانية الاستعلامات)"""
+    querybudget.install(connection)
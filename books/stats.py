@@ -0,0 +1,175 @@
+"""
+محرك الإحصائيات الزمنية للوحة التحكم.
+
+يحسب كل مقياس (الكتب، المستخدمون، التقييمات، التحميلات) لكل يوم أو أسبوع أو شهر
+باستعلام مجمع واحد (Trunc*) على المدى المطلوب، ثم يملأ الفترات الفارغة بأصفار
+من قائمة فترات تُولَّد مسبقاً حسب التقويم (بدلاً من تقريب الشهر بـ 30 يوماً).
+"""
+import hashlib
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .caching import VersionedSnapshot
+from .models import ActivityRollup, Book, Review
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# المقياس: (الاستعلام، حقل التاريخ، التجميع)
+METRICS = {
+    'books': (lambda: Book.objects.all(), 'created_at', lambda: Count('pk')),
+    'users': (lambda: User.objects.all(), 'date_joined', lambda: Count('pk')),
+    'reviews': (lambda: Review.objects.all(), 'created_at', lambda: Count('pk')),
+    'downloads': (lambda: ActivityRollup.objects.all(), 'date', lambda: Sum('downloads')),
+}
+
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 6}
+MAX_BUCKETS = 400
+
+
+def bucket_start(day, period):
+    """بداية الفترة التي يقع فيها اليوم"""
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f'فترة غير معروفة: {period}')
+
+
+def next_bucket(start, period):
+    if period == 'day':
+        return start + timedelta(days=1)
+    if period == 'week':
+        return start + timedelta(weeks=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def buckets(start, end, period):
+    """بدايات الفترات من الفترة التي تحوي start حتى التي تحوي end"""
+    current = bucket_start(start, period)
+    result = []
+    while current <= end:
+        result.append(current)
+        if len(result) > MAX_BUCKETS:
+            raise ValueError(f'المدى المطلوب أطول من {MAX_BUCKETS} فترة')
+        current = next_bucket(current, period)
+    return result
+
+
+def default_range(period, count=None, today=None):
+    """آخر count فترات كاملة التقويم تنتهي بالفترة الحالية"""
+    today = today or timezone.localdate()
+    start = bucket_start(today, period)
+    for _ in range((count or DEFAULT_BUCKETS[period]) - 1):
+        start = bucket_start(start - timedelta(days=1), period)
+    return start, today
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def metric_series(metric, period, start, end):
+    """{بداية الفترة: القيمة} لمقياس واحد باستعلام مجمع واحد"""
+    queryset, field, aggregate = METRICS[metric]
+    trunc = PERIODS[period]
+    queryset = queryset()
+    first, last = bucket_start(start, period), next_bucket(bucket_start(end, period), period)
+    if queryset.model._meta.get_field(field).get_internal_type() == 'DateTimeField':
+        tz = timezone.get_current_timezone()
+        first = timezone.make_aware(datetime.combine(first, time.min), tz)
+        last = timezone.make_aware(datetime.combine(last, time.min), tz)
+    rows = (
+        queryset.filter(**{f'{field}__gte': first, f'{field}__lt': last})
+        .annotate(bucket=trunc(field))
+        .values('bucket')
+        .annotate(value=aggregate())
+        .order_by()
+    )
+    return {_as_date(row['bucket']): row['value'] or 0 for row in rows}
+
+
+def time_series(metrics=None, period='month', start=None, end=None):
+    """قائمة فترات متصلة، لكل فترة قيمة كل مقياس (صفر للفترات الخالية)"""
+    if period not in PERIODS:
+        raise ValueError(f'فترة غير معروفة: {period}')
+    metrics = list(metrics or METRICS)
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f'مقاييس غير معروفة: {", ".join(sorted(unknown))}')
+    if start is None or end is None:
+        default_start, default_end = default_range(period)
+        start, end = start or default_start, end or default_end
+    if start > end:
+        raise ValueError('تاريخ البداية بعد تاريخ النهاية')
+
+    periods = buckets(start, end, period)
+    values = {metric: metric_series(metric, period, start, end) for metric in metrics}
+    return [
+        {
+            'period': bucket.isoformat(),
+            'year': bucket.year,
+            'month': bucket.month,
+            'day': bucket.day,
+            **{metric: values[metric].get(bucket, 0) for metric in metrics},
+        }
+        for bucket in periods
+    ]
+
+
+def parse_range(params):
+    """قراءة period/start/end/metrics من معاملات الطلب (ValueError عند الخطأ)"""
+    period = params.get('period') or 'month'
+    if period not in PERIODS:
+        raise ValueError(f'فترة غير معروفة: {period}')
+    start = date.fromisoformat(params['start']) if params.get('start') else None
+    end = date.fromisoformat(params['end']) if params.get('end') else None
+    metrics = [m for m in (params.get('metrics') or '').split(',') if m] or None
+    return {'metrics': metrics, 'period': period, 'start': start, 'end': end}
+
+
+def build_statistics():
+    """إحصائيات لوحة التحكم العامة مع بصمة (ETag) لمحتواها"""
+    today_activity = ActivityRollup.for_date()
+    today = timezone.localdate()
+    current_month = time_series(['books', 'users'], 'month', today, today)[0]
+    stats = {
+        'total_books': Book.objects.count(),
+        # كل المستخدمين كما في بطاقة «إجمالي المستخدمين»، والنشطون منهم في حقل مستقل
+        'total_users': User.objects.count(),
+        'active_users': User.objects.filter(is_active=True).count(),
+        'total_reviews': Review.objects.count(),
+        'avg_rating': round(Review.objects.aggregate(avg=Avg('rating'))['avg'] or 0, 1),
+        'today_visitors': today_activity.visitors,
+        'today_activity': today_activity.as_dict(),
+        'monthly_books': current_month['books'],
+        'monthly_users': current_month['users'],
+    }
+    body = json.dumps(stats, sort_keys=True)
+    return {
+        'stats': stats,
+        'etag': '"%s"' % hashlib.md5(body.encode()).hexdigest(),
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+# تُبطل عند إضافة أو حذف كتاب أو مستخدم أو تقييم، وتُعاد كل STATS_SNAPSHOT_TIMEOUT ثانية
+# لالتقاط نشاط اليوم (الزوار والتحميلات)
+statistics_snapshot = VersionedSnapshot(
+    'statistics', build_statistics, timeout=getattr(settings, 'STATS_SNAPSHOT_TIMEOUT', 30)
+)
@@ -0,0 +1,54 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from books.images import FORMATS, KINDS
+
+register = template.Library()
+
+# عرض الصورة المتوقع في الشبكات (عمود من 2 على الجوال و4 على الشاشات الكبيرة)
+DEFAULT_SIZES = '(min-width: 1024px) 25vw, (min-width: 640px) 33vw, 50vw'
+
+
+def _attrs(attrs):
+    return format_html_join(
+        ' ', '{}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items() if value is not None)
+    )
+
+
+def _srcset(variants):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, _, name in variants)
+
+
+@register.simple_tag
+def responsive_image(obj, kind='cover', sizes=DEFAULT_SIZES, **attrs):
+    """وسم صورة بنسخ متعددة الأحجام (srcset) وتحميل كسول
+
+    الاستخدام: {% responsive_image book 'cover' class='w-full h-full object-cover' alt=book.title %}
+    يعيد <picture> بمصادر AVIF/WebP ووسم img بنسخ JPEG، أو الصورة الأصلية إذا لم
+    تُولَّد النسخ بعد. مرّر loading='eager' للصور الظاهرة أول الصفحة.
+    """
+    image_field, variants_field, _ = KINDS[kind]
+    image = getattr(obj, image_field, None)
+    if not image:
+        return ''
+    attrs.setdefault('alt', str(obj))
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+
+    data = getattr(obj, variants_field, None) or {}
+    variants = data.get('variants') or {}
+    if data.get('source') != image.name or not variants.get('jpeg'):
+        return format_html('<img src="{}" {}>', image.url, _attrs(attrs))
+
+    fallback = variants['jpeg']
+    width, height, name = fallback[-1]
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMATS[fmt][1], _srcset(variants[fmt]), sizes) for fmt in FORMATS if fmt != 'jpeg' and variants.get(fmt)),
+    )
+    # display: contents يبقي تنسيق الصورة داخل العنصر الأب كما كان بدون <picture>
+    return format_html(
+        '<picture style="display: contents">{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" {}></picture>',
+        sources, default_storage.url(name), _srcset(fallback), sizes, width, height, _attrs(attrs),
+    )
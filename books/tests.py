@@ -1,3 +1,1994 @@
-from django.test import TestCase
+"""
+اختبارات تطبيق الكتب.
 
-# Create your tests here.
+تعمل على SQLite افتراضياً، وعلى PostgreSQL بتشغيلها مع DATABASE_URL=postgres://...
+
+في اختبارات خطط الاستعلامات تُنفَّذ الصفحات على قاعدة بيانات مزروعة، ثم يُشغَّل EXPLAIN على كل استعلام نفذته،
+ويفشل الاختبار إذا قرأ أي استعلام جدولاً كاملاً دون فهرس (SCAN في SQLite،
+Seq Scan في PostgreSQL مع تعطيل المسح التسلسلي حتى لا يختاره المخطط للجداول الصغيرة).
+"""
+import json
+import math
+import os
+import re
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from datetime import date, datetime, timedelta
+
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db.migrations.executor import MigrationExecutor
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db import IntegrityError, connection, transaction
+from django.contrib.sessions.models import Session
+from django.db.models import Model, QuerySet
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.signals import template_rendered
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from book_project.caches import cache_config
+from book_project.database import database_config, sqlite_production_options
+
+from . import async_views, images, ingestion, querybudget, urls, views
+from .activity import ActivityBuffer
+from .autocomplete import AutocompleteIndex
+from .buffers import flush_all
+from .caching import VersionedSnapshot, bump_version, get_version
+from .counters import CounterBuffer
+from .downloads import parse_range as parse_download_range, signed_url
+from .exports import csv_value
+from .forms import BookForm
+from .importing import RecordError, SlugAllocator, parse_record
+from .context_processors import categories_snapshot
+from .models import (
+    ActivityRollup, Author, AuthorStats, Book, BookContent, BookRecommendation, Bookmark, Category, QueryFingerprint, QueryProfile, ReadingHistory, Review, UserActivity,
+)
+from .pagination import KeysetPaginator, cached_count
+from .management.commands import load_test
+from .querybudget import QueryBudgetMiddleware, normalize, query_stats
+from .recommendations import BOOKMARK_WEIGHT, build, similar_books, similarities, user_vectors
+from .routing import PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter, primary_reads, read_replica, replica_reads
+from .visits import VisitBuffer, existing_history, parse_reading_events
+from .workers import ProcessPool, run_batched
+from .search import get_backend, normalize_arabic, rebuild_index, search_books, search_text, tokenize
+from .stats import build_statistics, buckets, default_range, parse_range, statistics_snapshot, time_series
+
+EXPLAINED = re.compile(r'^\s*(SELECT|UPDATE|DELETE)\b', re.IGNORECASE)
+FULL_SCAN = {
+    # "SCAN books_book" دون فهرس، أو المرور على فهرس كامل ثم فرز النتائج (لا يفيد الفهرس
+    # في التصفية ولا الترتيب)؛ الجداول الافتراضية (FTS5) تظهر بـ VIRTUAL TABLE
+    'sqlite': re.compile(r'^SCAN (\w+)(?: USING INDEX (?P<index>\w+))?$'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+SORTED = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+# المخازن المؤجلة تكتب فوراً أثناء الاختبارات: خيوطها الخلفية تكتب خارج معاملة الاختبار
+# فتتنافس معها على قفل قاعدة البيانات (اختبارات المخازن تحدد فتراتها بنفسها)
+IMMEDIATE_FLUSH = override_settings(
+    BOOK_COUNTERS_FLUSH_INTERVAL=0,
+    READING_HISTORY_FLUSH_INTERVAL=0,
+    USER_ACTIVITY_FLUSH_INTERVAL=0,
+    QUERY_STATS_FLUSH_INTERVAL=0,
+)
+
+
+def setUpModule():
+    IMMEDIATE_FLUSH.enable()
+
+
+def tearDownModule():
+    # ما بقي في المخازن المؤجلة يُكتب الآن في قاعدة الاختبار، لا عند خروج العملية
+    # بعد أن يعود الاتصال إلى قاعدة الموقع
+    flush_all()
+    IMMEDIATE_FLUSH.disable()
+
+
+class RatingStatsTests(TestCase):
+    """إحصائيات التقييم المخزنة على الكتاب تتبع المراجعات"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='روايات', slug='novels')
+        cls.book, cls.other = [
+            Book.objects.create(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', category=category,
+                published_year=2000, pages=10,
+            )
+            for i in range(2)
+        ]
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'x') for i in range(3)]
+
+    def stats(self, book=None):
+        book = Book.objects.get(pk=(book or self.book).pk)
+        return book.review_count, book.avg_rating, [row['count'] for row in book.ratings_histogram()]
+
+    def test_create_update_delete(self):
+        Review.objects.create(book=self.book, user=self.users[0], rating=5, comment='')
+        review = Review.objects.create(book=self.book, user=self.users[1], rating=2, comment='')
+        self.assertEqual(self.stats(), (2, 3.5, [1, 0, 0, 1, 0]))
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 4
+        review.save()
+        self.assertEqual(self.stats(), (2, 4.5, [1, 1, 0, 0, 0]))
+
+        review.book = self.other
+        review.save()
+        self.assertEqual(self.stats(), (1, 5, [1, 0, 0, 0, 0]))
+        self.assertEqual(self.stats(self.other), (1, 4, [0, 1, 0, 0, 0]))
+
+        review.delete()
+        self.assertEqual(self.stats(self.other), (0, 0, [0, 0, 0, 0, 0]))
+
+    def test_deferred_rating(self):
+        Review.objects.create(book=self.book, user=self.users[0], rating=5, comment='')
+        Review.objects.create(book=self.book, user=self.users[1], rating=1, comment='')
+        review = Review.objects.only('pk', 'book').get(user=self.users[0])
+        review.rating = 3
+        review.save()
+        self.assertEqual(self.stats(), (2, 2, [0, 0, 1, 0, 1]))
+
+        Review.objects.defer('rating').get(user=self.users[1]).delete()
+        self.assertEqual(self.stats(), (1, 3, [0, 0, 1, 0, 0]))
+
+    def test_drift_after_bulk_create(self):
+        # bulk_create لا يرسل الإشارات فتبقى الإحصائيات المخزنة صفراً
+        Review.objects.bulk_create([
+            Review(book=self.book, user=user, rating=4, comment='') for user in self.users[:2]
+        ])
+        Review.objects.first().delete()
+        self.assertEqual(self.stats(), (0, 0, [0, 0, 0, 0, 0]))
+
+        Book.recompute_rating_stats()
+        self.assertEqual(self.stats(), (1, 4, [0, 1, 0, 0, 0]))
+
+
+class AuthorStatsTests(TestCase):
+    """إحصائيات المؤلفين المخزنة وقائمة المؤلفين"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='روايات', slug='novels')
+        cls.author, cls.other = Author.objects.create(name='أ'), Author.objects.create(name='ب')
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'x')
+
+    def book(self, i, author, **kwargs):
+        return Book.objects.create(
+            title=f'كتاب {i}', slug=f'book-{i}', description='وصف', author=author, category=self.category,
+            published_year=2000, pages=100, **kwargs,
+        )
+
+    def test_refresh(self):
+        first, second = self.book(0, self.author, views=3), self.book(1, self.author, downloads=2)
+        Review.objects.create(book=first, user=self.reader, rating=5, comment='')
+        Review.objects.create(book=second, user=self.reader, rating=2, comment='')
+        ReadingHistory.objects.create(user=self.reader, book=first)
+        ReadingHistory.objects.create(user=self.reader, book=second)
+        AuthorStats.refresh([self.author.pk])
+
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(
+            (stats.books_count, stats.readers_count, stats.review_count, stats.avg_rating),
+            (2, 1, 2, 3.5),
+        )
+        self.assertEqual((stats.total_pages, stats.total_views, stats.total_downloads), (200, 3, 2))
+
+    def test_signals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = self.book(0, self.author)
+        self.assertEqual(AuthorStats.objects.get(author=self.author).books_count, 1)
+
+        book = Book.objects.get(pk=book.pk)
+        book.author = self.other
+        with self.captureOnCommitCallbacks(execute=True):
+            book.save()
+        self.assertEqual(AuthorStats.objects.get(author=self.author).books_count, 0)
+        self.assertEqual(AuthorStats.objects.get(author=self.other).books_count, 1)
+
+    @override_settings(PAGINATION_SHALLOW_PAGES=1)
+    def test_list_includes_authors_without_stats(self):
+        self.book(0, self.other)
+        AuthorStats.refresh()
+        # المضافون بـ bulk_create ليس لهم صف إحصائيات
+        Author.objects.bulk_create([Author(name=f'مستورد {i}') for i in range(25)])
+        expected = [self.other.pk, self.author.pk] + list(
+            Author.objects.filter(stats__isnull=True).order_by('-id').values_list('pk', flat=True)
+        )
+
+        response = self.client.get(reverse('all_authors'))
+        self.assertEqual(response.context['total_authors'], 27)
+        pages = [response.context['page_obj']]
+        while pages[-1].next_cursor:
+            response = self.client.get(reverse('all_authors'), {'cursor': pages[-1].next_cursor})
+            pages.append(response.context['page_obj'])
+        self.assertEqual([author.pk for page in pages for author in page], expected)
+
+        # والرجوع بالمؤشر يعيد الصفحة السابقة نفسها
+        response = self.client.get(reverse('all_authors'), {'cursor': pages[-1].previous_cursor})
+        self.assertEqual([author.pk for author in response.context['page_obj']], expected[12:24])
+
+
+class CounterTests(TestCase):
+    """عدادات المشاهدات والتحميلات المؤجلة"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='روايات', slug='novels')
+        cls.author = Author.objects.create(name='مؤلف')
+        cls.book = Book.objects.create(
+            title='كتاب', slug='book', description='وصف', author=cls.author, category=category,
+            published_year=2000, pages=10, is_free=True,
+        )
+
+    def test_flush(self):
+        buffer = CounterBuffer(flush_interval=3600)
+        for _ in range(3):
+            buffer.incr(self.book.pk, 'views')
+        buffer.incr(self.book.pk, 'downloads', 2)
+        self.assertEqual(buffer.pending(self.book.pk, 'views'), 3)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).views, 0)
+
+        self.assertEqual(buffer.flush(), 4)
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual((book.views, book.downloads), (3, 2))
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual((stats.total_views, stats.total_downloads), (3, 2))
+        rollup = ActivityRollup.for_date()
+        self.assertEqual((rollup.views, rollup.downloads), (3, 2))
+        self.assertEqual(buffer.flush(), 0)
+        with self.assertRaises(ValueError):
+            buffer.incr(self.book.pk, 'likes')
+
+    def test_failed_flush_is_retained_up_to_a_limit(self):
+        buffer = CounterBuffer(flush_interval=3600)
+        with mock.patch.object(CounterBuffer, 'write', side_effect=OSError('database is locked')), \
+                mock.patch.object(CounterBuffer, 'max_pending', new_callable=mock.PropertyMock, return_value=4), \
+                self.assertLogs('books.buffers', 'ERROR') as logs:
+            for _ in range(3):
+                buffer.incr(self.book.pk, 'views')
+            with self.assertRaises(OSError):
+                buffer.flush()
+            self.assertEqual((buffer.pending(self.book.pk, 'views'), buffer.dropped), (3, 0))
+            # انقطاع مستمر: ما تجاوز الحد يُسقط بدل أن يبقى في الذاكرة
+            for _ in range(2):
+                buffer.incr(self.book.pk, 'views')
+            with self.assertRaises(OSError):
+                buffer.flush()
+        self.assertEqual((buffer.pending(self.book.pk, 'views'), buffer.dropped), (0, 5))
+        self.assertIn('5', logs.output[-1])
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_stale_form_keeps_counters(self):
+        stale = Book.objects.get(pk=self.book.pk)
+        Book.objects.filter(pk=self.book.pk).update(views=10)
+        form = BookForm(
+            {**model_to_dict(stale, fields=BookForm._meta.fields), 'title': 'عنوان جديد', 'author': self.author.pk},
+            instance=stale,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual((book.title, book.views), ('عنوان جديد', 10))
+
+        # الحفظ العادي (لوحة الإدارة والترحيلات) يكتب كل الحقول كما هي
+        book.views = 3
+        book.save()
+        self.assertEqual(Book.objects.get(pk=self.book.pk).views, 3)
+
+    @override_settings(BOOK_COUNTERS_FLUSH_INTERVAL=0)
+    def test_book_detail_counts_view(self):
+        self.client.get(reverse('book_detail', args=[self.book.slug]))
+        self.client.get(reverse('book_detail', args=[self.book.slug]))
+        self.assertEqual(Book.objects.get(pk=self.book.pk).views, 2)
+
+
+class AutocompleteTests(SimpleTestCase):
+    """فهرس الإكمال التلقائي في الذاكرة"""
+
+    def setUp(self):
+        self.index = AutocompleteIndex()
+        self.index.bulk_load([
+            ('book', 1, 'الثلاثية', 'نجيب محفوظ', '/books/trilogy/', 50),
+            ('book', 2, 'القاهرة الجديدة', 'نجيب محفوظ', '/books/cairo/', 10),
+            ('book', 3, 'قصر الشوق', 'نجيب محفوظ', '/books/palace/', 30),
+            ('book', 4, 'Python Crash Course', 'Eric Matthes', '/books/python/', 5),
+            ('author', 1, 'نجيب محفوظ', 'روائي', '/authors/1/', 3),
+            ('category', 1, 'القصص القصيرة', '', '/categories/stories/', 0),
+        ])
+
+    def labels(self, query, limit=8):
+        return [entry['label'] for entry in self.index.search(query, limit)]
+
+    def test_short_article_prefix(self):
+        # أثناء كتابة «ال» وما بعدها بحرف واحد، قبل أن تُحذف أداة التعريف من الكلمة
+        self.assertEqual(set(self.labels('ال')), {'الثلاثية', 'القاهرة الجديدة', 'قصر الشوق', 'القصص القصيرة'})
+        self.assertEqual(self.labels('الق'), ['القاهرة الجديدة', 'القصص القصيرة'])
+        self.assertEqual(self.labels('الث'), ['الثلاثية'])
+        self.assertEqual(self.labels('القا'), ['القاهرة الجديدة'])
+        self.assertEqual(self.labels('قاهره'), ['القاهرة الجديدة'])
+
+    def test_prefix_and_words(self):
+        self.assertEqual(self.labels('pyth'), ['Python Crash Course'])
+        self.assertEqual(self.labels('نجيب'), ['نجيب محفوظ'])
+        # كل الكلمات مطلوبة، والأخيرة بادئة
+        self.assertEqual(self.labels('قصر الش'), ['قصر الشوق'])
+        self.assertEqual(self.labels('الثلاثية python'), [])
+
+    def test_typos(self):
+        self.assertEqual(self.labels('الثلاتيه'), ['الثلاثية'])
+        self.assertEqual(self.labels('pyhton'), ['Python Crash Course'])
+
+    def test_ranking_and_updates(self):
+        # الكتب قبل المؤلفين والتصنيفات، ثم حسب الوزن
+        self.assertEqual(self.labels('ال', limit=2), ['الثلاثية', 'قصر الشوق'])
+        self.index.add('book', 2, 'القاهرة', 'نجيب محفوظ', '/books/cairo/', 100)
+        self.assertEqual(self.labels('ال', limit=1), ['القاهرة'])
+        self.assertEqual(self.labels('الجديده'), [])
+        self.index.remove('book', 1)
+        self.assertEqual(self.labels('الث'), [])
+
+    @override_settings(CACHE_VERSION_CHECK_INTERVAL=5)
+    def test_version_polling_is_throttled(self):
+        self.index.loaded = True
+        self.index.version = 0
+        with mock.patch('books.autocomplete.current_version', return_value=1) as version, \
+                mock.patch('books.autocomplete.threading.Thread') as thread, \
+                mock.patch('books.autocomplete.time.monotonic', side_effect=[100, 104, 105]):
+            for _ in range(3):
+                self.index.ensure_fresh()
+        # مرة عند أول طلب ومرة بعد انقضاء المدة، لا في كل طلب
+        self.assertEqual(version.call_count, 2)
+        thread.return_value.start.assert_called_once()
+
+
+class SharedCacheTests(TestCase):
+    """أرقام الإصدار في ذاكرة مشتركة بين العمليات، لا في ذاكرة كل عامل"""
+
+    def test_cache_config(self):
+        self.assertEqual(cache_config('db://books_cache'), {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'books_cache',
+        })
+        self.assertEqual(cache_config('redis://:secret@redis:6379/1?timeout=600&health_check_interval=30'), {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://:secret@redis:6379/1',
+            'TIMEOUT': 600,
+            'OPTIONS': {'health_check_interval': 30},
+        })
+        self.assertEqual(cache_config('memcached://a:11211,b:11211')['LOCATION'], ['a:11211', 'b:11211'])
+        self.assertEqual(cache_config('file:///var/tmp/bookmark')['LOCATION'], '/var/tmp/bookmark')
+        with self.assertRaises(ImproperlyConfigured):
+            cache_config('mongodb://localhost')
+        with self.assertRaises(ImproperlyConfigured):
+            cache_config('db://')
+
+    def test_default_is_local(self):
+        # لا استعلام على قاعدة البيانات لقراءة الإصدار؛ الذاكرة المشتركة تُختار بـ CACHE_URL
+        self.assertIsInstance(caches['default'], LocMemCache)
+
+    @override_settings(CACHE_VERSION_CHECK_INTERVAL=5)
+    def test_version_bump_reaches_other_workers(self):
+        # اتصال ثانٍ بالذاكرة نفسها يمثل عاملاً آخر
+        other_worker = caches.create_connection('default')
+        builds = []
+
+        def build():
+            builds.append(Category.objects.count())
+            return builds[-1]
+
+        snapshot = VersionedSnapshot('shared-test', build)
+        other_snapshot = VersionedSnapshot('shared-test', build)
+        with mock.patch('books.caching.time.monotonic', return_value=100):
+            self.assertEqual(snapshot.get(), 0)
+            self.assertEqual(other_snapshot.get(), 0)
+            self.assertEqual(len(builds), 1)
+
+            Category.objects.create(name='شعر', slug='poetry')
+            with mock.patch('books.caching.cache', other_worker):
+                other_snapshot.invalidate()
+            self.assertEqual(get_version('shared-test'), 1)
+            # العامل الذي أبطل النسخة يراها فوراً، والآخر لا يقرأ الإصدار قبل موعده
+            self.assertEqual(other_snapshot.get(), 1)
+            with self.assertNumQueries(0):
+                self.assertEqual(snapshot.get(), 0)
+        with mock.patch('books.caching.time.monotonic', return_value=105):
+            self.assertEqual(snapshot.get(), 1)
+        self.assertEqual(builds, [0, 1])
+
+    def test_bump_version(self):
+        self.assertEqual(get_version('bump-test'), 0)
+        self.assertEqual(bump_version('bump-test'), 1)
+        self.assertEqual(bump_version('bump-test'), 2)
+        cache.delete('books:version:bump-test')
+        self.assertEqual(bump_version('bump-test'), 1)
+
+
+class VisitBufferTests(TestCase):
+    """زيارات القراء ونبضاتهم المؤجلة إلى سجل القراءة"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='روايات', slug='novels')
+        cls.author = Author.objects.create(name='مؤلف')
+        cls.book = Book.objects.create(
+            title='كتاب', slug='book', description='وصف', author=cls.author, category=category,
+            published_year=2000, pages=10, is_free=True,
+        )
+        cls.user = User.objects.create_user('reader', password='x')
+
+    def history(self):
+        return list(ReadingHistory.objects.filter(user=self.user, book=self.book).values_list(
+            'progress', 'reading_duration_minutes',
+        ))
+
+    def test_visits_within_window_are_merged(self):
+        buffer = VisitBuffer(flush_interval=3600, window=600)
+        self.assertTrue(buffer.visit(self.user.pk, self.book.pk))
+        self.assertFalse(buffer.visit(self.user.pk, self.book.pk))
+        self.assertEqual(self.history(), [])
+        buffer.flush()
+        self.assertEqual(self.history(), [(0, 0)])
+        self.assertEqual(AuthorStats.objects.get(author=self.author).readers_count, 1)
+
+    def test_two_workers_write_one_row(self):
+        # مخزنان يمثلان عاملين يقرأ كل منهما أن السجل غير موجود ثم يكتب
+        first, second = VisitBuffer(flush_interval=3600), VisitBuffer(flush_interval=3600)
+        first.read(self.user.pk, self.book.pk, seconds=90, progress=20)
+        second.read(self.user.pk, self.book.pk, seconds=60, progress=10)
+        for buffer in (first, second):
+            lookups = iter([lambda keys: {}, existing_history])
+            with mock.patch('books.visits.existing_history', side_effect=lambda keys: next(lookups)(keys)):
+                buffer.flush()
+        self.assertEqual(self.history(), [(20, 2)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ReadingHistory.objects.create(user=self.user, book=self.book)
+
+    def test_heartbeats(self):
+        buffer = VisitBuffer(flush_interval=3600)
+        self.assertTrue(buffer.read(self.user.pk, self.book.pk, seconds=40, progress=30))
+        self.assertFalse(buffer.read(self.user.pk, self.book.pk, seconds=40, progress=25))
+        buffer.flush()
+        # دقيقة كاملة تُكتب و20 ثانية تُحمل للكتابة التالية
+        self.assertEqual(self.history(), [(30, 1)])
+        buffer.read(self.user.pk, self.book.pk, seconds=40, progress=10)
+        buffer.flush()
+        # التقدم لا يتراجع
+        self.assertEqual(self.history(), [(30, 2)])
+
+    def test_deleted_books_are_skipped(self):
+        buffer = VisitBuffer(flush_interval=3600)
+        buffer.visit(self.user.pk, self.book.pk + 1000)
+        buffer.flush()
+        self.assertFalse(ReadingHistory.objects.exists())
+
+
+class ActivityRollupTests(TestCase):
+    """سجل النشاط المؤجل والملخص اليومي"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'user{i}', password='x') for i in range(3)]
+
+    def test_events_keep_their_time(self):
+        buffer = ActivityBuffer(flush_interval=3600)
+        # نشاط قبل منتصف الليل يُكتب بعده: يُحسب في يومه لا في يوم الكتابة
+        before_midnight = timezone.now() - timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=before_midnight):
+            buffer.log(self.users[0].pk, 'login')
+        buffer.flush()
+        self.assertEqual(UserActivity.objects.get().visited_at, before_midnight)
+        self.assertEqual(ActivityRollup.for_date(timezone.localdate(before_midnight)).logins, 1)
+        self.assertEqual(ActivityRollup.for_date().logins, 0)
+
+    def test_rollup_matches_rebuild(self):
+        buffer = ActivityBuffer(flush_interval=3600)
+        for user in self.users:
+            buffer.log(user.pk, 'login')
+            buffer.log(user.pk, 'view_book', 'book')
+        buffer.log(self.users[0].pk, 'view_book', 'other')
+        buffer.log(self.users[1].pk, 'review', 'book')
+        buffer.flush()
+        # دفعة ثانية لنفس الزوار لا تزيد عدد الزوار المميزين
+        buffer.log(self.users[2].pk, 'bookmark', 'book')
+        buffer.flush()
+
+        incremental = ActivityRollup.for_date().as_dict()
+        self.assertEqual(
+            {key: incremental[key] for key in ('visitors', 'logins', 'book_views', 'reviews', 'bookmarks')},
+            {'visitors': 3, 'logins': 3, 'book_views': 4, 'reviews': 1, 'bookmarks': 1},
+        )
+        ActivityRollup.objects.all().delete()
+        call_command('rebuild_activity_rollup', stdout=StringIO())
+        self.assertEqual(ActivityRollup.for_date().as_dict(), incremental)
+
+    def test_invalid_and_deleted(self):
+        buffer = ActivityBuffer(flush_interval=3600)
+        with self.assertRaises(ValueError):
+            buffer.log(self.users[0].pk, 'dance')
+        user = User.objects.create_user('gone', password='x')
+        buffer.log(user.pk, 'login')
+        user.delete()
+        buffer.flush()
+        self.assertFalse(UserActivity.objects.exists())
+        self.assertEqual(ActivityRollup.for_date().visitors, 0)
+
+
+class StatsEngineTests(TestCase):
+    """الإحصائيات الزمنية حسب فترات التقويم"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='روايات', slug='novels')
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        tz = timezone.get_current_timezone()
+        for i, created in enumerate([datetime(2024, 1, 31, 23, 30), datetime(2024, 2, 1), datetime(2024, 3, 15)]):
+            book = Book.objects.create(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', category=category,
+                published_year=2000, pages=10,
+            )
+            Book.objects.filter(pk=book.pk).update(created_at=timezone.make_aware(created, tz))
+        User.objects.filter(pk=cls.staff.pk).update(date_joined=timezone.make_aware(datetime(2024, 2, 10), tz))
+        ActivityRollup.objects.create(date=date(2024, 2, 28), downloads=4)
+        ActivityRollup.objects.create(date=date(2024, 2, 29), downloads=3)
+
+    def test_buckets_follow_calendar(self):
+        self.assertEqual(
+            buckets(date(2023, 11, 20), date(2024, 2, 29), 'month'),
+            [date(2023, 11, 1), date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1)],
+        )
+        # الأسبوع يبدأ يوم الاثنين
+        self.assertEqual(buckets(date(2024, 2, 29), date(2024, 3, 4), 'week'), [date(2024, 2, 26), date(2024, 3, 4)])
+        self.assertEqual(default_range('month', 3, today=date(2024, 3, 31)), (date(2024, 1, 1), date(2024, 3, 31)))
+        with self.assertRaises(ValueError):
+            buckets(date(2000, 1, 1), date(2024, 1, 1), 'day')
+
+    def test_time_series_fills_empty_periods(self):
+        series = time_series(None, 'month', date(2024, 1, 1), date(2024, 4, 30))
+        self.assertEqual(
+            [(row['period'], row['books'], row['users'], row['reviews'], row['downloads']) for row in series],
+            [
+                ('2024-01-01', 1, 0, 0, 0),
+                ('2024-02-01', 1, 1, 0, 7),
+                ('2024-03-01', 1, 0, 0, 0),
+                ('2024-04-01', 0, 0, 0, 0),
+            ],
+        )
+        days = time_series(['books'], 'day', date(2024, 1, 31), date(2024, 2, 1))
+        self.assertEqual([row['books'] for row in days], [1, 1])
+
+    def test_invalid_ranges(self):
+        for params in ({'period': 'year'}, {'start': '2024-13-01'}, {'metrics': 'likes'},
+                       {'start': '2024-02-01', 'end': '2024-01-01'}):
+            with self.subTest(params=params):
+                with self.assertRaises(ValueError):
+                    time_series(**parse_range(params))
+
+    def test_series_endpoint(self):
+        url = reverse('statistics_series')
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'period': 'week', 'start': '2024-02-26', 'end': '2024-03-03', 'metrics': 'downloads'})
+        self.assertEqual(response.json()['series'], [
+            {'period': '2024-02-26', 'year': 2024, 'month': 2, 'day': 26, 'downloads': 7},
+        ])
+        self.assertEqual(self.client.get(url, {'period': 'hour'}).status_code, 400)
+
+
+class StatisticsSnapshotTests(TestCase):
+    """إحصائيات لوحة التحكم من نسخة مخزنة مع ETag"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='روايات', slug='novels')
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        # نسخة جديدة بنفس مفتاح الإصدار، دون ما بقي في ذاكرة العملية من الاختبارات السابقة،
+        # تقرؤها الصفحات وتبطلها الإشارات كما في عامل واحد
+        self.snapshot = VersionedSnapshot('statistics', build_statistics)
+        for target in ('books.views.statistics_snapshot', 'books.signals.statistics_snapshot'):
+            patcher = mock.patch(target, self.snapshot)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client.force_login(self.staff)
+
+    def add_book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Book.objects.create(
+                title='كتاب', slug=f'book-{Book.objects.count()}', description='وصف', category=self.category,
+                published_year=2000, pages=10,
+            )
+
+    def test_conditional_get(self):
+        url = reverse('get_statistics')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response.json()['stats']['total_books'], 0)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in queries if 'books_book' in q['sql'] or 'books_review' in q['sql']])
+
+        self.add_book()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['stats']['total_books'], 1)
+
+    def test_invalidation(self):
+        version = get_version('statistics')
+        # تسجيل الدخول يحفظ last_login فقط
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.staff)
+        self.assertEqual(get_version('statistics'), version)
+        book = self.add_book()
+        self.assertEqual(get_version('statistics'), version + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=self.staff, book=book, rating=4)
+        self.assertEqual(get_version('statistics'), version + 2)
+        self.assertEqual(self.snapshot.get()['stats']['total_reviews'], 1)
+
+    def test_user_counts(self):
+        User.objects.create_user('gone', password='x', is_active=False)
+        stats = self.snapshot.get()['stats']
+        self.assertEqual((stats['total_users'], stats['active_users']), (2, 1))
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'إجمالي المستخدمين')
+        self.assertEqual(response.context['total_users'], 2)
+
+    def test_permissions_and_stream(self):
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        self.assertEqual(self.client.get(reverse('get_statistics')).status_code, 403)
+        self.client.force_login(self.staff)
+        # البث عبر ASGI فقط
+        with override_settings(STATS_STREAM_ENABLED=True):
+            self.assertEqual(self.client.get(reverse('statistics_stream')).status_code, 404)
+
+
+@override_settings(PAGINATION_SHALLOW_PAGES=2)
+class CursorPaginationTests(TestCase):
+    """الترقيم بالمؤشرات بعد الصفحات القريبة"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='روايات', slug='novels')
+        created = timezone.now()
+        books = [
+            Book.objects.create(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', category=cls.category,
+                published_year=2000, pages=10,
+            )
+            for i in range(30)
+        ]
+        # أوقات متساوية لأزواج من الكتب: الترتيب يعتمد على id عند التساوي
+        for i, book in enumerate(books):
+            Book.objects.filter(pk=book.pk).update(created_at=created - timedelta(hours=i // 2))
+        cls.expected = list(Book.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('books_by_category', args=[self.category.slug])
+
+    def ids(self, page):
+        return [book.pk for book in page]
+
+    def test_seek_matches_ordering(self):
+        keyset = KeysetPaginator(Book.objects.all(), 5, ('-created_at', '-id'))
+        pivot = Book.objects.get(pk=self.expected[10])
+        values = [pivot.created_at, pivot.pk]
+        after = Book.objects.filter(keyset._seek(values, True)).order_by('-created_at', '-id')
+        before = Book.objects.filter(keyset._seek(values, False)).order_by('-created_at', '-id')
+        self.assertEqual(list(after.values_list('pk', flat=True)), self.expected[11:])
+        self.assertEqual(list(before.values_list('pk', flat=True)), self.expected[:10])
+
+    def test_next_and_previous(self):
+        page = self.client.get(self.url, {'page': 2}).context['page_obj']
+        self.assertEqual(self.ids(page), self.expected[12:24])
+        self.assertIsNotNone(page.next_cursor)
+
+        page = self.client.get(self.url, {'cursor': page.next_cursor}).context['page_obj']
+        self.assertTrue(page.is_cursor)
+        self.assertEqual(self.ids(page), self.expected[24:])
+        self.assertFalse(page.has_next())
+
+        page = self.client.get(self.url, {'cursor': page.previous_cursor}).context['page_obj']
+        self.assertEqual(self.ids(page), self.expected[12:24])
+        page = self.client.get(self.url, {'cursor': page.previous_cursor}).context['page_obj']
+        self.assertEqual(self.ids(page), self.expected[:12])
+        self.assertFalse(page.has_previous())
+
+    def test_deep_page_numbers_are_capped(self):
+        response = self.client.get(self.url, {'page': 3})
+        page = response.context['page_obj']
+        # الصفحة الثالثة بـ OFFSET لا تُخدم: آخر صفحة قريبة مع مؤشر التالي
+        self.assertEqual((page.number, self.ids(page)), (2, self.expected[12:24]))
+        self.assertIsNotNone(page.next_cursor)
+        self.assertEqual(list(page.page_numbers), [1, 2])
+        self.assertNotContains(response, '?page=3')
+
+        response = self.client.get(self.url, {'cursor': page.next_cursor})
+        self.assertNotContains(response, '?page=')
+
+    def test_invalid_cursor(self):
+        page = self.client.get(self.url, {'cursor': 'bad'}).context['page_obj']
+        self.assertEqual(self.ids(page), self.expected[:12])
+
+
+def image_file(name, size=(600, 900), mode='RGB'):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(IMAGE_DERIVATIVE_WORKERS=0, IMAGE_DERIVATIVE_FORMATS=['jpeg'])
+class ImageVariantTests(TestCase):
+    """النسخ المصغرة للأغلفة وصور المؤلفين"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='روايات', slug='novels')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def add_book(self, cover, slug='book'):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(
+                title='كتاب', slug=slug, description='وصف', category=self.category,
+                published_year=2000, pages=10, cover_image=cover,
+            )
+        book.refresh_from_db()
+        return book
+
+    def test_variants_on_upload(self):
+        book = self.add_book(image_file('cover.png', mode='RGBA'))
+        variants = book.cover_variants
+        self.assertEqual(variants['source'], book.cover_image.name)
+        self.assertEqual([width for width, _, _ in variants['variants']['jpeg']], [240, 480, 600])
+        for _, _, name in variants['variants']['jpeg']:
+            self.assertTrue(default_storage.exists(name))
+        self.assertFalse(images.needs_variants(book, 'cover'))
+
+    def test_broken_image_is_recorded(self):
+        book = self.add_book(SimpleUploadedFile('cover.png', b'not an image'))
+        self.assertEqual(book.cover_variants['source'], book.cover_image.name)
+        self.assertIn('error', book.cover_variants)
+
+    def test_command_counts_failed_saves(self):
+        self.add_book(image_file('one.png'), slug='one')
+        self.add_book(image_file('two.png'), slug='two')
+        out = StringIO()
+        # فشل الحفظ بعد نجاح التوليد يُعد فشلاً
+        store = iter([mock.Mock(side_effect=OSError('disk full')), images.store_variants])
+        with mock.patch('books.images.store_variants', side_effect=lambda *args: next(store)(*args)), \
+                self.assertLogs('books.images', 'ERROR') as logs:
+            call_command('generate_image_variants', '--kind', 'cover', '--force', '--batch-size', '1', stdout=out)
+        self.assertIn('one.png', logs.output[0])
+        self.assertIn('تم توليد نسخ 1 صورة', out.getvalue())
+        self.assertIn('تعذرت معالجة 1 صورة', out.getvalue())
+
+
+class ProcessPoolTests(SimpleTestCase):
+    """نتائج مجموعة العمليات هي ما حفظه on_done"""
+
+    def test_run_batched(self):
+        pool = ProcessPool('TEST_POOL_WORKERS', default_workers=1)
+        self.addCleanup(pool.shutdown)
+
+        def on_done(result, error):
+            if result == 9:
+                raise ValueError('تعذر الحفظ')
+            return None if error else {'value': result}
+
+        with self.assertLogs('books.workers', 'ERROR'):
+            results = list(run_batched(lambda n: pool.run(pow, (n, 2), on_done), [1, 2, 3, 'x'], 2))
+        self.assertEqual(len(results), 4)
+        self.assertCountEqual([r for r in results if r], [{'value': 1}, {'value': 4}])
+        # خطأ الدالة وخطأ الحفظ كلاهما None
+        self.assertEqual(results.count(None), 2)
+
+
+@override_settings(BOOK_COUNTERS_FLUSH_INTERVAL=0, DOWNLOAD_SENDFILE_BACKEND='')
+class DownloadTests(TestCase):
+    """روابط التحميل الموقعة مع Range وETag"""
+
+    CONTENT = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='روايات', slug='novels')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.book = Book.objects.create(
+            title='كتاب', slug='book', description='وصف', category=self.category, published_year=2000,
+            pages=10, is_free=True, pdf_file=SimpleUploadedFile('book.pdf', self.CONTENT),
+        )
+        self.url = signed_url(self.book)
+
+    def downloads(self):
+        return Book.objects.get(pk=self.book.pk).downloads
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_signed_redirect(self):
+        response = self.client.get(reverse('download_book', args=[self.book.slug]))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        Book.objects.filter(pk=self.book.pk).update(is_free=False)
+        response = self.client.get(reverse('download_book', args=[self.book.slug]))
+        self.assertRedirects(response, reverse('book_detail', args=[self.book.slug]), fetch_redirect_response=False)
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(self.downloads(), 1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.downloads(), 1)
+
+    def test_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+        self.assertEqual(self.body(response), self.CONTENT[10:20])
+        # استكمال تحميل لا يُحسب تحميلاً جديداً
+        self.assertEqual(self.downloads(), 0)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-6')
+        self.assertEqual(self.body(response), self.CONTENT[-6:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-')
+        self.assertEqual((response.status_code, len(self.body(response))), (206, len(self.CONTENT)))
+        self.assertEqual(self.downloads(), 1)
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+        # النطاقات المتعددة تُرسل الملف كاملاً
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        # ملف تغير منذ بدء التحميل: يُرسل كاملاً من جديد
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.CONTENT)
+
+    def test_invalid_and_replaced_tokens(self):
+        redirect_url = reverse('download_book', args=[self.book.slug])
+        self.assertRedirects(self.client.get(self.url + 'x'), redirect_url, fetch_redirect_response=False)
+        self.book.pdf_file = SimpleUploadedFile('new.pdf', b'%PDF new')
+        self.book.save()
+        self.assertRedirects(self.client.get(self.url), redirect_url, fetch_redirect_response=False)
+        self.assertEqual(self.client.get(signed_url(self.book)).status_code, 200)
+
+    @override_settings(DOWNLOAD_SENDFILE_BACKEND='nginx', DOWNLOAD_ACCEL_PREFIX='/protected/')
+    def test_sendfile(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.book.pdf_file.name)
+        self.assertNotIn('Content-Type', response)
+        self.assertEqual(response.content, b'')
+
+    def test_parse_range(self):
+        self.assertIsNone(parse_download_range(None, 100))
+        self.assertEqual(parse_download_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(parse_download_range('bytes=-200', 100), (0, 99))
+        for header in ('bytes=-0', 'bytes=100-', 'bytes=5-4'):
+            with self.assertRaises(ValueError):
+                parse_download_range(header, 100)
+
+
+def pdf_file(name, pages=3, author='نجيب محفوظ'):
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=300)
+    writer.add_metadata({'/Author': author, '/Title': 'الثلاثية'})
+    buffer = BytesIO()
+    writer.write(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='application/pdf')
+
+
+@override_settings(PDF_INGESTION_WORKERS=0)
+class PdfIngestionTests(TestCase):
+    """استخراج عدد الصفحات وبيانات ملفات PDF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='روايات', slug='novels')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def add_book(self, pdf, slug='book', pages=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(
+                title='كتاب', slug=slug, description='وصف', category=self.category,
+                published_year=2000, pages=pages, pdf_file=pdf,
+            )
+        return Book.objects.get(pk=book.pk)
+
+    def test_ingest_on_upload(self):
+        book = self.add_book(pdf_file('book.pdf'))
+        content = BookContent.objects.get(book=book)
+        self.assertEqual((content.page_count, content.error), (3, ''))
+        self.assertEqual(content.metadata['title'], 'الثلاثية')
+        # الصفحات واسم المؤلف يُملآن فقط إذا تُركا فارغين
+        self.assertEqual((book.pages, book.author_name), (3, 'نجيب محفوظ'))
+        self.assertFalse(ingestion.needs_ingestion(book))
+
+        other = self.add_book(pdf_file('other.pdf', pages=2), slug='other', pages=120)
+        self.assertEqual(other.pages, 120)
+
+    def test_broken_file(self):
+        book = self.add_book(SimpleUploadedFile('book.pdf', b'%PDF-1.4 broken'))
+        content = BookContent.objects.get(book=book)
+        self.assertEqual(content.page_count, 0)
+        self.assertTrue(content.error)
+        self.assertEqual(book.pages, 0)
+        # لا يعاد المحاولة مع كل حفظ للملف نفسه
+        self.assertFalse(ingestion.needs_ingestion(book))
+
+    def test_replaced_file_is_not_overwritten(self):
+        book = self.add_book(pdf_file('book.pdf'))
+        self.assertIsNone(ingestion._save_result(book.pk, 'books/pdfs/old.pdf', None, ValueError('قديم')))
+        self.assertEqual(BookContent.objects.get(book=book).error, '')
+
+    def test_command_counts_failures(self):
+        self.add_book(pdf_file('one.pdf'), slug='one')
+        self.add_book(SimpleUploadedFile('two.pdf', b'not a pdf'), slug='two')
+        out = StringIO()
+        call_command('ingest_pdfs', '--force', '--batch-size', '1', stdout=out)
+        self.assertIn('تم استخراج محتوى 1 ملف', out.getvalue())
+        self.assertIn('تعذر استخراج 1 ملف', out.getvalue())
+
+
+@override_settings(
+    READING_HISTORY_FLUSH_INTERVAL=0, USER_ACTIVITY_FLUSH_INTERVAL=0, READING_HEARTBEAT_MAX_SECONDS=120,
+    READING_BEACON_MAX_EVENTS=3,
+)
+class ReadingBeaconTests(TestCase):
+    """نبضات القارئ عبر /api/reading/beacon/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='روايات', slug='novels')
+        cls.books = [
+            Book.objects.create(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', category=category,
+                published_year=2000, pages=10,
+            )
+            for i in range(2)
+        ]
+        cls.user = User.objects.create_user('reader', password='x')
+
+    def setUp(self):
+        # مخزن جديد لكل اختبار: نوافذ جلسات القراءة لا تنتقل من اختبار سابق بنفس الأرقام
+        patcher = mock.patch('books.views.reading_visits', VisitBuffer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.user)
+        self.url = reverse('reading_beacon')
+
+    def post(self, events, **kwargs):
+        return self.client.post(self.url, json.dumps(events), content_type='application/json', **kwargs)
+
+    def history(self, book):
+        return ReadingHistory.objects.filter(user=self.user, book=book).values_list(
+            'progress', 'reading_duration_minutes',
+        ).first()
+
+    def test_json_and_form_payloads(self):
+        response = self.post([
+            {'book': self.books[0].pk, 'seconds': 50, 'progress': 10},
+            {'book': self.books[0].pk, 'seconds': 40, 'progress': 35},
+            {'book': self.books[1].pk, 'seconds': 1000},
+        ])
+        self.assertEqual(response.status_code, 204)
+        # مدة النبضة الواحدة لا تتجاوز READING_HEARTBEAT_MAX_SECONDS
+        self.assertEqual(self.history(self.books[0]), (35, 1))
+        self.assertEqual(self.history(self.books[1]), (0, 2))
+
+        # sendBeacon عند المغادرة يرسل نموذجاً فيه حقل events، وقد يكون الجسم {"events": [...]}
+        self.client.post(self.url, {'events': json.dumps([{'book': self.books[0].pk, 'seconds': 30, 'progress': 20}])})
+        self.post({'events': [{'book': self.books[0].pk, 'seconds': 60}]})
+        self.assertEqual(self.history(self.books[0]), (35, 3))
+
+    def test_read_activity_once_per_session(self):
+        for _ in range(3):
+            self.post([{'book': self.books[0].pk, 'seconds': 30}])
+        self.assertEqual(
+            list(UserActivity.objects.filter(user=self.user, activity_type='read_book').values_list('details', flat=True)),
+            [self.books[0].slug],
+        )
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        for events in ({'book': 1}, [{'seconds': 5}], [{'book': 0}], [{'book': 'x'}], [1],
+                       [{'book': self.books[0].pk}] * 4):
+            with self.subTest(events=events):
+                self.assertEqual(self.post(events).status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.post([{'book': self.books[0].pk}]).status_code, 403)
+        self.assertFalse(ReadingHistory.objects.exists())
+
+    def test_parse_reading_events(self):
+        self.assertEqual(
+            parse_reading_events([
+                {'book': '5', 'seconds': -3, 'progress': 150},
+                {'book': 5, 'seconds': 20, 'progress': 40},
+                {'book': 6, 'seconds': None},
+            ], max_events=5, max_seconds=60),
+            [(5, 20, 100), (6, 0, None)],
+        )
+
+
+class RecommendationTests(TestCase):
+    """الكتب المشابهة من تزامن تفاعلات القراء"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.novels = Category.objects.create(name='روايات', slug='novels')
+        science = Category.objects.create(name='علوم', slug='science')
+        author = Author.objects.create(name='مؤلف')
+        cls.books = [
+            Book.objects.create(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', author=author,
+                category=cls.novels if i < 4 else science, published_year=2000, pages=10, avg_rating=i,
+            )
+            for i in range(6)
+        ]
+        cls.users = [User.objects.create_user(f'user{i}', password='x') for i in range(3)]
+
+    def test_similarities(self):
+        vectors = {
+            1: {10: 1.0, 20: 1.0},
+            2: {10: 2.0, 20: 2.0, 30: 1.0},
+            3: {30: 1.0, 40: 1.0},
+        }
+        scores = similarities(vectors, limit=2, max_items=10)
+        self.assertEqual([book for _, book in scores[10]], [20, 30])
+        self.assertAlmostEqual(scores[10][0][0], 1.0)
+        self.assertAlmostEqual(scores[10][1][0], 2 / math.sqrt(5 * 2))
+        self.assertEqual(similarities(vectors, limit=1, max_items=10)[30], [(max(s for s, _ in scores[30]), 40)])
+        # أقصى عدد كتب لكل مستخدم يُبقي أقوى التفاعلات فقط
+        self.assertNotIn(30, similarities({1: {10: 3.0, 20: 2.0, 30: 1.0}}, max_items=2))
+
+    def test_strongest_interaction_wins(self):
+        a, b = self.books[0], self.books[1]
+        ReadingHistory.objects.create(user=self.users[0], book=a)
+        Bookmark.objects.create(user=self.users[0], book=a)
+        Review.objects.create(user=self.users[0], book=b, rating=5)
+        ReadingHistory.objects.create(user=self.users[0], book=b)
+        self.assertEqual(user_vectors()[self.users[0].pk], {a.pk: BOOKMARK_WEIGHT, b.pk: 3.0})
+
+    def test_build_and_similar_books(self):
+        a, b, c = self.books[0], self.books[4], self.books[5]
+        for user in self.users:
+            ReadingHistory.objects.create(user=user, book=a)
+            ReadingHistory.objects.create(user=user, book=b)
+        ReadingHistory.objects.create(user=self.users[0], book=c)
+
+        out = StringIO()
+        call_command('build_recommendations', '--top', '1', stdout=out)
+        self.assertIn('3 كتاب', out.getvalue())
+        self.assertEqual(list(BookRecommendation.objects.filter(book=a).values_list('recommended', flat=True)), [b.pk])
+
+        # المقترحات أولاً ثم الأعلى تقييماً من نفس التصنيف
+        self.assertEqual(
+            [book.pk for book in similar_books(a, limit=3)],
+            [b.pk, self.books[3].pk, self.books[2].pk],
+        )
+        response = self.client.get(reverse('book_detail', args=[a.slug]))
+        self.assertEqual(response.context['similar_books'][0], b)
+
+        # إعادة البناء تستبدل المقترحات السابقة كلها
+        ReadingHistory.objects.all().delete()
+        self.assertEqual(build(), 0)
+        self.assertFalse(BookRecommendation.objects.exists())
+
+
+class CatalogImportTests(TestCase):
+    """استيراد الكتالوج على دفعات مع الاستئناف والتحديث"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, records):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write((record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)) + '\n')
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def record(self, title, **extra):
+        return {'title': title, 'author': 'نجيب محفوظ', 'category': 'روايات', 'published_year': 1956, **extra}
+
+    def test_slug_allocation(self):
+        slugs = SlugAllocator({'الثلاثية', 'الثلاثية-2'}, 12, 'book')
+        self.assertEqual(slugs.allocate('الثلاثية'), 'الثلاثية-3')
+        self.assertEqual(slugs.allocate('الثلاثية'), 'الثلاثية-4')
+        self.assertEqual(slugs.allocate('!!!'), 'book')
+        self.assertEqual(slugs.allocate('!!!'), 'book-2')
+        # اللاحقة تبقى ضمن الطول الأقصى
+        self.assertEqual(slugs.allocate('a' * 20), 'a' * 12)
+        self.assertEqual(slugs.allocate('a' * 20), 'a' * 10 + '-2')
+
+    def test_parse_record(self):
+        record = parse_record({'title': '  قصر   الشوق ', 'category': 'روايات', 'price': '12.5', 'is_free': 'لا'})
+        self.assertEqual(record['title'], 'قصر الشوق')
+        self.assertEqual((record['price'], record['is_free']), (Decimal('12.50'), False))
+        # الحقول الغائبة لا تظهر فلا يكتب التحديث فوقها
+        self.assertNotIn('description', record)
+        self.assertNotIn('author', record)
+        for row in ({'category': 'x'}, {'title': 'x'}, {'title': 'x', 'category': 'y', 'price': '-1'},
+                    {'title': 'x', 'category': 'y', 'pages': 'many'}, {'title': 'x', 'category': 'y', 'is_free': 'ربما'}):
+            with self.subTest(row=row):
+                with self.assertRaises(RecordError):
+                    parse_record(row)
+
+    def test_import(self):
+        path = self.write('catalog.jsonl', [
+            self.record('الثلاثية', description='رواية'),
+            self.record('الثلاثية'),
+            self.record('اللص والكلاب', author='', category='قصص', slug='thief'),
+            '{broken',
+            self.record('بلا سنة', published_year=''),
+        ])
+        out, err = self.run_import(path, '--batch-size', '2')
+        self.assertIn('أُنشئ 3، حُدّث 0، تُخطي 0، غير صالح 2', out)
+        self.assertIn('السجل 4', err)
+        self.assertIn('السجل 5', err)
+        self.assertEqual(
+            sorted(Book.objects.values_list('slug', 'author__name', 'category__name')),
+            [('thief', None, 'قصص'), ('الثلاثية', 'نجيب محفوظ', 'روايات'), ('الثلاثية-2', 'نجيب محفوظ', 'روايات')],
+        )
+        self.assertEqual(AuthorStats.objects.get(author__name='نجيب محفوظ').books_count, 2)
+        # bulk_create لا يرسل post_save: الفهرس يُحدَّث مع كل دفعة
+        self.assertEqual(
+            sorted(book.slug for book in search_books(Book.objects.all(), 'الثلاثيه')), ['الثلاثية', 'الثلاثية-2']
+        )
+        self.assertFalse(os.path.exists(path + '.progress'))
+
+    def test_update(self):
+        self.run_import(self.write('first.jsonl', [self.record('الثلاثية', slug='trilogy', description='رواية', pages=300)]))
+        path = self.write('second.jsonl', [self.record('الثلاثية (طبعة جديدة)', slug='trilogy', pages=320)])
+        out, _ = self.run_import(path)
+        self.assertIn('تُخطي 1', out)
+        out, _ = self.run_import(path, '--update')
+        self.assertIn('حُدّث 1', out)
+        book = Book.objects.get(slug='trilogy')
+        self.assertEqual((book.title, book.pages, book.description), ('الثلاثية (طبعة جديدة)', 320, 'رواية'))
+
+        # سجل بلا عمود المؤلف لا يفصل الكتاب عن مؤلفه، والعمود الفارغ يفصله
+        record = self.record('الثلاثية', slug='trilogy')
+        del record['author']
+        self.run_import(self.write('no-author.jsonl', [record]), '--update')
+        book.refresh_from_db()
+        self.assertEqual((book.title, book.author.name), ('الثلاثية', 'نجيب محفوظ'))
+        self.run_import(self.write('empty-author.jsonl', [self.record('الثلاثية', slug='trilogy', author='')]), '--update')
+        book.refresh_from_db()
+        self.assertIsNone(book.author)
+
+    def test_resume(self):
+        path = self.write('catalog.jsonl', [
+            self.record('كتاب 1'), self.record('كتاب 2'), '{broken', '{broken', self.record('كتاب 5'),
+        ])
+        with self.assertRaises(CommandError):
+            self.run_import(path, '--batch-size', '2', '--max-errors', '1')
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertTrue(os.path.exists(path + '.progress'))
+
+        with self.assertRaisesMessage(CommandError, '--resume'):
+            self.run_import(path)
+        out, _ = self.run_import(path, '--resume', '--batch-size', '2')
+        self.assertIn('متابعة الاستيراد بعد السجل 2', out)
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), ['كتاب 1', 'كتاب 2', 'كتاب 5'])
+        self.assertFalse(os.path.exists(path + '.progress'))
+
+
+class ExportTests(TestCase):
+    """تصدير بيانات لوحة التحكم بالبث"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.reader = User.objects.create_user('reader', password='x')
+        novels = Category.objects.create(name='روايات', slug='novels')
+        poetry = Category.objects.create(name='شعر', slug='poetry')
+        author = Author.objects.create(name='نجيب محفوظ')
+        cls.books = [
+            Book.objects.create(
+                title='=HYPERLINK("x")', slug='formula', author=author, description='وصف', category=novels,
+                published_year=1956, pages=10, is_free=True,
+            ),
+            Book.objects.create(
+                title='الثلاثية', slug='trilogy', author_name='مؤلف آخر', description='وصف', category=poetry,
+                published_year=1957, pages=20, is_free=False, price=Decimal('12.50'),
+            ),
+        ]
+        tz = timezone.get_current_timezone()
+        for day, (user, book) in zip((1, 15), ((cls.staff, cls.books[0]), (cls.reader, cls.books[1]))):
+            review = Review.objects.create(book=book, user=user, rating=4, comment='جميل')
+            Review.objects.filter(pk=review.pk).update(created_at=timezone.make_aware(datetime(2024, 3, day, 12), tz))
+        UserActivity.objects.create(user=cls.reader, activity_type='login')
+        UserActivity.objects.create(user=cls.reader, activity_type='view_book', details='الثلاثية')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, dataset, **params):
+        return self.client.get(reverse('dashboard_export', args=[dataset]), params)
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def rows(self, response):
+        return [json.loads(line) for line in self.content(response).splitlines()]
+
+    def test_staff_only(self):
+        self.client.force_login(self.reader)
+        self.assertRedirects(self.export('books'), reverse('dashboard'), fetch_redirect_response=False)
+        self.client.logout()
+        self.assertEqual(self.export('books').status_code, 302)
+
+    def test_unknown_dataset_or_format(self):
+        self.assertEqual(self.export('payments').status_code, 404)
+        self.assertEqual(self.export('books', format='xlsx').status_code, 404)
+
+    def test_csv(self):
+        response = self.export('books')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="books-{timezone.localdate():%Y%m%d}.csv"',
+        )
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        lines = self.content(response).splitlines()
+        self.assertTrue(lines[0].startswith('﻿id,title,slug,author,category'))
+        self.assertEqual(len(lines), 3)
+        # الأحدث أولاً كصفحة إدارة الكتب؛ المعادلة تُصدَّر نصاً، والقيم المنطقية أرقاماً،
+        # واسم المؤلف الحر حين لا يوجد مؤلف مرتبط
+        self.assertIn(',trilogy,مؤلف آخر,شعر,1957,20,العربية,12.50,0,0,', lines[1])
+        self.assertIn(f'{self.books[0].pk},"\'=HYPERLINK(""x"")",formula,نجيب محفوظ,روايات', lines[2])
+
+    def test_csv_value(self):
+        self.assertEqual(csv_value(None), '')
+        self.assertEqual(csv_value(True), 1)
+        self.assertEqual(csv_value('-1'), "'-1")
+        self.assertEqual(csv_value('@user'), "'@user")
+        self.assertEqual(csv_value(Decimal('1.50')), '1.50')
+        self.assertEqual(csv_value('عادي'), 'عادي')
+
+    def test_jsonl_and_filters(self):
+        response = self.export('books', format='jsonl', status='paid')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual([(row['slug'], row['price'], row['is_free']) for row in self.rows(response)],
+                         [('trilogy', '12.50', False)])
+        rows = self.rows(self.export('books', format='jsonl', category=self.books[0].category_id))
+        self.assertEqual([row['title'] for row in rows], ['=HYPERLINK("x")'])
+
+        rows = self.rows(self.export('reviews', format='jsonl', start='2024-03-10', end='2024-03-15'))
+        self.assertEqual([(row['user'], row['book_id']) for row in rows], [('reader', self.books[1].pk)])
+        rows = self.rows(self.export('reviews', format='jsonl', book=self.books[0].pk))
+        self.assertEqual([row['user'] for row in rows], ['staff'])
+        rows = self.rows(self.export('users', format='jsonl', role='staff'))
+        self.assertEqual([row['username'] for row in rows], ['staff'])
+        rows = self.rows(self.export('activity', format='jsonl', user='reader', type='view_book'))
+        self.assertEqual([row['details'] for row in rows], ['الثلاثية'])
+
+    def test_invalid_filters(self):
+        for dataset, params in (('books', {'category': 'x'}), ('reviews', {'book': 'x'}),
+                                ('reviews', {'start': '2024-02-30'}), ('reviews', {'rating': '6'}),
+                                ('activity', {'book': '1'})):
+            with self.subTest(dataset=dataset, params=params):
+                response = self.export(dataset, **params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_streams_in_chunks(self):
+        for _ in range(3):
+            UserActivity.objects.create(user=self.staff, activity_type='login')
+        chunks = list(self.export('activity', format='jsonl').streaming_content)
+        # صف لكل نشاط: نشاطا القارئ والثلاثة المضافة وتسجيل دخول المشرف في setUp
+        self.assertEqual(len(chunks), 6)
+        self.assertTrue(all(chunk.count(b'\n') == 1 for chunk in chunks))
+
+
+def explain(sql):
+    """أسطر خطة الاستعلام كما تعرضها قاعدة البيانات"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(
+    # الكتابة المؤجلة فورية حتى تُفحص استعلاماتها مع الطلب نفسه
+    BOOK_COUNTERS_FLUSH_INTERVAL=0,
+    READING_HISTORY_FLUSH_INTERVAL=0,
+    USER_ACTIVITY_FLUSH_INTERVAL=0,
+    IMAGE_DERIVATIVE_WORKERS=0,
+    PDF_INGESTION_WORKERS=0,
+)
+class QueryPlanTests(TestCase):
+    # جداول صغيرة تُقرأ كاملة عمداً في كل الصفحات
+    ALLOWED_SCANS = {
+        # التصنيفات مع عدد كتبها في القائمة الجانبية (من نسخة مخزنة)
+        'books_category',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        categories = [Category.objects.create(name=f'تصنيف {i}', slug=f'category-{i}') for i in range(4)]
+        authors = [Author.objects.create(name=f'مؤلف {i}', is_featured=i < 2) for i in range(6)]
+        cls.books = Book.objects.bulk_create([
+            Book(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', author=authors[i % 6],
+                category=categories[i % 4], published_year=2000 + i % 20, pages=100,
+                language='العربية' if i % 3 else 'English', is_free=i % 2 == 0, is_featured=i % 7 == 0,
+                avg_rating=(i % 5) + 1, review_count=i % 4,
+            )
+            for i in range(60)
+        ])
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'x', is_staff=True)
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'x')
+        users = [cls.reader] + [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'x') for i in range(5)]
+        for i, user in enumerate(users):
+            for book in cls.books[i:i + 8]:
+                ReadingHistory.objects.create(user=user, book=book, progress=i * 10)
+            Bookmark.objects.create(user=user, book=cls.books[i])
+            Review.objects.create(user=user, book=cls.books[0], rating=i % 5 + 1, comment='تعليق')
+            UserActivity.objects.create(user=user, activity_type='login')
+        BookRecommendation.objects.bulk_create([
+            BookRecommendation(book=cls.books[0], recommended=book, rank=rank, score=1)
+            for rank, book in enumerate(cls.books[1:4])
+        ])
+        ReadingHistory.objects.filter(user=cls.reader).update(last_read=now - timedelta(days=1))
+
+    def setUp(self):
+        cache.clear()
+        categories_snapshot.invalidate()
+        statistics_snapshot.invalidate()
+
+    def full_scans(self, queries, allowed=()):
+        pattern = FULL_SCAN.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'لا يوجد فحص لخطط {connection.vendor}')
+        # أسماء الجداول فقط (لا الاستعلامات الفرعية المؤقتة مثل subquery)
+        tables = set(connection.introspection.table_names()) - self.ALLOWED_SCANS - set(allowed)
+        partial = {
+            index.name for model in apps.get_models() for index in model._meta.indexes
+            if index.condition is not None
+        }
+        found = []
+        for query in queries:
+            sql = query['sql']
+            if not EXPLAINED.match(sql):
+                continue
+            plan = [line.strip() for line in explain(sql)]
+            for line in plan:
+                match = pattern.search(line)
+                if not match or match.group(1) not in tables:
+                    continue
+                index = match.groupdict().get('index')
+                # الفهرس الجزئي يحوي الصفوف المطلوبة فقط، فقراءته كاملة ليست مسحاً للجدول
+                if index and (SORTED not in plan or index in partial):
+                    continue
+                found.append(f'{line}\n    {sql}')
+        return found
+
+    def assertNoFullScans(self, url, user=None, allowed=(), method='get', data=None):
+        if user is not None:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data or {})
+        self.assertLess(response.status_code, 400, url)
+        scans = self.full_scans(queries.captured_queries, allowed)
+        self.assertFalse(scans, f'{url}: استعلامات تقرأ جدولاً كاملاً:\n' + '\n'.join(scans))
+
+    def test_home(self):
+        self.assertNoFullScans(reverse('home'))
+
+    def test_book_list(self):
+        url = reverse('book_list')
+        self.assertNoFullScans(url)
+        self.assertNoFullScans(url, data={'price': 'free'})
+        self.assertNoFullScans(url, data={'price': 'paid', 'language': 'English'})
+        self.assertNoFullScans(url, data={'category': 'category-1'})
+        self.assertNoFullScans(url, data={'q': 'كتاب'})
+
+    def test_book_detail(self):
+        url = reverse('book_detail', args=['book-0'])
+        self.assertNoFullScans(url)
+        self.assertNoFullScans(url, user=self.reader)
+
+    def test_category(self):
+        self.assertNoFullScans(reverse('books_by_category', args=['category-1']))
+
+    def test_categories_list(self):
+        self.assertNoFullScans(reverse('categories_list'))
+
+    def test_authors(self):
+        # الربط الخارجي بالإحصائيات (ليظهر المؤلفون بلا صف إحصائيات) يقرأ المؤلفين ويفرزهم
+        self.assertNoFullScans(reverse('all_authors'), allowed={'books_author'})
+        self.assertNoFullScans(reverse('author_detail', args=[self.books[0].author_id]))
+        self.assertNoFullScans(reverse('author_books', args=[self.books[0].author_id]))
+
+    def test_dashboard(self):
+        self.assertNoFullScans(reverse('dashboard'), user=self.reader)
+        self.assertNoFullScans(reverse('dashboard'), user=self.staff)
+        self.assertNoFullScans(reverse('get_statistics'), user=self.staff)
+
+    def test_profile(self):
+        self.assertNoFullScans(reverse('profile'), user=self.reader)
+
+    def test_dashboard_books(self):
+        url = reverse('dashboard_books')
+        self.assertNoFullScans(url, user=self.staff)
+        self.assertNoFullScans(url, user=self.staff, data={'status': 'featured', 'sort': '-views'})
+        self.assertNoFullScans(url, user=self.staff, data={'status': 'free', 'category': self.books[1].category_id})
+
+    def test_dashboard_users(self):
+        url = reverse('dashboard_users')
+        self.assertNoFullScans(url, user=self.staff)
+        self.assertNoFullScans(url, user=self.staff, data={'role': 'staff'})
+
+    def test_register_email_check(self):
+        self.assertNoFullScans(reverse('register'), method='post', data={
+            'username': 'new', 'email': 'reader@example.com', 'password1': 'x', 'password2': 'x',
+        })
+
+    def test_reading_beacon(self):
+        self.assertNoFullScans(
+            reverse('reading_beacon'), user=self.reader, method='post',
+            data={'events': f'[{{"book": {self.books[0].pk}, "seconds": 30, "progress": 50}}]'},
+        )
+
+
+class MigrationTests(TransactionTestCase):
+    """الترحيلات (ومنها RunSQL و RunPython) تعمل ذهاباً وإياباً على قاعدة البيانات الحالية"""
+
+    def test_migrate_zero_and_back(self):
+        call_command('migrate', 'books', 'zero', verbosity=0)
+        self.assertFalse(get_backend().is_available())
+        call_command('migrate', verbosity=0)
+        self.assertTrue(get_backend().is_available())
+
+    def test_reading_history_duplicates_are_merged(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('books', '0014_query_profiles')])
+        old_apps = executor.loader.project_state([('books', '0014_query_profiles')]).apps
+        user = old_apps.get_model('auth', 'User').objects.create(username='reader')
+        category = old_apps.get_model('books', 'Category').objects.create(name='روايات', slug='novels')
+        book = old_apps.get_model('books', 'Book').objects.create(
+            title='كتاب', slug='book', description='وصف', category=category, published_year=2000, pages=10,
+        )
+        History = old_apps.get_model('books', 'ReadingHistory')
+        for progress, minutes in [(10, 5), (40, 3), (20, 1)]:
+            History.objects.create(user=user, book=book, progress=progress, reading_duration_minutes=minutes)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        self.assertEqual(
+            list(ReadingHistory.objects.values_list('progress', 'reading_duration_minutes')), [(40, 9)]
+        )
+
+    def test_no_missing_migrations(self):
+        call_command('makemigrations', '--check', '--dry-run', verbosity=0)
+
+
+class ArabicNormalizationTests(SimpleTestCase):
+    """تطبيع النص العربي قبل الفهرسة والبحث"""
+
+    def test_normalize(self):
+        # التشكيل والتطويل وأشكال الألف والياء والتاء المربوطة
+        self.assertEqual(normalize_arabic('مُقَدِّمَة  ابنِ خلـــدون'), 'مقدمه ابن خلدون')
+        self.assertEqual(normalize_arabic('أحمد إبراهيم آمال ٱلله'), 'احمد ابراهيم امال الله')
+        self.assertEqual(normalize_arabic('إلى مستشفى'), 'الي مستشفي')
+        self.assertEqual(normalize_arabic('Django GUIDE'), 'django guide')
+        self.assertEqual(normalize_arabic(None), '')
+
+    def test_article(self):
+        self.assertEqual(tokenize('الكتاب والقلم بالعربية للطلاب'), ['كتاب', 'قلم', 'عربيه', 'طلاب'])
+        # لا تُحذف الأداة من كلمة قصيرة
+        self.assertEqual(tokenize('الم الله'), ['الم', 'له'])
+        self.assertEqual(search_text('الثُّلاثيّة'), search_text('ثلاثيه'))
+
+
+class SearchTests(TestCase):
+    """البحث بمحرك قاعدة البيانات الحالية (FTS5 أو tsvector)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='نجيب محفوظ')
+        category = Category.objects.create(name='روايات', slug='novels')
+        books = [('الثلاثية', 'trilogy', 'رواية'), ('اللص والكلاب', 'thief', 'الثلاثية'), ('كتاب آخر', 'other', 'وصف')]
+        # الفهرسة بعد اكتمال المعاملة (transaction.on_commit)
+        with cls.captureOnCommitCallbacks(execute=True):
+            for title, slug, description in books:
+                Book.objects.create(
+                    title=title, slug=slug, description=description, author=author,
+                    category=category, published_year=2000, pages=1,
+                )
+
+    def test_ranked_by_relevance(self):
+        books = search_books(Book.objects.all(), 'ثلاثيه')
+        # العنوان أعلى وزناً من الوصف
+        self.assertEqual([book.slug for book in books], ['trilogy', 'thief'])
+        self.assertEqual(cached_count(books), 2)
+
+    def test_filters_and_no_match(self):
+        books = search_books(Book.objects.filter(slug='thief'), 'الثلاثية')
+        self.assertEqual([book.slug for book in books], ['thief'])
+        self.assertFalse(search_books(Book.objects.all(), 'غير موجود'))
+
+    def test_prefix_and_author(self):
+        self.assertEqual([book.slug for book in search_books(Book.objects.all(), 'اللص')], ['thief'])
+        self.assertEqual([book.slug for book in search_books(Book.objects.all(), 'ثلا')], ['trilogy', 'thief'])
+        self.assertEqual(len(search_books(Book.objects.all(), 'محفوظ')), 3)
+
+    def test_index_follows_changes(self):
+        book = Book.objects.get(slug='other')
+        book.title = 'السكرية'
+        with self.captureOnCommitCallbacks(execute=True):
+            book.save()
+        self.assertEqual([book.slug for book in search_books(Book.objects.all(), 'سكريه')], ['other'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertFalse(search_books(Book.objects.all(), 'سكريه'))
+
+        # الكتب المضافة بـ bulk_create لا تُفهرس حتى يُعاد بناء الفهرس
+        Book.objects.bulk_create([Book(
+            title='قصر الشوق', slug='palace', description='', category=Category.objects.get(),
+            published_year=2000, pages=1,
+        )])
+        self.assertFalse(search_books(Book.objects.all(), 'الشوق'))
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual([book.slug for book in search_books(Book.objects.all(), 'الشوق')], ['palace'])
+
+    def test_index_on_queryset_database(self):
+        # الفهرس يُقرأ من اتصال قاعدة بيانات الكتب نفسها (النسخة المتماثلة في صفحات القراءة)
+        queryset = Book.objects.all()
+        with mock.patch('books.search.connections') as conns:
+            conns.__getitem__.return_value = connection
+            self.assertEqual(len(search_books(queryset, 'محفوظ')), 3)
+        conns.__getitem__.assert_called_with(queryset.db)
+
+    def test_book_list(self):
+        response = self.client.get(reverse('book_list'), {'q': 'الثلاثيه'})
+        self.assertEqual([book.slug for book in response.context['books']], ['trilogy', 'thief'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTests(SimpleTestCase):
+    """توجيه القراءات دون اتصال فعلي بالنسخ المتماثلة"""
+
+    router = ReplicaRouter()
+
+    def request(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return ReplicaPinMiddleware(read_replica(view))(request)
+
+    def test_reads_outside_marked_views_use_default(self):
+        self.assertIsNone(self.router.db_for_read(Book))
+        with replica_reads(), primary_reads():
+            self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_marked_view_reads_from_replica(self):
+        def view(request):
+            self.assertIn(self.router.db_for_read(Book), ['replica1', 'replica2'])
+            # الجلسات والمستخدمون من الرئيسية دائماً
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            return HttpResponse()
+
+        self.assertNotIn(PIN_COOKIE, self.request(view).cookies)
+
+    def test_read_your_writes(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_write(Review), 'default')
+            self.assertEqual(self.router.db_for_read(Review), 'default')
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+        def pinned(request):
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+            return HttpResponse()
+
+        self.request(pinned, cookies={PIN_COOKIE: '1'})
+
+    def test_database_cache_uses_default(self):
+        cache_model = DatabaseCache('books_cache', {}).cache_model_class
+
+        def view(request):
+            # الإصدار المرفوع للتو يُقرأ من الرئيسية، وتخزين نسخة لا يُعد كتابة للمستخدم
+            self.assertEqual(self.router.db_for_read(cache_model), 'default')
+            self.assertEqual(self.router.db_for_write(cache_model), 'default')
+            return HttpResponse()
+
+        self.assertNotIn(PIN_COOKIE, self.request(view).cookies)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'books'))
+        self.assertIsNone(self.router.allow_migrate('default', 'books'))
+
+
+class SQLiteProductionTests(SimpleTestCase):
+    """خيارات وضع SQLite للإنتاج تُطبق على كل اتصال جديد"""
+
+    def test_pragmas_on_new_connection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = database_config(
+                f'sqlite:///{directory}/db.sqlite3', sqlite_options=sqlite_production_options(busy_timeout=7),
+            )
+            settings_dict.update(ATOMIC_REQUESTS=False, AUTOCOMMIT=True, TIME_ZONE=None, TEST={})
+            wrapper = SQLiteDatabaseWrapper(settings_dict, alias='production')
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {}
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                        cursor.execute(f'PRAGMA {name}')
+                        pragmas[name] = cursor.fetchone()[0]
+                self.assertEqual(pragmas, {
+                    'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 7000, 'mmap_size': 256 * 1024 * 1024,
+                })
+                self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+            finally:
+                wrapper.close()
+
+
+def comparable(value):
+    """قيم السياق بصيغة قابلة للمقارنة: الكائنات بمفاتيحها والاستعلامات والصفحات بقوائم"""
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, dict):
+        return {key: comparable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, QuerySet)) or hasattr(value, 'object_list'):
+        return [comparable(item) for item in value]
+    return value
+
+
+def view_keys(context):
+    """مفاتيح السياق التي تضعها الصفحة نفسها (دون مفاتيح معالجات السياق العامة)"""
+    return set(context) - {'csrf_token', 'request', 'user', 'perms', 'messages', 'DEFAULT_MESSAGE_LEVELS',
+                           'debug', 'sql_queries', 'categories', 'True', 'False', 'None'}
+
+
+@override_settings(
+    BOOK_COUNTERS_FLUSH_INTERVAL=0,
+    READING_HISTORY_FLUSH_INTERVAL=0,
+    USER_ACTIVITY_FLUSH_INTERVAL=0,
+)
+class AsyncViewTests(TestCase):
+    """النسخ غير المتزامنة تعرض نفس القالب بنفس السياق"""
+
+    # قيم تتغير بين طلبين أو لا تقارن (نموذج فارغ، المشاهدات تزيد مع كل عرض)
+    IGNORED = {'review_form', 'book'}
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='روايات', slug='novels')
+        cls.author = Author.objects.create(name='مؤلف', is_featured=True)
+        cls.books = [
+            Book.objects.create(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', author=cls.author, category=category,
+                published_year=2000, pages=10, is_featured=i % 2 == 0, is_free=i % 3 == 0,
+                language='English' if i % 2 else 'العربية', avg_rating=4, review_count=1,
+            )
+            for i in range(15)
+        ]
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'x')
+        Review.objects.create(user=cls.reader, book=cls.books[0], rating=5, comment='ممتاز')
+        Bookmark.objects.create(user=cls.reader, book=cls.books[0])
+
+    def setUp(self):
+        cache.clear()
+        categories_snapshot.invalidate()
+
+    def render(self, view, request, *args):
+        contexts = []
+
+        def receiver(sender, template, context, **kwargs):
+            contexts.append((template.name, context.flatten()))
+
+        template_rendered.connect(receiver)
+        try:
+            response = view(request, *args)
+        finally:
+            template_rendered.disconnect(receiver)
+        self.assertEqual(response.status_code, 200)
+        name, context = contexts[0]
+        return name, {key: comparable(value) for key, value in context.items() if key in view_keys(context)}
+
+    def assertSameContext(self, name, *args, data=None, user=None, ignored=()):
+        user = user or AnonymousUser()
+        sync_request = RequestFactory().get('/', data or {})
+        async_request = AsyncRequestFactory().get('/', data or {})
+        for request in (sync_request, async_request):
+            request.user = user
+            request.session = {}
+
+            async def auser():
+                return user
+            request.auser = auser
+        expected = self.render(getattr(views, name), sync_request, *args)
+        actual = self.render(async_to_sync(getattr(async_views, name)), async_request, *args)
+        self.assertEqual(expected[0], actual[0])
+        for key in set(expected[1]) - self.IGNORED - set(ignored):
+            self.assertEqual(expected[1][key], actual[1].get(key), f'{name}: {key}')
+
+    def test_home(self):
+        self.assertSameContext('home')
+
+    def test_book_list(self):
+        self.assertSameContext('book_list')
+        self.assertSameContext('book_list', data={'price': 'free', 'language': 'English'})
+        self.assertSameContext('book_list', data={'page': '2'})
+
+    def test_book_detail(self):
+        # قائمة الكتب الكاملة في سياق النسخة المتزامنة لا يستخدمها القالب
+        self.assertSameContext('book_detail', 'book-0', ignored={'books'})
+        self.assertSameContext('book_detail', 'book-0', user=self.reader, ignored={'books'})
+
+    def test_category(self):
+        self.assertSameContext('books_by_category', 'novels')
+
+    def test_authors(self):
+        self.assertSameContext('all_authors')
+        self.assertSameContext('author_detail', self.author.pk)
+        self.assertSameContext('author_books', self.author.pk)
+
+
+@override_settings(
+    QUERY_BUDGET_ENABLED=True,
+    QUERY_BUDGET_MAX_QUERIES=10,
+    QUERY_BUDGET_MAX_TIME_MS=10_000,
+    QUERY_BUDGET_REPEAT_THRESHOLD=3,
+    QUERY_BUDGET_HEADERS=True,
+)
+class QueryBudgetTests(TestCase):
+    """عدّ استعلامات الطلب وكشف الاستعلام المكرر (N+1) وتجميعها لكل صفحة"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='روايات', slug='novels')
+        cls.books = [
+            Book.objects.create(
+                title=f'كتاب {i}', slug=f'book-{i}', description='وصف', category=category,
+                published_year=2000, pages=10,
+            )
+            for i in range(5)
+        ]
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'x', is_staff=True)
+
+    def setUp(self):
+        query_stats.flush()
+
+    def request(self, get_response, path='/books/'):
+        request = RequestFactory().get(path)
+        request.resolver_match = resolve(path)
+        return QueryBudgetMiddleware(get_response)(request)
+
+    def test_normalize(self):
+        self.assertEqual(
+            normalize('SELECT "a" FROM "t" WHERE "id" IN (%s, %s, %s) AND "x" = \'y\' LIMIT 21'),
+            normalize('SELECT "a"  FROM "t" WHERE "id" IN (%s) AND "x" = \'z\' LIMIT 1'),
+        )
+
+    def test_disabled_and_sampled(self):
+        def view(request):
+            list(Book.objects.all())
+            return HttpResponse()
+
+        with override_settings(QUERY_BUDGET_ENABLED=False):
+            self.assertFalse(self.request(view).has_header('Server-Timing'))
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0.25):
+            with mock.patch('books.querybudget.random.random', return_value=0.5):
+                self.assertFalse(self.request(view).has_header('Server-Timing'))
+            with mock.patch('books.querybudget.random.random', return_value=0.1):
+                self.assertTrue(self.request(view).has_header('Server-Timing'))
+
+    def test_fingerprints_only_past_threshold(self):
+        def view(request):
+            Book.objects.get(pk=self.books[0].pk)
+            Category.objects.count()
+            return HttpResponse()
+
+        with mock.patch('books.querybudget.normalize', wraps=querybudget.normalize) as normalize_:
+            self.request(view)
+        normalize_.assert_not_called()
+
+    def test_n_plus_one(self):
+        def loop(request):
+            for book in Book.objects.all():
+                Category.objects.get(pk=book.category_id)
+            return HttpResponse()
+
+        with self.assertLogs('books.querybudget', 'WARNING') as logs:
+            response = self.request(loop)
+        self.assertIn('book_list', logs.output[0])
+        self.assertIn('6 queries', response['Server-Timing'])
+        query_stats.flush()
+
+        profile = QueryProfile.objects.get(pk='book_list')
+        self.assertEqual((profile.requests, profile.queries, profile.n_plus_one, profile.over_budget), (1, 6, 1, 0))
+        [repeated] = profile.fingerprints.all()
+        self.assertEqual((repeated.max_repeats, repeated.executions), (5, 5))
+        self.assertIn('books_category', repeated.sql)
+
+    def test_within_budget(self):
+        def view(request):
+            list(Book.objects.select_related('category'))
+            return HttpResponse()
+
+        for _ in range(2):
+            self.request(view)
+        query_stats.flush()
+        profile = QueryProfile.objects.get(pk='book_list')
+        self.assertEqual((profile.requests, profile.max_queries, profile.n_plus_one), (2, 1, 0))
+        self.assertFalse(profile.fingerprints.exists())
+
+    def test_over_budget(self):
+        def view(request):
+            for _ in range(11):
+                Book.objects.exists()
+            return HttpResponse()
+
+        with self.assertLogs('books.querybudget', 'WARNING'):
+            self.request(view)
+        query_stats.flush()
+        self.assertEqual(QueryProfile.objects.get(pk='book_list').over_budget, 1)
+
+    def test_async(self):
+        async def view(request):
+            async for book in Book.objects.all():
+                await Category.objects.aget(pk=book.category_id)
+            return HttpResponse()
+
+        request = AsyncRequestFactory().get('/books/')
+        request.resolver_match = resolve('/books/')
+        with self.assertLogs('books.querybudget', 'WARNING'):
+            response = async_to_sync(QueryBudgetMiddleware(view))(request)
+        self.assertIn('6 queries', response['Server-Timing'])
+
+    def test_pages_select_related(self):
+        # مؤلف لكل كتاب ومراجعات وسجل قراءة لعدة كتب: يُقرأ كل منها مع صفه لا باستعلام مستقل
+        for i, book in enumerate(self.books):
+            Book.objects.filter(pk=book.pk).update(author=Author.objects.create(name=f'مؤلف {i}'), is_featured=True)
+            Review.objects.create(
+                book=self.books[0], user=User.objects.create_user(f'reader{i}', password='x'), rating=4, comment='جيد',
+            )
+            ReadingHistory.objects.create(user=self.staff, book=book)
+        self.client.force_login(self.staff)
+        for url in (reverse('home'), reverse('book_detail', args=[self.books[0].slug]), reverse('dashboard')):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        query_stats.flush()
+        self.assertFalse(QueryFingerprint.objects.filter(profile__in=['home', 'book_detail', 'dashboard']).exists())
+
+        for view, args in ((async_views.home, ()), (async_views.book_detail, (self.books[0].slug,))):
+            request = AsyncRequestFactory().get('/')
+            request.user = self.staff
+            request.session = {}
+
+            async def auser():
+                return self.staff
+            request.auser = auser
+            with CaptureQueriesContext(connection) as queries:
+                async_to_sync(view)(request, *args)
+            fingerprints = [normalize(query['sql']) for query in queries]
+            self.assertLess(max(map(fingerprints.count, fingerprints)), 3, view.__name__)
+
+    def test_dashboard(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('book_list'))
+        response = self.client.get(reverse('dashboard_queries'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'book_list')
+        self.client.post(reverse('dashboard_queries'))
+        # لا يبقى إلا طلب التصفير نفسه
+        self.assertEqual(list(QueryProfile.objects.values_list('pk', flat=True)), ['dashboard_queries'])
+
+
+class LoadTestTests(TestCase):
+    """مولد الكتالوج الاصطناعي وتغطية اختبار الحمل لكل المسارات"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_catalog', books=60, authors=8, categories=4, users=12, reviews=80, history=150,
+            stdout=StringIO(),
+        )
+
+    def test_catalog(self):
+        self.assertEqual(Book.objects.count(), 60)
+        self.assertEqual(Category.objects.count(), 4)
+        self.assertGreater(Review.objects.count(), 0)
+        self.assertGreater(ReadingHistory.objects.count(), 0)
+        self.assertEqual(
+            {'العربية', 'English'}, set(Book.objects.values_list('language', flat=True).distinct())
+        )
+        # التواريخ موزعة على السنوات، ثم تعود auto_now_add بعد التوليد
+        self.assertGreater(len(set(Book.objects.values_list('created_at', flat=True))), 1)
+        self.assertTrue(Book._meta.get_field('created_at').auto_now_add)
+        # الإحصائيات المخزنة محسوبة بعد bulk_create
+        self.assertEqual(sum(Book.objects.values_list('review_count', flat=True)), Review.objects.count())
+        self.assertEqual(
+            sum(Author.objects.values_list('stats__books_count', flat=True)),
+            Book.objects.filter(author__isnull=False).count(),
+        )
+        # فهرس البحث مبني للكتب المولدة
+        book = Book.objects.first()
+        self.assertIn(book, search_books(Book.objects.all(), book.title.split()[0]))
+        self.assertTrue(self.client.login(username='loadtest-0', password='loadtest'))
+
+    def test_every_route(self):
+        pages = dict(load_test.targets(load_test.samples()))
+        names = {pattern.name for pattern in urls.urlpatterns}
+        # كل مسار إما يُقاس أو مستثنى صراحة (download_book يحتاج كتباً لها ملفات)
+        self.assertEqual(names - set(pages) - load_test.SKIPPED, {'download_book'})
+        for label, paths in pages.items():
+            self.assertTrue(paths, label)
+            response = self.client.get(paths[0])
+            self.assertLess(response.status_code, 400, label)
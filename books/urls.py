@@ -1,14 +1,20 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import async_views, views
+
+# صفحات القراءة العامة بنسختها غير المتزامنة عند التشغيل عبر ASGI (ASYNC_VIEWS)
+public = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     # الصفحات العامة
-    path('', views.home, name='home'),
-    path('books/', views.book_list, name='book_list'),
-    path('books/<slug:slug>/', views.book_detail, name='book_detail'),
+    path('', public.home, name='home'),
+    path('books/', public.book_list, name='book_list'),
+    path('books/<slug:slug>/', public.book_detail, name='book_detail'),
+    path('books/<slug:slug>/download/', views.download_book, name='download_book'),
+    path('books/<slug:slug>/pdf/', views.book_pdf, name='book_pdf'),
     path('categories/', views.categories_list, name='categories_list'),
-    path('category/<slug:slug>/', views.books_by_category, name='books_by_category'),
+    path('category/<slug:slug>/', public.books_by_category, name='books_by_category'),
     
     # المصادقة
     path('login/', views.user_login, name='login'),
@@ -21,22 +27,27 @@ urlpatterns = [
     path('dashboard/books/', views.dashboard_books, name='dashboard_books'),
     path('dashboard/users/', views.dashboard_users, name='dashboard_users'),
     path('dashboard/settings/', views.dashboard_settings, name='dashboard_settings'),
+    path('dashboard/export/<slug:dataset>/', views.dashboard_export, name='dashboard_export'),
+    path('dashboard/queries/', views.dashboard_queries, name='dashboard_queries'),
     
     # مسارات AJAX
     path('dashboard/books/<int:book_id>/delete/', views.delete_book, name='delete_book'),
     path('dashboard/users/<int:user_id>/toggle-status/', views.toggle_user_status, name='toggle_user_status'),
     path('dashboard/users/<int:user_id>/toggle-staff/', views.toggle_staff_status, name='toggle_staff_status'),
     path('dashboard/statistics/', views.get_statistics, name='get_statistics'),
+    path('dashboard/statistics/series/', views.statistics_series, name='statistics_series'),
+    path('dashboard/statistics/stream/', views.statistics_stream, name='statistics_stream'),
     path('delete/<int:book_id>/', views.delete_book, name='delete_book'),
 
 
-    path('authors/', views.all_authors, name='all_authors'),
-    path('author/<int:author_id>/books/', views.author_books, name='author_books'),
-    path('author/<int:author_id>/', views.author_detail, name='author_detail'),
+    path('authors/', public.all_authors, name='all_authors'),
+    path('author/<int:author_id>/books/', public.author_books, name='author_books'),
+    path('author/<int:author_id>/', public.author_detail, name='author_detail'),
 
 
     # API
-    # path('api/search/', views.search_books, name='search_books'),
+    path('api/search/', views.search_books, name='search_books'),
     path('books/<int:book_id>/review/', views.add_review, name='add_review'),
     path('books/<int:book_id>/bookmark/', views.toggle_bookmark, name='toggle_bookmark'),
+    path('api/reading/beacon/', views.reading_beacon, name='reading_beacon'),
 ]
\ No newline at end of file
@@ -1,112 +1,104 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import F, Q, Count, Avg, Sum
 from django.core.paginator import Paginator
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.http import require_POST
 from django.contrib.auth import logout
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import AuthenticationForm
 from .forms import CustomUserCreationForm, ReviewForm, BookForm
-from .models import Book, Category, Review, Bookmark, ReadingHistory, Author
+from .search import search_books as search_catalog
+from .autocomplete import autocomplete_index
+from .context_processors import categories_snapshot
+from .visits import parse_reading_events, reading_visits
+from .activity import log_activity
+from .pagination import paginate
+from .routing import read_replica
+from .recommendations import similar_books as recommended_books
+from .downloads import pdf_response, signed_url, verify as verify_download
+from .stats import time_series, parse_range as parse_stats_range, statistics_snapshot
+from .exports import DATASETS as EXPORT_DATASETS, FORMATS as EXPORT_FORMATS, export_response, filter_books, filter_users
+from .querybudget import query_stats
+from .models import Book, Category, Review, Bookmark, ReadingHistory, Author, AuthorStats, QueryProfile, QueryFingerprint
 from django.contrib.auth.models import User
 from datetime import datetime, timedelta
 import json
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 import os
-import csv
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import login_required
 
 
+def author_with_stats(author):
+    """بطاقة المؤلف مع إحصائياته من جدول AuthorStats"""
+    stats = author.get_stats() or AuthorStats(author=author)
+    return {
+        'author': author,
+        'books_count': stats.books_count,
+        'readers_count': stats.readers_count,
+        'avg_rating': round(stats.avg_rating, 1),
+        'avatar_url': author.avatar.url if author.avatar else f'https://api.dicebear.com/7.x/avataaars/svg?seed={author.id}',
+    }
+
+
+@read_replica
 def home(request):
     count_book = Book.objects.count()
-    categories = Category.objects.annotate(
-        books_count=Count('books')
-    )
+    # التصنيفات مع عدد الكتب من النسخة المخزنة (يعرضها القالب عبر categories_context)
+    categories = categories_snapshot.get()
     
-    # الحصول على المؤلفين المميزين
-    featured_authors = Author.objects.filter(is_featured=True)[:4]
-    if not featured_authors.exists():
-        featured_authors = Author.objects.annotate(
-            books_count=models.Count('books')
-        ).order_by('-books_count')[:4]
+    # الحصول على المؤلفين المميزين مع إحصائياتهم المخزنة
+    authors = Author.objects.select_related('stats')
+    featured_authors = list(authors.filter(is_featured=True)[:4])
+    if not featured_authors:
+        featured_authors = authors.order_by('-stats__books_count')[:4]
 
     # إضافة إحصائيات للمؤلفين
-    authors_with_stats = []
-    for author in featured_authors:
-        authors_with_stats.append({
-            'author': author,
-            'books_count': author.get_books_count(),
-            'readers_count': ReadingHistory.objects.filter(
-                book__author=author
-            ).values('user').distinct().count(),
-            'avg_rating': round(
-                Book.objects.filter(author=author)
-                .aggregate(avg=Avg('reviews__rating'))['avg'] or 0,
-                1
-            ),
-            'avatar_url': author.avatar.url if author.avatar else f'https://api.dicebear.com/7.x/avataaars/svg?seed={author.id}',
-        })
-
-
+    authors_with_stats = [author_with_stats(author) for author in featured_authors]
 
     # الكتب المميزة
-    featured_books = Book.objects.filter(is_featured=True)[:8]
+    books = Book.objects.select_related('author')
+    featured_books = books.filter(is_featured=True)[:8]
     # أحدث الكتب
-    latest_books = Book.objects.all().order_by('-created_at')[:8]
+    latest_books = books.order_by('-created_at')[:8]
     
     # أكثر الكتب تقييماً
-    top_rated_books = Book.objects.annotate(
-        avg_rating=Avg('reviews__rating')
-    ).filter(avg_rating__gte=4).order_by('-avg_rating')[:8]
+    top_rated_books = books.filter(
+        review_count__gt=0, avg_rating__gte=4
+    ).order_by('-avg_rating', '-review_count')[:8]
     
     context = {
         'featured_books': featured_books,
         'latest_books': latest_books,
         'top_rated_books': top_rated_books,
-        'categories': categories,
         'count_book': count_book,
-        'count_book_cat': categories.count(),
+        'count_book_cat': len(categories),
         'featured_authors': authors_with_stats,  # ← إضافة المؤلفين للسياق
     }
     return render(request, 'home.html', context)
 
 
+@read_replica
 def popular_authors(request):
     """عرض أشهر المؤلفين"""
-    # الحصول على المؤلفين المميزين أولاً
-    featured_authors = Author.objects.filter(is_featured=True)
-    
-    # إذا لم يكن هناك مؤلفون مميزون، اعرض المؤلفين الأكثر كتباً
-    if not featured_authors.exists():
-        featured_authors = Author.objects.annotate(
-            books_count=models.Count('books')
-        ).order_by('-books_count')[:4]
-    
-    # إذا كان عدد المؤلفين أقل من 4، أضف مؤلفين آخرين
-    if featured_authors.count() < 4:
-        additional_authors = Author.objects.exclude(
-            id__in=featured_authors.values_list('id', flat=True)
-        ).annotate(
-            books_count=models.Count('books')
-        ).order_by('-books_count')[:4 - featured_authors.count()]
-        featured_authors = list(featured_authors) + list(additional_authors)
-    
+    # المؤلفون المميزون أولاً ثم الأكثر كتباً، في استعلام واحد
+    featured_authors = Author.objects.select_related('stats').order_by(
+        '-is_featured', '-stats__books_count'
+    )[:4]
+
     # إضافة إحصائيات لكل مؤلف
-    authors_with_stats = []
-    for author in featured_authors[:4]:  # تأكد من عرض 4 مؤلفين فقط
-        authors_with_stats.append({
-            'author': author,
-            'books_count': author.get_books_count(),
-            'readers_count': author.get_total_readers(),
-            'avg_rating': round(author.average_rating(), 1) if author.average_rating() else 0,
-            'avatar_url': author.avatar.url if author.avatar else f'https://api.dicebear.com/7.x/avataaars/svg?seed={author.id}',
-        })
+    authors_with_stats = [author_with_stats(author) for author in featured_authors]
     
     context = {
         'featured_authors': authors_with_stats,
@@ -114,11 +106,12 @@ def popular_authors(request):
     
     return render(request, 'authors/popular.html', context)
 
+@read_replica
 def all_authors(request):
     """عرض جميع المؤلفين"""
-    authors = Author.objects.annotate(
-        books_count=Count('books')
-    ).order_by('-books_count')
+    # ربط خارجي: المؤلفون المضافون بـ bulk_create (الاستيراد والتوليد) ليس لهم صف
+    # إحصائيات حتى يُشغَّل refresh_author_stats، ويظهرون في آخر القائمة
+    authors = Author.objects.select_related('stats')
     
     # البحث
     search_query = request.GET.get('q', '')
@@ -129,44 +122,40 @@ def all_authors(request):
             Q(bio__icontains=search_query)
         )
     
-    # الترقيم
-    paginator = Paginator(authors, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # الترقيم (أرقام الصفحات للصفحات الأولى ثم المؤشرات)
+    page_obj = paginate(request, authors, 12, (F('stats__books_count').desc(nulls_last=True), '-id'))
     
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
-        'total_authors': authors.count(),
+        'total_authors': page_obj.paginator.count,
     }
     
     return render(request, 'authors/list.html', context)
 
+@read_replica
 def author_books(request, author_id):
-    author = get_object_or_404(Author, id=author_id)
-    books = Book.objects.filter(author=author).order_by('-created_at')
+    author = get_object_or_404(Author.objects.select_related('stats'), id=author_id)
+    books = Book.objects.filter(author=author).select_related('category')
 
-    paginator = Paginator(books, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, books, 12, ('-created_at', '-id'))
 
     context = {
         'author': author,
         'page_obj': page_obj,
-        'books_count': books.count(),
+        'books_count': author.get_books_count(),
     }
     
     return render(request, 'authors/books.html', context)
 
+@read_replica
 def author_detail(request, author_id):
     """تفاصيل المؤلف"""
-    author = get_object_or_404(Author, id=author_id)
+    author = get_object_or_404(Author.objects.select_related('stats'), id=author_id)
     
-    # إحصائيات المؤلف
+    # إحصائيات المؤلف المخزنة
     books = author.books.all()
-    total_pages = books.aggregate(total=Sum('pages'))['total'] or 0
-    total_downloads = books.aggregate(total=Sum('downloads'))['total'] or 0
-    total_views = books.aggregate(total=Sum('views'))['total'] or 0
+    stats = author.get_stats() or AuthorStats(author=author)
     
     # الكتب المميزة للمؤلف
     featured_books = books.filter(is_featured=True)[:4]
@@ -175,22 +164,44 @@ def author_detail(request, author_id):
         'author': author,
         'books': books,
         'featured_books': featured_books,
-        'total_pages': total_pages,
-        'total_downloads': total_downloads,
-        'total_views': total_views,
-        'books_count': books.count(),
+        'total_pages': stats.total_pages,
+        'total_downloads': stats.total_downloads,
+        'total_views': stats.total_views,
+        'books_count': stats.books_count,
     }
     
     return render(request, 'authors/detail.html', context)
 
 
+def catalog_filters(books, params):
+    """البحث والتصفية حسب السعر واللغة في قائمة الكتب"""
+    # البحث
+    query = params.get('q')
+    if query:
+        books = search_catalog(books, query)
+    
+    # التصفية حسب السعر
+    price_filter = params.get('price')
+    if price_filter == 'free':
+        books = books.filter(is_free=True)
+    elif price_filter == 'paid':
+        books = books.filter(is_free=False)
+    
+    # التصفية حسب اللغة
+    language = params.get('language')
+    if language:
+        books = books.filter(language=language)
+    return books
+
+
+@read_replica
 def book_list(request):
-    books = Book.objects.all().order_by('-created_at')
+    books = Book.objects.select_related('category', 'author').order_by('-created_at', '-id')
     
     # إحصائيات
     free_books_count = Book.objects.filter(is_free=True).count()
     featured_books_count = Book.objects.filter(is_featured=True).count()
-    categories_count = Category.objects.count()
+    categories_count = len(categories_snapshot.get())
     
     # التصفية حسب التصنيف
     category_slug = request.GET.get('category')
@@ -199,39 +210,20 @@ def book_list(request):
         current_category = get_object_or_404(Category, slug=category_slug)
         books = books.filter(category=current_category)
     
-    # البحث
+    books = catalog_filters(books, request.GET)
     query = request.GET.get('q')
-    if query:
-        books = books.filter(
-            Q(title__icontains=query) |
-            Q(author__name__icontains=query) |
-            Q(author_name__icontains=query) |
-            Q(description__icontains=query)
-        )
-    
-    # التصفية حسب السعر
     price_filter = request.GET.get('price')
-    if price_filter == 'free':
-        books = books.filter(is_free=True)
-    elif price_filter == 'paid':
-        books = books.filter(is_free=False)
-    
-    # التصفية حسب اللغة
     language = request.GET.get('language')
-    if language:
-        books = books.filter(language=language)
     
-    # الترقيم
-    paginator = Paginator(books, 12)
-    page_number = request.GET.get('page')
-    books_page = paginator.get_page(page_number)
+    # الترقيم: نتائج البحث مرتبة حسب الصلة بأرقام الصفحات، وغيرها بالمؤشرات بعد الصفحات الأولى
+    books_page = paginate(request, books, 12, None if query else ('-created_at', '-id'))
     
     # جلب جميع اللغات المتاحة
-    languages = Book.objects.values_list('language', flat=True).distinct()
+    # بدون order_by يُضاف created_at (الترتيب الافتراضي) إلى DISTINCT فتتكرر اللغات
+    languages = Book.objects.values_list('language', flat=True).order_by('language').distinct()
     
     context = {
         'books': books_page,
-        'categories': Category.objects.all(),
         'languages': languages,
         'current_category': current_category,
         'current_query': query,
@@ -245,44 +237,35 @@ def book_list(request):
     return render(request, 'books/list.html', context)
 
 
+def record_book_view(user, book):
+    """عداد المشاهدات، وزيارة القارئ في سجل القراءة ونشاطه (تُكتب لاحقاً دفعة واحدة دون تصفير التقدم)"""
+    book.increment_views()
+    if user.is_authenticated:
+        reading_visits.visit(user.pk, book.pk)
+        log_activity(user, 'view_book', book.slug)
+
+
+@read_replica
 def book_detail(request, slug):
     book = get_object_or_404(Book, slug=slug)
+    record_book_view(request.user, book)
     books = Book.objects.all()
-    reviews = book.reviews.all().order_by('-created_at')
-    similar_books = Book.objects.filter(
-        category=book.category
-    ).exclude(id=book.id)[:4]
+    reviews = book.reviews.select_related('user').order_by('-created_at')
+    # المقترحات المحسوبة دورياً من تفاعلات القراء، مع إكمالها من نفس التصنيف
+    similar_books = recommended_books(book, limit=4)
 
     is_bookmarked = False
+    reading_progress = None
     if request.user.is_authenticated:
         is_bookmarked = Bookmark.objects.filter(
             user=request.user,
             book=book
         ).exists()
+        reading_progress = ReadingHistory.objects.filter(user=request.user, book=book).first()
 
-        ReadingHistory.objects.update_or_create(
-            user=request.user,
-            book=book,
-            defaults={'progress': 0}
-        )
-
-    # ✅ تجهيز توزيع التقييمات
-    ratings_qs = (
-        book.reviews
-        .values('rating')
-        .annotate(count=Count('id'))
-    )
-
-    ratings_map = {r['rating']: r['count'] for r in ratings_qs}
-
-    ratings_data = []
-    for i in range(5, 0, -1):
-        ratings_data.append({
-            'stars': i,
-            'count': ratings_map.get(i, 0)
-        })
-
-    total_reviews = book.reviews.count()
+    # ✅ توزيع التقييمات من الأعمدة المخزنة في الكتاب
+    ratings_data = book.ratings_histogram()
+    total_reviews = book.review_count
 
 
     context = {
@@ -290,6 +273,7 @@ def book_detail(request, slug):
         'reviews': reviews,
         'similar_books': similar_books,
         'is_bookmarked': is_bookmarked,
+        'reading_progress': reading_progress,
         'review_form': ReviewForm(),
         'ratings_data': ratings_data,
         'total_reviews': total_reviews,
@@ -299,6 +283,67 @@ def book_detail(request, slug):
     return render(request, 'books/detail.html', context)
 
 
+@require_POST
+def reading_beacon(request):
+    """استقبال نبضات القارئ (التقدم ووقت القراءة) دفعة واحدة، بما فيها sendBeacon عند المغادرة
+
+    تُقبل الأحداث في حقل events (JSON) من نموذج أو في جسم الطلب كـ JSON، وتُجمع في
+    الذاكرة وتُكتب دورياً إلى سجل القراءة.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'غير مصرح'}, status=403)
+    try:
+        if 'events' in request.POST:
+            data = json.loads(request.POST['events'])
+        else:
+            data = json.loads(request.body or b'[]')
+            data = data.get('events') if isinstance(data, dict) else data
+        events = parse_reading_events(data)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    started = [
+        book_id for book_id, seconds, progress in events
+        if reading_visits.read(request.user.pk, book_id, seconds, progress)
+    ]
+    # نشاط "قراءة كتاب" مرة واحدة لكل جلسة قراءة (لا مع كل نبضة)
+    if started:
+        for slug in Book.objects.filter(pk__in=started).values_list('slug', flat=True):
+            log_activity(request.user, 'read_book', slug)
+    return HttpResponse(status=204)
+
+
+def download_book(request, slug):
+    """إعادة التوجيه إلى رابط تحميل موقع ومؤقت لملف الكتاب"""
+    book = get_object_or_404(Book.objects.only('pk', 'slug', 'pdf_file', 'is_free'), slug=slug)
+    if not book.pdf_file:
+        raise Http404('لا يوجد ملف لهذا الكتاب')
+    if not (book.is_free or request.user.is_staff):
+        messages.error(request, 'هذا الكتاب غير متاح للتحميل المجاني')
+        return redirect('book_detail', slug=book.slug)
+    return redirect(signed_url(book, inline=request.GET.get('inline') == '1'))
+
+
+def book_pdf(request, slug):
+    """إرسال ملف الكتاب عبر الرابط الموقع (مع دعم Range وETag)"""
+    book = get_object_or_404(Book.objects.only('pk', 'slug', 'pdf_file', 'downloads'), slug=slug)
+    if not book.pdf_file:
+        raise Http404('لا يوجد ملف لهذا الكتاب')
+    if not verify_download(book, request.GET.get('token')):
+        # رابط منتهي أو لملف استُبدل: نعيد التحقق من الصلاحية ونصدر رابطاً جديداً
+        return redirect(reverse('download_book', kwargs={'slug': book.slug}) + (
+            '?inline=1' if request.GET.get('inline') == '1' else ''
+        ))
+    try:
+        response, counted = pdf_response(request, book, inline=request.GET.get('inline') == '1')
+    except FileNotFoundError:
+        raise Http404('ملف الكتاب غير موجود')
+    if counted:
+        book.increment_downloads()
+    return response
+
+
+@read_replica
 def categories_list(request):
     """عرض جميع الفئات مع إحصائياتها"""
     # الحصول على جميع الفئات
@@ -350,6 +395,21 @@ def categories_list(request):
     
     return render(request, 'books/categories_list.html', context)
 
+def search_books(request):
+    """API الإكمال التلقائي لمربع البحث (من فهرس الذاكرة دون استعلام قاعدة البيانات)"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 8)), 20))
+    except ValueError:
+        limit = 8
+
+    results = []
+    if len(query) >= 2:
+        autocomplete_index.ensure_fresh()
+        results = autocomplete_index.search(query, limit)
+
+    return JsonResponse({'query': query, 'results': results})
+
 @login_required
 def add_review(request, book_id):
     book = get_object_or_404(Book, id=book_id)
@@ -357,14 +417,17 @@ def add_review(request, book_id):
     if request.method == 'POST':
         form = ReviewForm(request.POST)
         if form.is_valid():
-            Review.objects.update_or_create(
-                book=book,
-                user=request.user,
-                defaults={
-                    'rating': form.cleaned_data['rating'],
-                    'comment': form.cleaned_data['comment'],
-                }
-            )
+            # إحصائيات الكتاب تُحدَّث عبر الإشارات داخل نفس المعاملة
+            with transaction.atomic():
+                Review.objects.update_or_create(
+                    book=book,
+                    user=request.user,
+                    defaults={
+                        'rating': form.cleaned_data['rating'],
+                        'comment': form.cleaned_data['comment'],
+                    }
+                )
+            log_activity(request.user, 'review', book.slug)
             messages.success(request, 'تم حفظ تقييمك بنجاح')
         else:
             messages.error(request, 'حدث خطأ في التقييم')
@@ -386,17 +449,17 @@ def toggle_bookmark(request, book_id):
         bookmarked = False
     else:
         bookmarked = True
+        log_activity(request.user, 'bookmark', book.slug)
     
     return JsonResponse({'bookmarked': bookmarked, 'book_id': book_id})
 
+@read_replica
 def books_by_category(request, slug):
     category = get_object_or_404(Category, slug=slug)
-    books = Book.objects.filter(category=category).order_by('-created_at')
+    books = Book.objects.filter(category=category).select_related('author')
     features = category.features.split(",") if category.features else []
 
-    paginator = Paginator(books, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, books, 12, ('-created_at', '-id'))
     
     context = {
         'category': category,
@@ -411,35 +474,25 @@ def dashboard(request):
     # إحصائيات عامة للمستخدم
     bookmarks_count = Bookmark.objects.filter(user=user).count()
 
-    # حساب وقت القراءة الكلي
+    # حساب وقت القراءة الكلي (الدقائق تُجمع من نبضات القارئ)
     total_reading_time = ReadingHistory.objects.filter(
         user=user
     ).aggregate(
         total_time=Sum('reading_duration_minutes')
     )['total_time'] or 0
     
-    # إذا لم يكن هناك حقل reading_duration_minutes في النموذج، يمكننا استخدام التقدم كنسبة مئوية
-    # أو نعتبر أن كل 1% تقدم = دقيقة واحدة (كمثال افتراضي)
-    if total_reading_time == 0:
-        # استخدم التقدم كنسبة مئوية واعتبرها دقائق (للتوضيح فقط)
-        total_reading_time = ReadingHistory.objects.filter(
-            user=user
-        ).aggregate(
-            total_progress=Sum('progress')
-        )['total_progress'] or 0
-    
     reviews_count = Review.objects.filter(user=user).count()
     
     # تاريخ القراءة (آخر 10 سجلات)
     reading_history = ReadingHistory.objects.filter(
         user=user
-    ).select_related('book').order_by('-last_read')[:10]
+    ).select_related('book__author', 'book__category').order_by('-last_read')[:10]
     
     # الكتب المقروءة مؤخراً (آخر 6 كتب للعرض)
     recent_books = ReadingHistory.objects.filter(
         user=user,
         last_read__isnull=False
-    ).select_related('book').order_by('-last_read')[:6]
+    ).select_related('book__author', 'book__category').order_by('-last_read')[:6]
         
     context = {
         'bookmarks_count': bookmarks_count,
@@ -451,87 +504,42 @@ def dashboard(request):
     
     # إحصائيات إضافية للـ staff
     if user.is_staff:
-        # احصائيات إدارية
-        today = timezone.now().date()
-        today_visitors = UserActivity.objects.filter(
-            visited_at__date=today
-        ).values('user').distinct().count()
+        # احصائيات إدارية من النسخة المخزنة (زوار اليوم من الملخص اليومي)
+        stats = statistics_snapshot.get()['stats']
+        today_visitors = stats['today_visitors']
         
-        # إذا لم يكن هناك نموذج UserActivity، يمكن استخدام ReadingHistory
-        if today_visitors == 0:
-            today_visitors = ReadingHistory.objects.filter(
-                last_read__date=today
-            ).values('user').distinct().count()
+        total_books = stats['total_books']
+        total_users = stats['total_users']
+        total_reviews = stats['total_reviews']
         
-        total_books = Book.objects.count()
-        total_users = User.objects.filter(is_active=True).count()
-        total_reviews = Review.objects.count()
+        # متوسط التقييمات
+        avg_rating = stats['avg_rating']
         
-        # حساب متوسط التقييمات
-        avg_rating = Review.objects.aggregate(
-            avg=Avg('rating')
-        )['avg'] or 0
-        
-        # إحصائيات الشهور الستة الماضية
-        monthly_stats = []
-        for i in range(5, -1, -1):
-            target_date = timezone.now() - timedelta(days=30*i)
-            month = target_date.month
-            year = target_date.year
-            
-            # كتب هذا الشهر
-            month_books = Book.objects.filter(
-                created_at__month=month,
-                created_at__year=year
-            ).count()
-            
-            # مستخدمين جدد هذا الشهر
-            month_users = User.objects.filter(
-                date_joined__month=month,
-                date_joined__year=year
-            ).count()
-            
-            monthly_stats.append({
-                'month': month,
-                'year': year,
-                'books': month_books,
-                'users': month_users,
-            })
+        # الإحصائيات الزمنية (آخر ستة أشهر افتراضياً، أو المدى المحدد في الرابط)
+        try:
+            stats_range = parse_stats_range(request.GET)
+            monthly_stats = time_series(**stats_range)
+        except (ValueError, TypeError):
+            messages.error(request, 'مدى الإحصائيات غير صالح')
+            stats_range = {'period': 'month', 'start': None, 'end': None}
+            monthly_stats = time_series()
         
         context.update({
             'total_books': total_books,
             'total_users': total_users,
             'total_reviews': total_reviews,
             'today_visitors': today_visitors,
-            'avg_rating': round(avg_rating, 1),
+            'today_activity': stats['today_activity'],
+            'avg_rating': avg_rating,
+            'stats_stream_enabled': getattr(settings, 'STATS_STREAM_ENABLED', False),
             'monthly_stats': monthly_stats,
+            'stats_period': stats_range['period'],
+            'stats_start': monthly_stats[0]['period'],
+            'stats_end': (stats_range['end'] or timezone.localdate()).isoformat(),
         })
     
     return render(request, 'dashboard/index.html', context)
 
-# إضافة نموذج UserActivity إذا لم يكن موجوداً
-class UserActivity(models.Model):
-    """نموذج لتتبع نشاط المستخدمين"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
-    activity_type = models.CharField(max_length=50, choices=[
-        ('login', 'تسجيل دخول'),
-        ('view_book', 'عرض كتاب'),
-        ('read_book', 'قراءة كتاب'),
-        ('review', 'إضافة تقييم'),
-        ('bookmark', 'إضافة إشارة مرجعية'),
-    ])
-    details = models.TextField(blank=True, null=True)
-    visited_at = models.DateTimeField(auto_now_add=True)
-    
-    class Meta:
-        verbose_name = "نشاط المستخدم"
-        verbose_name_plural = "أنشطة المستخدمين"
-        ordering = ['-visited_at']
-    
-    def __str__(self):
-        return f"{self.user.username} - {self.activity_type} - {self.visited_at}"
-
-
 # view للاستعلام AJAX لتحديث الإحصائيات
 @login_required
 def get_statistics(request):
@@ -540,51 +548,22 @@ def get_statistics(request):
         return JsonResponse({'error': 'غير مصرح'}, status=403)
     
     try:
-        today = timezone.now().date()
-        
-        # احصائيات اليوم
-        today_visitors = UserActivity.objects.filter(
-            visited_at__date=today
-        ).values('user').distinct().count()
-        
-        if today_visitors == 0:
-            today_visitors = ReadingHistory.objects.filter(
-                last_read__date=today
-            ).values('user').distinct().count()
-        
-        # إحصائيات عامة
-        total_books = Book.objects.count()
-        total_users = User.objects.filter(is_active=True).count()
-        total_reviews = Review.objects.count()
-        
-        # إحصائيات الشهر الحالي
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        
-        monthly_books = Book.objects.filter(
-            created_at__month=current_month,
-            created_at__year=current_year
-        ).count()
-        
-        monthly_users = User.objects.filter(
-            date_joined__month=current_month,
-            date_joined__year=current_year
-        ).count()
-        
-        return JsonResponse({
-            'success': True,
-            'stats': {
-                'total_books': total_books,
-                'total_users': total_users,
-                'total_reviews': total_reviews,
-                'today_visitors': today_visitors,
-                'monthly_books': monthly_books,
-                'monthly_users': monthly_users,
-            }
-        })
-        
+        # الإحصائيات من النسخة المخزنة (تُبنى مرة واحدة لكل تغيير أو كل بضع ثوانٍ)
+        snapshot = statistics_snapshot.get()
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
+
+    # الاستطلاع المتكرر دون تغيير في البيانات يُرد عليه بـ 304 دون محتوى
+    response = get_conditional_response(request, etag=snapshot['etag'])
+    if response is None:
+        response = JsonResponse({
+            'success': True,
+            'stats': snapshot['stats'],
+            'generated_at': snapshot['generated_at'],
+        })
+    response['ETag'] = snapshot['etag']
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
     
     user = request.user
     
@@ -641,6 +620,62 @@ def get_statistics(request):
     
     return render(request, 'dashboard/index.html', context)
 
+@login_required
+async def statistics_stream(request):
+    """بث الإحصائيات بأحداث SSE (عند التشغيل عبر ASGI فقط)
+
+    كل الاتصالات المفتوحة تقرأ نفس النسخة المخزنة، ولا يُرسل حدث إلا عند تغيرها.
+    """
+    user = await request.auser()
+    if not user.is_staff:
+        return JsonResponse({'error': 'غير مصرح'}, status=403)
+    if not getattr(settings, 'STATS_STREAM_ENABLED', False) or not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'البث غير متاح، استخدم get_statistics'}, status=404)
+
+    interval = getattr(settings, 'STATS_STREAM_INTERVAL', 5)
+    # يغلق الخادم الاتصال دورياً ويعيد المتصفح الاتصال تلقائياً
+    deadline = time.monotonic() + getattr(settings, 'STATS_STREAM_MAX_AGE', 300)
+    last_etag = request.headers.get('Last-Event-ID')
+
+    async def events():
+        nonlocal last_etag
+        yield f'retry: {int(interval * 1000)}\n\n'
+        while time.monotonic() < deadline:
+            snapshot = await sync_to_async(statistics_snapshot.get)()
+            if snapshot['etag'] != last_etag:
+                last_etag = snapshot['etag']
+                data = json.dumps({'stats': snapshot['stats'], 'generated_at': snapshot['generated_at']})
+                yield f'id: {last_etag}\nevent: stats\ndata: {data}\n\n'
+            else:
+                yield ': keep-alive\n\n'
+            await asyncio.sleep(interval)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # منع nginx من تخزين البث مؤقتاً
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def statistics_series(request):
+    """API للإحصائيات الزمنية: ?metrics=books,users&period=day|week|month&start=YYYY-MM-DD&end=YYYY-MM-DD"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'غير مصرح'}, status=403)
+
+    try:
+        stats_range = parse_stats_range(request.GET)
+        series = time_series(**stats_range)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'period': stats_range['period'],
+        'series': series,
+    })
+
+
 @login_required
 def dashboard_users(request):
     # التحقق من صلاحيات الموظفين
@@ -648,39 +683,22 @@ def dashboard_users(request):
         messages.error(request, 'ليس لديك صلاحية للوصول إلى هذه الصفحة.')
         return redirect('dashboard')
     
-    users = User.objects.all().order_by('-date_joined')
-    
-    # البحث والتصفية
+    # البحث والتصفية (نفس تصفية تصدير المستخدمين)
     search_query = request.GET.get('search', '')
     role_filter = request.GET.get('role', '')
-    
-    if search_query:
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query)
-        )
-    
-    if role_filter:
-        if role_filter == 'staff':
-            users = users.filter(is_staff=True)
-        elif role_filter == 'active':
-            users = users.filter(is_active=True)
-        elif role_filter == 'inactive':
-            users = users.filter(is_active=False)
+    users = filter_users(User.objects.all(), request.GET)
     
     # الترقيم
-    paginator = Paginator(users, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, users, 15, ('-date_joined', '-id'))
     
     # إحصائيات المستخدمين
     total_users = User.objects.count()
     active_users = User.objects.filter(is_active=True).count()
     staff_users = User.objects.filter(is_staff=True).count()
+    # مدى زمني بدل __date ليُستخدم فهرس (date_joined, id)
+    today_start = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
     today_users = User.objects.filter(
-        date_joined__date=datetime.now().date()
+        date_joined__gte=today_start, date_joined__lt=today_start + timedelta(days=1)
     ).count()
     
     context = {
@@ -740,43 +758,23 @@ def dashboard_books(request):
         messages.error(request, 'ليس لديك صلاحية للوصول إلى هذه الصفحة.')
         return redirect('dashboard')
     
-    books = Book.objects.all()
-    categories = Category.objects.all()
+    books = Book.objects.select_related('author', 'category')
     authors = Author.objects.all()
     
     # إحصائيات
     free_books_count = Book.objects.filter(is_free=True).count()
     featured_books_count = Book.objects.filter(is_featured=True).count()
-    categories_count = Category.objects.count()
+    categories_count = len(categories_snapshot.get())
     
-    # البحث والتصفية
+    # البحث والتصفية والترتيب (نفس تصفية تصدير الكتب)
     search_query = request.GET.get('search', '')
     category_filter = request.GET.get('category', '')
     status_filter = request.GET.get('status', '')
     sort_by = request.GET.get('sort', '-created_at')
-    
-    if search_query:
-        books = books.filter(
-            Q(title__icontains=search_query) |
-            Q(author__name__icontains=search_query) |
-            Q(author_name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(category__name__icontains=search_query)
-        )
-    
-    if category_filter:
-        books = books.filter(category_id=category_filter)
-    
-    if status_filter == 'free':
-        books = books.filter(is_free=True)
-    elif status_filter == 'paid':
-        books = books.filter(is_free=False)
-    elif status_filter == 'featured':
-        books = books.filter(is_featured=True)
-    
-    # الترتيب
-    if sort_by in ['title', '-title', '-created_at', '-views', '-downloads']:
-        books = books.order_by(sort_by)
+    try:
+        books = filter_books(books, request.GET)
+    except ValueError as e:
+        messages.error(request, str(e))
     
     # الترقيم
     paginator = Paginator(books, 10)
@@ -819,7 +817,6 @@ def dashboard_books(request):
     
     context = {
         'books': books_page,
-        'categories': categories,
         'authors': authors,
         'search_query': search_query,
         'category_filter': category_filter,
@@ -834,6 +831,50 @@ def dashboard_books(request):
     return render(request, 'dashboard/manage_books.html', context)
 
 
+@login_required
+def dashboard_export(request, dataset):
+    """تصدير بيانات لوحة التحكم بصيغة CSV أو JSONL بالبث (بنفس تصفية صفحاتها)"""
+    if not request.user.is_staff:
+        messages.error(request, 'ليس لديك صلاحية للوصول إلى هذه الصفحة.')
+        return redirect('dashboard')
+
+    fmt = request.GET.get('format', 'csv')
+    if dataset not in EXPORT_DATASETS or fmt not in EXPORT_FORMATS:
+        raise Http404
+    try:
+        return export_response(dataset, request.GET, fmt)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+@login_required
+def dashboard_queries(request):
+    """ملخص استعلامات قاعدة البيانات لكل صفحة من كل العمال (ميزانية الاستعلامات و N+1)"""
+    if not request.user.is_staff:
+        messages.error(request, 'ليس لديك صلاحية للوصول إلى هذه الصفحة.')
+        return redirect('dashboard')
+
+    if request.method == 'POST':
+        query_stats.flush()
+        QueryProfile.objects.all().delete()
+        messages.success(request, 'تم تصفير ملخص الاستعلامات.')
+        return redirect('dashboard_queries')
+
+    # ما جمعته هذه العملية ولم يُكتب بعد، والعمال الآخرون يكتبون كل QUERY_STATS_FLUSH_INTERVAL
+    query_stats.flush()
+    profiles = QueryProfile.objects.prefetch_related(
+        models.Prefetch('fingerprints', queryset=QueryFingerprint.objects.order_by('-max_repeats', '-executions'))
+    )
+    context = {
+        'profiles': profiles,
+        'max_queries': settings.QUERY_BUDGET_MAX_QUERIES,
+        'max_time_ms': settings.QUERY_BUDGET_MAX_TIME_MS,
+        'repeat_threshold': settings.QUERY_BUDGET_REPEAT_THRESHOLD,
+        'flush_interval': settings.QUERY_STATS_FLUSH_INTERVAL,
+    }
+    return render(request, 'dashboard/queries.html', context)
+
+
 @login_required
 @require_POST
 def delete_book(request, book_id):
@@ -0,0 +1,254 @@
+"""
+تسجيل زيارات القراء وتقدمهم في القراءة في سجل القراءة بأسلوب الكتابة المؤجلة.
+
+- تُدمج الزيارات المتكررة لنفس (المستخدم، الكتاب) خلال نافذة زمنية في زيارة واحدة.
+- نبضات القارئ (التقدم والثواني المقروءة) تُجمع لكل زوج: مجموع الثواني وأقصى تقدم.
+- تُكتب دورياً دفعة واحدة: إنشاء السجلات الناقصة بـ bulk_create مع update_conflicts
+  على القيد الفريد (المستخدم، الكتاب)، ثم تحديث الجميع (آخر قراءة، إضافة الدقائق،
+  التقدم إذا زاد) بتحديث نسبي.
+- الزيارات والنبضات تمر بمخزن واحد في كل عملية، أما بين العمليات (عمال gunicorn)
+  فالقيد الفريد هو ما يمنع تكرار السجلات.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .buffers import WriteBehindBuffer
+
+# عدد الأزواج المتذكَّرة قبل حذف ما انتهت نافذته منها
+MAX_RECENT = 100_000
+
+# مواضع القيم في كل عنصر من المخزن
+LAST_READ, SECONDS, PROGRESS = range(3)
+
+
+class VisitBuffer(WriteBehindBuffer):
+    """مخزن مؤقت لزيارات (المستخدم، الكتاب) ونبضات القراءة مع دمج التكرار"""
+
+    interval_setting = 'READING_HISTORY_FLUSH_INTERVAL'
+    threshold_setting = 'READING_HISTORY_FLUSH_THRESHOLD'
+    name = 'reading-visits'
+
+    def __init__(self, flush_interval=None, flush_threshold=None, window=None, batch_size=500):
+        self.window_seconds = window
+        self.batch_size = batch_size
+        # آخر زيارة/جلسة قراءة مسجلة لكل زوج (بتوقيت monotonic) لتجاهل التكرار داخل النافذة
+        self._recent = {}
+        self._recent_reads = {}
+        # الثواني المتبقية (أقل من دقيقة) لكل زوج بعد آخر كتابة
+        self._carry = {}
+        super().__init__(flush_interval, flush_threshold)
+
+    @property
+    def window(self):
+        if self.window_seconds is not None:
+            return self.window_seconds
+        return getattr(settings, 'READING_HISTORY_VISIT_WINDOW', 600)
+
+    def empty(self):
+        return {}
+
+    def merge(self, pending):
+        for key, entry in pending.items():
+            self._add(self._pending, key, *entry)
+
+    @staticmethod
+    def _add(pending, key, last_read, seconds=0, progress=None):
+        current = pending.get(key)
+        if current is None:
+            pending[key] = [last_read, seconds, progress]
+            return
+        current[LAST_READ] = max(current[LAST_READ], last_read)
+        current[SECONDS] += seconds
+        if progress is not None:
+            current[PROGRESS] = max(current[PROGRESS] or 0, progress)
+
+    def _first_in_window(self, recent, key):
+        """هل هذه أول مرة يُرى فيها الزوج داخل النافذة؟ (تحت القفل)"""
+        now = time.monotonic()
+        last = recent.get(key)
+        if last is not None and now - last < self.window:
+            return False
+        recent[key] = now
+        if len(recent) > MAX_RECENT:
+            window = self.window
+            for k in [k for k, t in recent.items() if now - t >= window]:
+                del recent[k]
+        return True
+
+    def visit(self, user_id, book_id):
+        """تسجيل زيارة؛ يعيد False إذا دُمجت مع زيارة سابقة داخل النافذة"""
+        key = (user_id, book_id)
+        with self._lock:
+            if not self._first_in_window(self._recent, key):
+                return False
+
+        visited_at = timezone.now()
+        self.record(lambda pending: self._add(pending, key, visited_at))
+        return True
+
+    def read(self, user_id, book_id, seconds=0, progress=None):
+        """تسجيل نبضة قراءة؛ يعيد True إذا بدأت جلسة قراءة جديدة للزوج"""
+        key = (user_id, book_id)
+        with self._lock:
+            started = self._first_in_window(self._recent_reads, key)
+
+        read_at = timezone.now()
+        self.record(lambda pending: self._add(pending, key, read_at, seconds, progress))
+        return started
+
+    def write(self, pending):
+        from django.contrib.auth.models import User
+        from .models import AuthorStats, Book, ReadingHistory
+
+        # نتجاهل الزيارات لكتب أو مستخدمين حُذفوا قبل الكتابة
+        book_authors = dict(
+            Book.objects.filter(pk__in={book_id for _, book_id in pending}).values_list('pk', 'author_id')
+        )
+        user_ids = set(
+            User.objects.filter(pk__in={user_id for user_id, _ in pending}).values_list('pk', flat=True)
+        )
+        entries = {
+            key: entry for key, entry in pending.items()
+            if key[0] in user_ids and key[1] in book_authors
+        }
+
+        # الدقائق الكاملة تُكتب، وما تبقى من ثوانٍ يُحمل للكتابة التالية
+        with self._lock:
+            carry, self._carry = self._carry, {}
+        minutes, remainders = {}, {}
+        for key, entry in entries.items():
+            minutes[key], remainders[key] = divmod(entry[SECONDS] + carry.get(key, 0), 60)
+        # بقايا الأزواج غير الموجودة في هذه الدفعة تبقى محمولة كما هي
+        remainders.update({key: seconds for key, seconds in carry.items() if key not in pending})
+
+        created = []
+        try:
+            with transaction.atomic():
+                items = list(entries.items())
+                for i in range(0, len(items), self.batch_size):
+                    chunk = dict(items[i:i + self.batch_size])
+                    existing = existing_history(chunk)
+                    found = set(existing.values())
+                    new = [key for key in chunk if key not in found]
+                    if new:
+                        # عملية أخرى قد تنشئ السجل بعد القراءة أعلاه: القيد الفريد يجعل
+                        # الإدراج تحديثاً لآخر قراءة بدل سجل مكرر، ثم تضاف الدقائق والتقدم
+                        # للجميع بتحديث نسبي في الخطوة التالية فلا يضيع شيء منها
+                        ReadingHistory.objects.bulk_create(
+                            [
+                                ReadingHistory(
+                                    user_id=user_id,
+                                    book_id=book_id,
+                                    last_read=chunk[(user_id, book_id)][LAST_READ],
+                                )
+                                for user_id, book_id in new
+                            ],
+                            batch_size=self.batch_size,
+                            update_conflicts=True,
+                            unique_fields=['user', 'book'],
+                            update_fields=['last_read'],
+                        )
+                        existing.update(existing_history(new))
+                        created.extend(new)
+                    self._update(ReadingHistory, existing, chunk, minutes)
+        except Exception:
+            # الدفعة تعود للمخزن (merge) بثوانيها، والبقايا السابقة تعود كما كانت
+            remainders = carry
+            raise
+        finally:
+            with self._lock:
+                for key, seconds in remainders.items():
+                    if seconds:
+                        self._carry[key] = self._carry.get(key, 0) + seconds
+
+        # bulk_create لا يرسل post_save، فنحدّث عدد القراء للمؤلفين يدوياً
+        author_ids = {book_authors[book_id] for _, book_id in created} - {None}
+        if author_ids:
+            AuthorStats.refresh(author_ids)
+
+    @staticmethod
+    def _update(model, existing, chunk, minutes):
+        """آخر قراءة لكل السجلات، والدقائق والتقدم لمن وصلته نبضات"""
+        updates = {
+            'last_read': Case(
+                *[When(pk=pk, then=Value(chunk[key][LAST_READ])) for pk, key in existing.items()],
+                output_field=DateTimeField(),
+            ),
+        }
+        read = {pk: key for pk, key in existing.items() if minutes[key]}
+        if read:
+            updates['reading_duration_minutes'] = F('reading_duration_minutes') + Case(
+                *[When(pk=pk, then=Value(minutes[key])) for pk, key in read.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        progressed = {pk: key for pk, key in existing.items() if chunk[key][PROGRESS] is not None}
+        if progressed:
+            # التقدم لا يتراجع عند إعادة قراءة صفحة سابقة
+            updates['progress'] = Greatest(
+                F('progress'),
+                Case(
+                    *[When(pk=pk, then=Value(chunk[key][PROGRESS])) for pk, key in progressed.items()],
+                    default=F('progress'),
+                    output_field=IntegerField(),
+                ),
+            )
+        model.objects.filter(pk__in=existing).update(**updates)
+
+
+def existing_history(chunk):
+    """{pk: (user_id, book_id)} لسجلات القراءة الموجودة من هذه الدفعة"""
+    from .models import ReadingHistory
+
+    by_user = {}
+    for user_id, book_id in chunk:
+        by_user.setdefault(user_id, []).append(book_id)
+    condition = Q()
+    for user_id, book_ids in by_user.items():
+        condition |= Q(user_id=user_id, book_id__in=book_ids)
+    return {
+        pk: (user_id, book_id)
+        for pk, user_id, book_id in ReadingHistory.objects.filter(condition).values_list('pk', 'user_id', 'book_id')
+    }
+
+
+reading_visits = VisitBuffer()
+
+
+def parse_reading_events(data, max_events=None, max_seconds=None):
+    """[(book_id, seconds, progress)] من نبضات القارئ بعد التحقق ودمج نبضات نفس الكتاب
+
+    data قائمة من {"book": رقم الكتاب, "seconds": ثوانٍ منذ النبضة السابقة, "progress": 0-100}.
+    ترفع ValueError للبيانات غير الصالحة.
+    """
+    max_events = max_events or getattr(settings, 'READING_BEACON_MAX_EVENTS', 100)
+    max_seconds = max_seconds or getattr(settings, 'READING_HEARTBEAT_MAX_SECONDS', 120)
+    if not isinstance(data, list):
+        raise ValueError('يجب إرسال قائمة من الأحداث')
+    if len(data) > max_events:
+        raise ValueError(f'عدد الأحداث أكبر من {max_events}')
+
+    merged = {}
+    for event in data:
+        if not isinstance(event, dict):
+            raise ValueError('حدث غير صالح')
+        try:
+            book_id = int(event['book'])
+            # لا نثق بمدة أطول من فترة النبضات (تبويب نائم ثم استيقظ مثلاً)
+            seconds = min(max(int(event.get('seconds') or 0), 0), max_seconds)
+            progress = event.get('progress')
+            progress = None if progress is None else min(max(int(progress), 0), 100)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('حدث غير صالح')
+        if book_id <= 0:
+            raise ValueError('حدث غير صالح')
+        current = merged.setdefault(book_id, [0, None])
+        current[0] += seconds
+        if progress is not None:
+            current[1] = max(current[1] or 0, progress)
+    return [(book_id, seconds, progress) for book_id, (seconds, progress) in merged.items()]
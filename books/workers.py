@@ -0,0 +1,103 @@
+"""
+مجموعات عمليات للأعمال الثقيلة على المعالج (الصور، ملفات PDF) خارج مسار الطلب.
+
+الدالة المنفذة في العملية الفرعية لا تلمس جانغو ولا قاعدة البيانات: تستقبل بيانات
+وتعيد نتيجة، ثم تُحفظ النتيجة في العملية الأم داخل on_done.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessPool:
+    """مجموعة عمليات تُنشأ عند أول استخدام، وعدد عمالها من الإعدادات (0 = في نفس العملية)"""
+
+    def __init__(self, workers_setting, default_workers=2):
+        self.workers_setting = workers_setting
+        self.default_workers = default_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return getattr(settings, self.workers_setting, self.default_workers)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn بدل fork: العملية الأم متعددة الخيوط (خادم الويب)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def run(self, fn, args, on_done, sync=None):
+        """تنفيذ fn(*args) ثم on_done(النتيجة، الخطأ)
+
+        فوراً إذا sync أو لم يكن هناك عمال (وتُعاد قيمة on_done)، وإلا في المجموعة
+        وتُعاد Future نتيجتها قيمة on_done بعد اكتمال المهمة وحفظ نتيجتها.
+        """
+        if sync or (sync is None and self.workers <= 0):
+            try:
+                result = fn(*args)
+            except Exception as e:
+                return on_done(None, e)
+            return on_done(result, None)
+
+        future = self._get_executor().submit(fn, *args)
+        # ما يحفظه on_done لا ما أعادته الدالة: فشل الحفظ فشل للمهمة أيضاً
+        saved = Future()
+
+        def done(future):
+            try:
+                error = future.exception()
+                saved.set_result(on_done(None if error else future.result(), error))
+            except Exception as e:
+                logger.exception('تعذر حفظ نتيجة المهمة')
+                saved.set_exception(e)
+            finally:
+                # الاستدعاء في خيط المجموعة يفتح اتصالاً خاصاً به
+                connections.close_all()
+
+        future.add_done_callback(done)
+        return saved
+
+    def shutdown(self):
+        """انتظار المهام الجارية وحفظ نتائجها ثم إغلاق العمليات"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def _saved(result):
+    if isinstance(result, Future):
+        return None if result.exception() else result.result()
+    return result
+
+
+def run_batched(submit, items, batch_size):
+    """submit(item) لكل عنصر مع batch_size مهمة جارية على الأكثر، وتُعاد قيم on_done عند اكتمالها
+
+    لا تُقرأ ملفات كل العناصر إلى الذاكرة دفعة واحدة، ولا تتراكم آلاف المهام في طابور المجموعة.
+    """
+    running = set()
+    for item in items:
+        result = submit(item)
+        if not isinstance(result, Future):
+            yield _saved(result)
+            continue
+        running.add(result)
+        if len(running) >= batch_size:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _saved(future)
+    for future in wait(running).done:
+        yield _saved(future)
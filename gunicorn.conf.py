@@ -0,0 +1,7 @@
+# إعدادات gunicorn الإضافية (يقرأها gunicorn تلقائياً من مجلد التشغيل)
+
+
+def worker_exit(server, worker):
+    """كتابة العدادات والزيارات المؤجلة قبل إنهاء العامل"""
+    from books.buffers import flush_all
+    flush_all()